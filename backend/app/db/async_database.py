@@ -0,0 +1,49 @@
+import os
+from contextlib import asynccontextmanager
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_ASYNC_POOL_MIN = int(os.getenv("DB_ASYNC_POOL_MIN", "2"))
+DB_ASYNC_POOL_MAX = int(os.getenv("DB_ASYNC_POOL_MAX", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Same connection settings as the sync pool in database.py, but served by
+# psycopg 3 so request handlers can await queries instead of blocking a thread.
+async_pool = AsyncConnectionPool(
+    make_conninfo(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432"),
+    ),
+    min_size=DB_ASYNC_POOL_MIN,
+    max_size=DB_ASYNC_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    check=AsyncConnectionPool.check_connection,
+    open=False,
+)
+
+
+async def open_async_pool():
+    await async_pool.open()
+
+
+async def close_async_pool():
+    await async_pool.close()
+
+
+def get_async_pool_stats():
+    return async_pool.get_stats()
+
+
+@asynccontextmanager
+async def get_async_cursor():
+    # pool.connection() commits on success and rolls back on error,
+    # mirroring get_db_cursor().
+    async with async_pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            yield cursor
@@ -1,12 +1,20 @@
 import os
+import threading
+import time
 import psycopg2
+from psycopg2 import pool as pg_pool
 from dotenv import load_dotenv
 from contextlib import contextmanager
 
 load_dotenv()
 
-def get_connection():
-    return psycopg2.connect(
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def _connect_kwargs():
+    return dict(
         dbname=os.getenv("DB_NAME"),
         user=os.getenv("DB_USER"),
         password=os.getenv("DB_PASSWORD"),
@@ -14,16 +22,139 @@ def get_connection():
         port=os.getenv("DB_PORT", "5432"),
     )
 
+
+def get_connection():
+    return psycopg2.connect(**_connect_kwargs())
+
+
+class ConnectionPool:
+    """
+    Process-wide psycopg2 pool.
+
+    ThreadedConnectionPool raises as soon as it is exhausted, so checkouts are
+    gated by a semaphore and wait up to `timeout` seconds for a free slot.
+    Connections are health-checked on checkout and replaced if broken.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._started = time.monotonic()
+
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._replaced = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(
+                        self.minconn, self.maxconn, **_connect_kwargs()
+                    )
+        return self._pool
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise pg_pool.PoolError(
+                f"timed out after {self.timeout}s waiting for a DB connection"
+            )
+        waited = time.monotonic() - start
+
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            if not self._is_healthy(conn):
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+                with self._lock:
+                    self._replaced += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        try:
+            self._get_pool().putconn(conn, close=close or conn.closed != 0)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def closeall(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._pool._pool) if self._pool is not None else 0
+            uptime = time.monotonic() - self._started
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": self._in_use,
+                "idle": idle,
+                "checkouts": self._checkouts,
+                "checkouts_per_sec": round(self._checkouts / uptime, 2) if uptime else 0.0,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "replaced": self._replaced,
+            }
+
+
+pool = ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT)
+
+
+def get_pool_stats():
+    return pool.stats()
+
+
 @contextmanager
 def get_db_cursor():
-    conn = get_connection()
+    conn = pool.getconn()
     cursor = conn.cursor()
+    broken = False
     try:
         yield cursor
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
         raise
     finally:
         cursor.close()
-        conn.close()
+        pool.putconn(conn, close=broken)
@@ -0,0 +1,78 @@
+# db/migrate.py
+"""
+Versioned schema migrations.
+
+Every app/db/migrations/NNN_name.sql file is applied once, in order, and
+recorded in schema_migrations. hotels / restaurants / user_clicks
+themselves are created outside the app; the migrations only add the
+tables, columns and indexes the app relies on.
+
+    python -m app.db.migrate            # apply pending migrations
+    python -m app.db.migrate --status
+"""
+import argparse
+import logging
+import os
+from typing import List, Tuple
+
+from app.db.database import get_db_cursor
+from app.utils.log import setup_logging
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+# pg_advisory_xact_lock key, so concurrent app starts migrate one at a time
+MIGRATION_LOCK_ID = 7_301_912
+
+
+def migration_files() -> List[Tuple[str, str]]:
+    """(version, path) for every migration, in the order they apply."""
+    names = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(name[:-4], os.path.join(MIGRATIONS_DIR, name)) for name in names]
+
+
+def applied_versions(cursor) -> set:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def run_migrations() -> List[str]:
+    """
+    Apply pending migrations in one transaction and return their versions.
+    DDL is transactional in Postgres, so a failing migration leaves the
+    schema exactly as it was.
+    """
+    applied = []
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        done = applied_versions(cursor)
+        for version, path in migration_files():
+            if version in done:
+                continue
+            with open(path) as f:
+                cursor.execute(f.read())
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            applied.append(version)
+            log.info("applied migration", extra={"version": version})
+    return applied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    args = parser.parse_args()
+    setup_logging()
+    if args.status:
+        with get_db_cursor() as cursor:
+            done = applied_versions(cursor)
+        for version, _ in migration_files():
+            print(f"{'applied' if version in done else 'pending'}  {version}")
+    else:
+        applied = run_migrations()
+        print(f"{len(applied)} migration(s) applied")
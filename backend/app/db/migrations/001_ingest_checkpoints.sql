@@ -0,0 +1,10 @@
+-- Resume point of each (entity, city) ingest, see app/services/ingest.py
+CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+    entity TEXT NOT NULL,
+    city TEXT NOT NULL,
+    last_page INTEGER NOT NULL DEFAULT 0,
+    rows_upserted INTEGER NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (entity, city)
+);
@@ -0,0 +1,4 @@
+-- GiST indexes for viewport (<@ box) and KNN (<->) queries; the expression
+-- must match GEO_POINT in app/services/api/geo_api.py
+CREATE INDEX IF NOT EXISTS hotels_geo_idx ON hotels USING gist (point(lng::float8, lat::float8));
+CREATE INDEX IF NOT EXISTS restaurants_geo_idx ON restaurants USING gist (point(lng::float8, lat::float8));
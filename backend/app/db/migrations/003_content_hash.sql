@@ -0,0 +1,3 @@
+-- md5 of each row's canonical COPY text, see app/db/bulk.py
+ALTER TABLE hotels ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS content_hash TEXT;
@@ -0,0 +1,15 @@
+-- Payload hash and listing ids of every page from the last run, used by
+-- delta ingests to skip unchanged pages and to find removed listings
+CREATE TABLE IF NOT EXISTS ingest_page_fingerprints (
+    entity TEXT NOT NULL,
+    city TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    payload_hash TEXT NOT NULL,
+    ids JSONB NOT NULL,
+    seen_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (entity, city, page)
+);
+
+-- Set when a complete ingest no longer lists the row; reads skip these
+ALTER TABLE hotels ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+ALTER TABLE restaurants ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
@@ -0,0 +1,9 @@
+-- Per-city aggregates behind /api/summary, refreshed by the ingest
+CREATE TABLE IF NOT EXISTS city_summaries (
+    entity TEXT NOT NULL,
+    city TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    summary JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (entity, city)
+);
@@ -0,0 +1,25 @@
+-- Indexes behind the listing, recommendation and click queries. All listing
+-- indexes are partial on live rows, matching the deleted_at IS NULL every
+-- read adds. Checked by benchmarks/check_query_plans.py.
+
+-- /hotels/filter and /api/hotels: keyset order is
+-- rating DESC, price ASC NULLS LAST, id, and rating is the leading range filter
+CREATE INDEX IF NOT EXISTS hotels_rating_price_idx
+    ON hotels (rating DESC, price_avg ASC NULLS LAST, id)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS restaurants_rating_price_idx
+    ON restaurants (rating DESC, ((price_min + price_max) / 2.0) ASC NULLS LAST, id)
+    WHERE deleted_at IS NULL;
+
+-- per-city reads: summaries, soft-delete reconciliation and the recommender
+-- load (city = ? AND highlights IS NOT NULL), which filters the few
+-- highlight-less rows off this index rather than keeping a second one
+CREATE INDEX IF NOT EXISTS hotels_city_idx ON hotels (city) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS restaurants_city_idx ON restaurants (city) WHERE deleted_at IS NULL;
+
+-- containment / any-of lookups on the JSON arrays (@>, ?|, ?&)
+CREATE INDEX IF NOT EXISTS hotels_highlights_gin_idx ON hotels USING gin (highlights);
+CREATE INDEX IF NOT EXISTS restaurants_cuisines_gin_idx ON restaurants USING gin (cuisines);
+
+-- /recommend looks up a session's clicks
+CREATE INDEX IF NOT EXISTS user_clicks_session_idx ON user_clicks (session_id);
@@ -0,0 +1,46 @@
+-- Item-item co-click model (app/services/coclick.py). Pair and item counts
+-- are kept up to date incrementally from user_clicks past a watermark.
+
+-- the watermark walks user_clicks.id, so it has to be filled from a
+-- sequence (user_clicks itself is created outside the app)
+DO $$
+DECLARE
+    id_default TEXT;
+    id_identity "char";
+BEGIN
+    SELECT pg_get_expr(d.adbin, d.adrelid), a.attidentity INTO id_default, id_identity
+    FROM pg_attribute a
+    LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE a.attrelid = 'user_clicks'::regclass AND a.attname = 'id' AND NOT a.attisdropped;
+    IF NOT FOUND THEN
+        ALTER TABLE user_clicks ADD COLUMN id BIGSERIAL;
+    ELSIF id_identity = '' AND coalesce(position('nextval(' IN id_default), 0) <> 1 THEN
+        RAISE EXCEPTION 'user_clicks.id must default to a sequence (serial or identity) for the co-click watermark';
+    END IF;
+END $$;
+
+-- when a click's flush transaction started; the model only consumes clicks
+-- older than COCLICK_LAG_SEC so a flush that commits late isn't skipped by
+-- the watermark
+ALTER TABLE user_clicks ADD COLUMN IF NOT EXISTS clicked_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+-- sessions that clicked each hotel
+CREATE TABLE IF NOT EXISTS coclick_items (
+    hotel_id BIGINT PRIMARY KEY,
+    sessions INTEGER NOT NULL
+);
+
+-- sessions that clicked both hotels; hotel_a < hotel_b
+CREATE TABLE IF NOT EXISTS coclick_pairs (
+    hotel_a BIGINT NOT NULL,
+    hotel_b BIGINT NOT NULL,
+    sessions INTEGER NOT NULL,
+    PRIMARY KEY (hotel_a, hotel_b)
+);
+
+CREATE TABLE IF NOT EXISTS coclick_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    last_click_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ
+);
+INSERT INTO coclick_state DEFAULT VALUES ON CONFLICT DO NOTHING;
@@ -0,0 +1,10 @@
+-- Request counts per (entity, city) behind the scheduler's priorities
+-- (app/services/demand.py). Every API process adds its counts here, so a
+-- scheduler running in another process sees all of them.
+CREATE TABLE IF NOT EXISTS city_demand (
+    entity TEXT NOT NULL,
+    city TEXT NOT NULL,  -- job_key() form: lower case, single spaces
+    demand DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (entity, city)
+);
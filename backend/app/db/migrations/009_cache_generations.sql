@@ -0,0 +1,8 @@
+-- Response cache generations (app/services/cache.py) for the in-process
+-- backend. Ingests bump them here, and every API process polls the table,
+-- so an ingest in another process still invalidates its cached pages.
+CREATE TABLE IF NOT EXISTS cache_generations (
+    scope TEXT PRIMARY KEY,  -- "<entity>:<city>" or "<entity>:*"
+    generation BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
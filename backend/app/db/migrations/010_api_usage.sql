@@ -0,0 +1,7 @@
+-- RapidAPI requests actually made, per minute, by every ingest (scheduled,
+-- manual or backfill, in any process). The scheduler's hourly budget is
+-- charged from here rather than from its own estimates.
+CREATE TABLE IF NOT EXISTS api_usage (
+    minute TIMESTAMPTZ PRIMARY KEY,
+    requests INTEGER NOT NULL DEFAULT 0
+);
@@ -0,0 +1,49 @@
+# api/facets.py
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.metrics import query_timer
+
+# JSON array column faceted per table; both have a GIN index (migration 006)
+FACET_COLUMNS = {"hotels": "highlights", "restaurants": "cuisines"}
+MAX_FACET_VALUES = 50
+
+
+def split_values(raw: Optional[str]) -> Optional[List[str]]:
+    """'Pool, Spa' -> ['Pool', 'Spa'] for comma separated query params."""
+    if not raw:
+        return None
+    values = [v.strip() for v in raw.split(",") if v.strip()]
+    return values or None
+
+
+def tags_clause(column: str, values: Sequence[str], match: str = "any") -> Tuple[str, list]:
+    """
+    Predicate for rows whose JSON array `column` contains all / any of
+    `values`. ?& and ?| are served by the column's GIN index.
+    """
+    op = "?&" if match == "all" else "?|"
+    return f" AND {column} {op} %s::text[]", [list(values)]
+
+
+async def facet_counts(
+    cursor, table: str, where: str, params: list, limit: int = MAX_FACET_VALUES
+) -> List[Dict[str, Any]]:
+    """
+    Value counts of the table's facet column over every row matching
+    `where`, in one grouped pass. Most frequent first.
+    """
+    column = FACET_COLUMNS[table]
+    with query_timer(f"{table}_facets"):
+        await cursor.execute(
+            f"""
+            SELECT f.value, count(*) AS n
+            FROM {table} CROSS JOIN LATERAL jsonb_array_elements_text({table}.{column}) AS f(value)
+            WHERE {where}
+            GROUP BY f.value
+            ORDER BY n DESC, f.value
+            LIMIT %s
+            """,
+            list(params) + [limit],
+        )
+        rows = await cursor.fetchall()
+    return [{"value": value, "count": n} for value, n in rows]
@@ -0,0 +1,85 @@
+# api/fields.py
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+HOTEL_COLUMNS = [
+    "id", "name", "rating", "address",
+    "price_min", "price_max", "price_avg",
+    "link", "lat", "lng", "city",
+    "reviews", "phone", "detailed_address", "ranking",
+    "featured_image", "highlights", "providers"
+]
+
+RESTAURANT_COLUMNS = [
+    "id", "name", "rating", "reviews", "price_range",
+    "price_min", "price_max",
+    "link", "lat", "lng", "city", "featured_image",
+    "is_sponsored", "has_delivery", "is_premium",
+    "cuisines", "menu_link", "reservation_link"
+]
+
+HOTEL_PRESETS: Dict[str, List[str]] = {
+    "map": ["id", "lat", "lng", "rating", "price_avg"],
+    "card": ["id", "name", "rating", "price_avg", "city", "link", "featured_image", "reviews"],
+    "all": HOTEL_COLUMNS,
+}
+
+RESTAURANT_PRESETS: Dict[str, List[str]] = {
+    "map": ["id", "lat", "lng", "rating", "price_min", "price_max"],
+    "card": [
+        "id", "name", "rating", "price_range", "price_min", "price_max",
+        "city", "link", "featured_image", "reviews", "cuisines",
+    ],
+    "all": RESTAURANT_COLUMNS,
+}
+
+
+# SQL for columns that are shaped in Postgres rather than in Python: ratings
+# are rounded there and numerics come back as float8, so rows can go to the
+# JSON encoder as fetched.
+HOTEL_SQL: Dict[str, str] = {
+    "rating": "ROUND(NULLIF(rating, 0)::numeric, 1)::float8",
+    "price_min": "price_min::float8",
+    "price_max": "price_max::float8",
+    "price_avg": "price_avg::float8",
+    "lat": "lat::float8",
+    "lng": "lng::float8",
+}
+
+RESTAURANT_SQL: Dict[str, str] = {
+    "rating": "ROUND(rating::numeric, 1)::float8",
+    "lat": "lat::float8",
+    "lng": "lng::float8",
+    # derived, only served by /api/restaurants
+    "price_avg": "((price_min + price_max) / 2.0)::float8",
+}
+
+# /restaurants/filter has always returned the stored rating, unrounded
+RESTAURANT_FILTER_SQL: Dict[str, str] = {**RESTAURANT_SQL, "rating": "rating::float8"}
+
+
+def select_list(fields: List[str], exprs: Dict[str, str]) -> str:
+    return ", ".join(f"{exprs[f]} AS {f}" if f in exprs else f for f in fields)
+
+
+def resolve_fields(fields: Optional[str], columns: List[str], presets: Dict[str, List[str]]) -> List[str]:
+    """
+    Turn a `fields=` value (comma separated column names and/or preset
+    names) into a whitelisted column list in table order. Missing means all.
+    """
+    if not fields:
+        return list(columns)
+    wanted = set()
+    for name in (f.strip() for f in fields.split(",")):
+        if not name:
+            continue
+        if name in presets:
+            wanted.update(presets[name])
+        elif name in columns:
+            wanted.add(name)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {name}")
+    if not wanted:
+        return list(columns)
+    return [c for c in columns if c in wanted]
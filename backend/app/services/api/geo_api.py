@@ -0,0 +1,234 @@
+# api/geo_api.py
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.db.async_database import get_async_cursor
+from app.services.api.fields import (
+    HOTEL_COLUMNS, HOTEL_PRESETS, HOTEL_SQL,
+    RESTAURANT_COLUMNS, RESTAURANT_PRESETS, RESTAURANT_SQL,
+    resolve_fields, select_list,
+)
+from app.services.api.pagination import MAX_LIMIT
+from app.services.cache import cached_response, result_cache
+from app.utils.metrics import query_timer
+
+router = APIRouter()
+
+KM_PER_DEG_LAT = 111.32
+MAX_RADIUS_KM = 100.0
+
+# Must match the expression indexes in app/db/migrations/002_geo_indexes.sql
+GEO_POINT = "point(lng::float8, lat::float8)"
+
+TABLES = {
+    "hotels": (HOTEL_COLUMNS, HOTEL_PRESETS, HOTEL_SQL),
+    "restaurants": (RESTAURANT_COLUMNS, RESTAURANT_PRESETS, RESTAURANT_SQL),
+}
+
+
+def haversine_sql(lat: str, lng: str, lat0: str, lng0: str) -> str:
+    """Great-circle distance in km between two SQL lat/lng expressions."""
+    return (
+        f"(2 * 6371 * asin(sqrt("
+        f"power(sin(radians({lat}::float8 - {lat0}) / 2), 2)"
+        f" + cos(radians({lat0})) * cos(radians({lat}::float8))"
+        f" * power(sin(radians({lng}::float8 - {lng0}) / 2), 2))))"
+    )
+
+
+def bbox_sql(lat0: str, lng0: str, radius_km: str) -> str:
+    """Box around a point that contains every point within radius_km."""
+    dlat = f"({radius_km} / {KM_PER_DEG_LAT})"
+    dlng = f"({radius_km} / ({KM_PER_DEG_LAT} * greatest(cos(radians({lat0})), 0.01)))"
+    return (
+        f"box(point({lng0} - {dlng}, {lat0} - {dlat}),"
+        f" point({lng0} + {dlng}, {lat0} + {dlat}))"
+    )
+
+
+async def fetch_dicts(sql: str, params: dict, fields: list, name: str):
+    async with get_async_cursor() as cursor:
+        with query_timer(name):
+            await cursor.execute(sql, params)
+            rows = await cursor.fetchall()
+    names = fields + ["distance_km"]
+    return [dict(zip(names, row)) for row in rows]
+
+
+async def hotel_exists(hotel_id: int) -> bool:
+    async with get_async_cursor() as cursor:
+        await cursor.execute("SELECT 1 FROM hotels WHERE id = %s AND deleted_at IS NULL", (hotel_id,))
+        return await cursor.fetchone() is not None
+
+
+def projection(entity: str, fields: Optional[str]) -> list:
+    columns, presets, _ = TABLES[entity]
+    return resolve_fields(fields or "card", columns, presets)
+
+
+async def nearby(entity: str, lat: float, lng: float, radius_km: float, limit: int, fields: list):
+    """Rows within radius_km of (lat, lng), nearest first."""
+    _, _, exprs = TABLES[entity]
+    distance = haversine_sql("lat", "lng", "%(lat)s", "%(lng)s")
+    sql = f"""
+        SELECT * FROM (
+            SELECT {select_list(fields, exprs)}, {distance} AS distance_km
+            FROM {entity}
+            WHERE {GEO_POINT} <@ {bbox_sql("%(lat)s", "%(lng)s", "%(radius_km)s")}
+              AND deleted_at IS NULL
+        ) t
+        WHERE distance_km <= %(radius_km)s
+        ORDER BY distance_km
+        LIMIT %(limit)s
+    """
+    params = {"lat": lat, "lng": lng, "radius_km": radius_km, "limit": limit}
+    data = await fetch_dicts(sql, params, fields, f"{entity}_nearby")
+    return {"data": data, "count": len(data)}
+
+
+async def viewport(entity: str, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                   sort: str, limit: int, fields: list):
+    """Rows inside the map viewport, nearest to its centre or best rated first."""
+    _, _, exprs = TABLES[entity]
+    distance = haversine_sql("lat", "lng", "%(c_lat)s", "%(c_lng)s")
+    if sort == "distance":
+        # KNN ordering straight off the GiST index
+        order = f"{GEO_POINT} <-> point(%(c_lng)s, %(c_lat)s)"
+    else:
+        order = "rating DESC NULLS LAST, id"
+    sql = f"""
+        SELECT {select_list(fields, exprs)}, {distance} AS distance_km
+        FROM {entity}
+        WHERE {GEO_POINT} <@ box(point(%(min_lng)s, %(min_lat)s), point(%(max_lng)s, %(max_lat)s))
+          AND deleted_at IS NULL
+        ORDER BY {order}
+        LIMIT %(limit)s
+    """
+    params = {
+        "min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng,
+        "c_lat": (min_lat + max_lat) / 2, "c_lng": (min_lng + max_lng) / 2, "limit": limit,
+    }
+    data = await fetch_dicts(sql, params, fields, f"{entity}_viewport")
+    return {"data": data, "count": len(data)}
+
+
+def check_viewport(min_lat, min_lng, max_lat, max_lng):
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Viewport min must be <= max")
+
+
+@router.get("/hotels/nearby")
+async def hotels_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(2.0, gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None),
+):
+    cols = projection("hotels", fields)
+    key = {"lat": lat, "lng": lng, "radius_km": radius_km, "limit": limit, "fields": cols}
+    try:
+        return await cached_response("hotels", "nearby", key,
+                                     lambda: nearby("hotels", lat, lng, radius_km, limit, cols))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/restaurants/nearby")
+async def restaurants_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(1.0, gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None),
+):
+    cols = projection("restaurants", fields)
+    key = {"lat": lat, "lng": lng, "radius_km": radius_km, "limit": limit, "fields": cols}
+    try:
+        return await cached_response("restaurants", "nearby", key,
+                                     lambda: nearby("restaurants", lat, lng, radius_km, limit, cols))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/hotels/viewport")
+async def hotels_in_viewport(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    sort: str = Query("distance", pattern="^(distance|rating)$"),
+    limit: int = Query(500, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None),
+):
+    check_viewport(min_lat, min_lng, max_lat, max_lng)
+    cols = projection("hotels", fields)
+    key = {"box": [min_lat, min_lng, max_lat, max_lng], "sort": sort, "limit": limit, "fields": cols}
+    try:
+        return await cached_response("hotels", "viewport", key, lambda: viewport(
+            "hotels", min_lat, min_lng, max_lat, max_lng, sort, limit, cols))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/restaurants/viewport")
+async def restaurants_in_viewport(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    sort: str = Query("distance", pattern="^(distance|rating)$"),
+    limit: int = Query(500, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None),
+):
+    check_viewport(min_lat, min_lng, max_lat, max_lng)
+    cols = projection("restaurants", fields)
+    key = {"box": [min_lat, min_lng, max_lat, max_lng], "sort": sort, "limit": limit, "fields": cols}
+    try:
+        return await cached_response("restaurants", "viewport", key, lambda: viewport(
+            "restaurants", min_lat, min_lng, max_lat, max_lng, sort, limit, cols))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/hotels/{hotel_id}/restaurants")
+async def restaurants_near_hotel(
+    hotel_id: int,
+    radius_km: float = Query(1.0, gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None),
+):
+    """Restaurants around a hotel in one query: the hotel row drives a
+    LATERAL index lookup instead of a hotels x restaurants distance loop."""
+    cols = projection("restaurants", fields)
+    distance = haversine_sql("lat", "lng", "h.lat::float8", "h.lng::float8")
+    sql = f"""
+        SELECT r.* FROM hotels h
+        CROSS JOIN LATERAL (
+            SELECT {select_list(cols, RESTAURANT_SQL)}, {distance} AS distance_km
+            FROM restaurants
+            WHERE {GEO_POINT} <@ {bbox_sql("h.lat::float8", "h.lng::float8", "%(radius_km)s")}
+              AND deleted_at IS NULL
+        ) r
+        WHERE h.id = %(hotel_id)s AND h.deleted_at IS NULL AND r.distance_km <= %(radius_km)s
+        ORDER BY r.distance_km
+        LIMIT %(limit)s
+    """
+    params = {"hotel_id": hotel_id, "radius_km": radius_km, "limit": limit}
+
+    async def compute():
+        data = await fetch_dicts(sql, params, cols, "restaurants_near_hotel")
+        if not data and not await hotel_exists(hotel_id):
+            # raised before anything is cached, so the hotel can still show up
+            raise HTTPException(status_code=404, detail=f"Hotel {hotel_id} not found")
+        return {"hotel_id": hotel_id, "data": data, "count": len(data)}
+
+    try:
+        # the result also depends on the hotel row, so a hotel ingest invalidates it too
+        key = {**params, "fields": cols, "hotels": await result_cache.generation("hotels")}
+        return await cached_response("restaurants", "near_hotel", key, compute)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,219 +1,263 @@
 # api/hotel_api.py
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import Optional
-from app.db.database import get_db_cursor
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.db.async_database import get_async_cursor
+from app.services.api.pagination import (
+    DEFAULT_LIMIT, LIST_DEFAULT_LIMIT, MAX_LIMIT,
+    decode_cursor, estimate_count, exact_count, keyset_clause, next_cursor, order_clause,
+)
+from app.services.api.facets import facet_counts, split_values, tags_clause
+from app.services.api.fields import HOTEL_COLUMNS, HOTEL_PRESETS, HOTEL_SQL, resolve_fields, select_list
+from app.services.api.responses import FastJSONResponse
+from app.services.cache import cached_response
+from app.services.catalog_snapshot import catalog_snapshots
+from app.services.click_buffer import BufferFull, click_buffer
+from app.services.coclick import coclick_model
+from app.services.demand import record_demand
+from app.services.recommender import parse_highlights, recommendation_index
+from app.utils.metrics import query_timer
+import logging
 import os
 
 router = APIRouter()
+log = logging.getLogger(__name__)
+
+# Sort keys, table-qualified: a bare name in ORDER BY would resolve to the
+# rounded output columns of the same name and be ambiguous
+HOTEL_KEYS = ("hotels.rating", "hotels.price_avg", "hotels.id")
 
 class HotelFilter(BaseModel):
     rating_min: float
     rating_max: float
     price_min: Optional[float] = None
     price_max: Optional[float] = None
+    cursor: Optional[str] = None
+    limit: int = Field(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+    include_total: bool = False
+    fields: Optional[str] = None  # e.g. "map", "card", "id,name,rating"
+    city: Optional[str] = None
+    highlights: Optional[List[str]] = None
+    highlights_match: str = Field("all", pattern="^(all|any)$")
+    facets: bool = False  # add highlight counts over the whole result set
 
 class ClickLog(BaseModel):
     session_id: str
     hotel_id: int
 
-@router.post("/hotels/filter")
-def filter_hotels(filters: HotelFilter):
-    sql = """
-        SELECT 
-            id, name, rating, address,
-            price_min, price_max, price_avg,
-            link, lat, lng, city,
-            reviews, phone, detailed_address, ranking,
-            featured_image, highlights, providers
-        FROM hotels
-        WHERE rating >= %s AND rating <= %s
+
+def hotel_where(
+    city: Optional[str], highlights: Optional[List[str]], highlights_match: str, where: str, params: list
+):
+    """Append the optional city and highlight filters to `where`."""
+    params = list(params)
+    if city:
+        where += " AND city = %s"
+        params.append(city)
+    if highlights:
+        clause, tag_params = tags_clause("highlights", highlights, highlights_match)
+        where += clause
+        params += tag_params
+    return where, params
+
+
+async def list_hotels_page(
+    where: str, params: list, cursor: Optional[str], limit: int, include_total: bool, fields: List[str],
+    facets: bool = False,
+):
+    """
+    One keyset page of hotels ordered by (rating DESC, price_avg ASC, id),
+    projected to `fields`.
+
+    The exact total is only counted when asked for; the first page carries a
+    planner estimate instead. `facets` adds highlight counts over every
+    matching row, not just this page.
     """
+    # filter values go untyped, like cursor values, so Postgres compares in the
+    # column's own type and can use its index (a float8 param would cast the column)
+    params = [str(v) if isinstance(v, (int, float)) else v for v in params]
+    where = "deleted_at IS NULL AND " + where
+    from_where = "FROM hotels WHERE " + where
+    # keyset values ride along after the projected columns
+    sql = f"SELECT {select_list(fields, HOTEL_SQL)}, rating, price_avg, id " + from_where
+    page_params = list(params)
+    if cursor:
+        clause, cursor_params = keyset_clause(*HOTEL_KEYS, cursor)
+        sql += clause
+        page_params += cursor_params
+    sql += order_clause(*HOTEL_KEYS)
+    page_params.append(limit + 1)
+
+    total = total_estimate = None
+    async with get_async_cursor() as cur:
+        with query_timer("hotels_page"):
+            await cur.execute(sql, page_params)
+            rows = await cur.fetchall()
+        if include_total:
+            with query_timer("hotels_count"):
+                total = total_estimate = await exact_count(cur, from_where, params)
+        elif not cursor:
+            with query_timer("hotels_estimate"):
+                total_estimate = await estimate_count(cur, from_where, params)
+        facet_values = await facet_counts(cur, "hotels", where, params) if facets else None
+
+    hotels = [dict(zip(fields, row)) for row in rows[:limit]]
+
+    n = len(fields)
+    page = {
+        "data": hotels,
+        "next_cursor": next_cursor(rows, limit, (n, n + 1, n + 2)),
+        "total": total,
+        "total_estimate": total_estimate,
+    }
+    if facets:
+        page["facets"] = {"highlights": facet_values}
+    return page
+
+
+@router.post("/hotels/filter")
+async def filter_hotels(filters: HotelFilter):
+    where = "rating >= %s AND rating <= %s"
     params = [filters.rating_min, filters.rating_max]
 
     if filters.price_min is not None:
-        sql += " AND price_avg >= %s"
+        where += " AND price_avg >= %s"
         params.append(filters.price_min)
     if filters.price_max is not None:
-        sql += " AND price_avg <= %s"
+        where += " AND price_avg <= %s"
         params.append(filters.price_max)
+    where, params = hotel_where(filters.city, filters.highlights, filters.highlights_match, where, params)
+    ranges = [("rating", filters.rating_min, filters.rating_max), ("price_avg", filters.price_min, filters.price_max)]
 
-    count_sql = "SELECT COUNT(*) FROM hotels WHERE " + sql.split("WHERE", 1)[1]
-    sql += " ORDER BY rating DESC, price_avg ASC"
+    if filters.cursor:
+        decode_cursor(filters.cursor)
+    fields = resolve_fields(filters.fields, HOTEL_COLUMNS, HOTEL_PRESETS)
 
-    try:
-        with get_db_cursor() as cursor:
-            cursor.execute(count_sql, params)
-            total = cursor.fetchone()[0]
-
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
-
-            columns = [
-                "id", "name", "rating", "address",
-                "price_min", "price_max", "price_avg",
-                "link", "lat", "lng", "city",
-                "reviews", "phone", "detailed_address", "ranking",
-                "featured_image", "highlights", "providers"
-            ]
-            hotels = [dict(zip(columns, row)) for row in rows]
-
-            # Round rating
-            for h in hotels:
-                h["rating"] = round(h["rating"], 1) if h["rating"] else None
-
-            return {
-                "data": hotels,
-                "total": total
-            }
+    key = {**filters.model_dump(), "fields": fields, "snapshot": catalog_snapshots.version("hotels")}
+
+    async def compute():
+        page = None
+        if not filters.highlights and not filters.facets:
+            page = catalog_snapshots.page(
+                "hotels", ranges, filters.city, filters.cursor, filters.limit, filters.include_total, fields,
+            )
+        if page is None:
+            page = await list_hotels_page(
+                where, params, filters.cursor, filters.limit, filters.include_total, fields, filters.facets
+            )
+        return page
 
+    try:
+        return await cached_response("hotels", "filter", key, compute, city=filters.city)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/api/hotels")
-def get_hotels(
+async def get_hotels(
     min_price: float = Query(0),
     max_price: float = Query(10000),
     min_rating: float = Query(0),
-    max_rating: float = Query(5)
+    max_rating: float = Query(5),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    include_total: bool = Query(False),
+    fields: Optional[str] = Query(None, description="Columns and/or presets: map, card, all"),
+    city: Optional[str] = Query(None),
+    highlights: Optional[str] = Query(None, description="Comma separated, e.g. 'Pool,Spa'"),
+    highlights_match: str = Query("all", pattern="^(all|any)$"),
+    facets: bool = Query(False),
 ):
-    try:
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    id, name, rating, address,
-                    price_min, price_max, price_avg,
-                    link, lat, lng, city,
-                    reviews, phone, detailed_address, ranking,
-                    featured_image, highlights, providers
-                FROM hotels
-                WHERE price_avg >= %s AND price_avg <= %s
-                  AND rating >= %s AND rating <= %s
-            """, (min_price, max_price, min_rating, max_rating))
-
-            rows = cursor.fetchall()
-            columns = [
-                "id", "name", "rating", "address",
-                "price_min", "price_max", "price_avg",
-                "link", "lat", "lng", "city",
-                "reviews", "phone", "detailed_address", "ranking",
-                "featured_image", "highlights", "providers"
-            ]
-            hotels = [dict(zip(columns, row)) for row in rows]
-
-            for h in hotels:
-                h["rating"] = round(h["rating"], 1) if h["rating"] else None
-
-            return {"data": hotels, "total": len(hotels)}
+    if cursor:
+        decode_cursor(cursor)
+    projection = resolve_fields(fields, HOTEL_COLUMNS, HOTEL_PRESETS)
+    tags = split_values(highlights)
+
+    params = [min_price, max_price, min_rating, max_rating]
+    where, params = hotel_where(
+        city, tags, highlights_match,
+        "price_avg >= %s AND price_avg <= %s AND rating >= %s AND rating <= %s", params,
+    )
+    key = {"params": params, "match": highlights_match, "cursor": cursor, "limit": limit,
+           "include_total": include_total, "fields": projection, "facets": facets,
+           "snapshot": catalog_snapshots.version("hotels")}
+
+    async def compute():
+        page = None
+        if not tags and not facets:
+            page = catalog_snapshots.page(
+                "hotels", [("rating", min_rating, max_rating), ("price_avg", min_price, max_price)],
+                city, cursor, limit, include_total, projection,
+            )
+        if page is None:
+            page = await list_hotels_page(where, params, cursor, limit, include_total, projection, facets)
+        return page
 
+    try:
+        return await cached_response("hotels", "list", key, compute, city=city)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.post("/clicks")
-def log_click(click: ClickLog):
-    """Log user click on hotel link"""
+async def log_click(click: ClickLog):
+    """Log user click on hotel link (buffered, written to the DB in bulk)"""
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO user_clicks (session_id, hotel_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                (click.session_id, click.hotel_id)
-            )
-        return {"status": "logged"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        await click_buffer.add(click.session_id, click.hotel_id)
+    except BufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return {"status": "logged"}
+
+
+@router.get("/clicks/stats")
+def click_buffer_stats():
+    return click_buffer.stats()
+
+
+@router.get("/recommend/model")
+def coclick_stats():
+    return coclick_model.stats()
 
 
 @router.get("/recommend")
-def get_recommendations(session_id: str, city: str = "New York", limit: int = 5):
-    import json
-    print(f"\n=== RECOMMEND DEBUG ===")
-    print(f"Session: {session_id} | City: {city}")
+async def get_recommendations(session_id: str, city: str = "New York", limit: int = 5):
+    record_demand("hotels", city)
 
     try:
-        with get_db_cursor() as cursor:
-            # 1. Get ALL clicked hotels (not just 3)
-            cursor.execute("""
-                SELECT DISTINCT h.highlights, h.id, h.name
-                FROM user_clicks uc
-                JOIN hotels h ON uc.hotel_id = h.id
-                WHERE uc.session_id = %s
-            """, (session_id,))
-            clicked_rows = cursor.fetchall()
-            print(f"Clicked hotels: {len(clicked_rows)}")
-
-            if not clicked_rows:
-                return {"recommendations": []}
-
-            clicked_highlights = set()
-            clicked_ids = set()
-            for row in clicked_rows:
-                raw = row[0] or []
-                if isinstance(raw, str):
-                    try: highlights = set(json.loads(raw))
-                    except: highlights = set()
-                else:
-                    highlights = set(raw)
-                clicked_highlights.update(highlights)
-                clicked_ids.add(row[1])
-
-            print(f"Unique highlights: {clicked_highlights}")
-            print(f"Clicked hotel IDs: {clicked_ids}")
-
-            if not clicked_highlights:
-                return {"recommendations": []}
-
-            # 2. Get MORE candidates (remove LIMIT 50)
-            cursor.execute("""
-                SELECT id, name, rating, price_avg, link, featured_image, highlights
-                FROM hotels
-                WHERE city = %s AND highlights IS NOT NULL
-                ORDER BY rating DESC
-                -- LIMIT 200  -- optional: increase if needed
-            """, (city,))
-            all_rows = cursor.fetchall()
-            print(f"Candidate hotels: {len(all_rows)}")
-
-            recs = []
-            for row in all_rows:
-                h_id, name, rating, price_avg, link, image, raw = row
-                if h_id in clicked_ids:
-                    continue  # ← NOW we exclude clicked (optional)
-
-                rating = float(rating) if rating is not None else 0.0
-                price_avg = float(price_avg) if price_avg is not None else 0
-
-                raw = raw or []
-                if isinstance(raw, str):
-                    try: h_highlights = set(json.loads(raw))
-                    except: h_highlights = set()
-                else:
-                    h_highlights = set(raw)
-
-                inter = len(clicked_highlights & h_highlights)
-                if inter == 0:
-                    continue
-
-                union = len(clicked_highlights | h_highlights)
-                score = inter / union
-                rating_boost = max(0, (rating - 4.0) * 0.1)
-                final = score + rating_boost
-
-                recs.append({
-                    "id": h_id,
-                    "name": name,
-                    "rating": round(rating, 1),
-                    "price_avg": int(price_avg),
-                    "link": link,
-                    "featured_image": image,
-                    "similarity_score": round(final, 2),
-                    "matched_highlights": list(clicked_highlights & h_highlights)
-                })
-
-            recs.sort(key=lambda x: x["similarity_score"], reverse=True)
-            print(f"Final recommendations: {len(recs[:limit])}")
-            return {"recommendations": recs[:limit]}
+        async with get_async_cursor() as cursor:
+            with query_timer("recommend_clicked"):
+                # 1. Get ALL clicked hotels (not just 3)
+                await cursor.execute("""
+                    SELECT DISTINCT h.highlights, h.id, h.name
+                    FROM user_clicks uc
+                    JOIN hotels h ON uc.hotel_id = h.id
+                    WHERE uc.session_id = %s
+                """, (session_id,))
+                clicked_rows = await cursor.fetchall()
+
+        if not clicked_rows:
+            return FastJSONResponse({"recommendations": []})
+
+        clicked_highlights = set()
+        clicked_ids = set()
+        for row in clicked_rows:
+            clicked_highlights.update(parse_highlights(row[0]))
+            clicked_ids.add(row[1])
+
+
+        # 2. Hotels other sessions clicked alongside these, from the co-click table
+        coclick = coclick_model.scores(clicked_ids)
+        if not clicked_highlights and not coclick:
+            return FastJSONResponse({"recommendations": []})
+
+        # 3. Rank highlight matches and co-click candidates together
+        index = await recommendation_index.get(city)
+        recs = index.recommend(clicked_highlights, clicked_ids, limit, coclick)
+        log.debug("recommend", extra={
+            "session_id": session_id, "city": city, "clicked": len(clicked_ids),
+            "highlights": len(clicked_highlights), "coclick": len(coclick), "results": len(recs),
+        })
+        return FastJSONResponse({"recommendations": recs})
 
     except Exception as e:
-        print("ERROR:", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        log.exception("recommend failed", extra={"session_id": session_id, "city": city})
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,55 @@
+# api/ingest_api.py
+import os
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.demand import record_demand
+from app.services.jobs import job_manager, job_view
+from app.services.scheduler import scheduler
+
+router = APIRouter()
+
+API_KEY = os.getenv("API_KEY")
+API_HOST = "tripadvisor-scraper.p.rapidapi.com"
+
+
+def _submit_ingest(entity: str, city: str) -> Dict[str, Any]:
+    if not API_KEY:
+        raise HTTPException(status_code=500, detail="Missing API_KEY in environment")
+
+    record_demand(entity, city)
+    job, created = job_manager.submit(entity, city, api_key=API_KEY, api_host=API_HOST)
+    return {
+        "message": f"{'Queued' if created else 'Already ingesting'} {entity} for {city}",
+        "job_id": job["id"],
+        "status": job["status"],
+        "deduplicated": not created,
+    }
+
+@router.get("/hotels", status_code=202)
+async def list_hotels(
+    city: str = Query(..., description="City to search (e.g., 'new york')"),
+) -> Dict[str, Any]:
+    """
+    Queue a background job that fetches all hotel pages for a city and
+    stores them in DB. Poll /jobs/{job_id} for progress.
+    """
+    return _submit_ingest("hotels", city)
+
+@router.get("/restaurants", status_code=202)
+async def list_restaurants(
+    city: str = Query(..., description="City to search (e.g., 'new york')")
+) -> Dict[str, Any]:
+    return _submit_ingest("restaurants", city)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+@router.get("/scheduler")
+def scheduler_stats():
+    return scheduler.stats()
@@ -0,0 +1,62 @@
+# api/ops_api.py
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from app.db.async_database import get_async_pool_stats
+from app.db.database import get_pool_stats
+from app.services.cache import result_cache
+from app.services.catalog_snapshot import catalog_snapshots
+from app.services.response_cache import response_cache
+from app.utils.metrics import CONTENT_TYPE, registry
+from app.utils.profiler import PROFILER_MIN_INTERVAL_MS, profiler
+
+router = APIRouter()
+
+
+@router.get("/db/pool")
+def db_pool_stats():
+    return {"sync": get_pool_stats(), "async": get_async_pool_stats()}
+
+@router.get("/cache/stats")
+def cache_stats():
+    return {**result_cache.stats(), "fetch": response_cache.stats()}
+
+@router.get("/snapshots")
+def snapshot_stats():
+    return catalog_snapshots.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+class ProfilerSettings(BaseModel):
+    enabled: bool
+    interval_ms: Optional[float] = Field(None, ge=PROFILER_MIN_INTERVAL_MS, le=1000)
+    threshold_ms: Optional[float] = Field(None, gt=0)
+    reset: bool = False
+
+@router.get("/debug/profiler")
+def profiler_stats(route: Optional[str] = None, collapsed: bool = False):
+    """Hot stacks of slow requests; collapsed=true returns flamegraph input."""
+    if collapsed:
+        return PlainTextResponse(profiler.collapsed(route))
+    return profiler.stats()
+
+@router.post("/debug/profiler")
+async def configure_profiler(settings: ProfilerSettings):
+    # async so enable() runs on the event loop thread it has to sample
+    if settings.reset:
+        profiler.reset()
+    if settings.enabled:
+        profiler.enable(settings.interval_ms, settings.threshold_ms)
+    else:
+        await run_in_threadpool(profiler.disable)
+    return profiler.stats()
+
+@router.get("/")
+def root():
+    return {"message": "Hotel API is running!"}
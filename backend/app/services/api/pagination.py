@@ -0,0 +1,80 @@
+# api/pagination.py
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_LIMIT = 50
+LIST_DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+def encode_cursor(rating: Any, price: Any, row_id: Any) -> str:
+    # Values are kept as their text form and passed back untyped, so Postgres
+    # casts them to the column type and equality stays exact.
+    values = [None if v is None else str(v) for v in (rating, price, row_id)]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Optional[str]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != 3 or values[0] is None or values[2] is None:
+            raise ValueError
+        # returned as text (see encode_cursor), but they must parse as the key types
+        rating, price, row_id = values
+        float(rating), int(row_id)
+        if price is not None:
+            float(price)
+        return values
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_clause(rating_expr: str, price_expr: str, id_expr: str, cursor: str) -> Tuple[str, list]:
+    """
+    Predicate selecting rows after `cursor` for
+    ORDER BY rating DESC, price ASC NULLS LAST, id ASC.
+    """
+    rating, price, row_id = decode_cursor(cursor)
+    if price is None:
+        sql = (
+            f" AND ({rating_expr} < %s"
+            f" OR ({rating_expr} = %s AND {price_expr} IS NULL AND {id_expr} > %s))"
+        )
+        return sql, [rating, rating, row_id]
+    sql = (
+        f" AND ({rating_expr} < %s"
+        f" OR ({rating_expr} = %s AND ({price_expr} > %s OR {price_expr} IS NULL))"
+        f" OR ({rating_expr} = %s AND {price_expr} = %s AND {id_expr} > %s))"
+    )
+    return sql, [rating, rating, price, rating, price, row_id]
+
+
+def order_clause(rating_expr: str, price_expr: str, id_expr: str) -> str:
+    return f" ORDER BY {rating_expr} DESC, {price_expr} ASC NULLS LAST, {id_expr} ASC LIMIT %s"
+
+
+def next_cursor(rows: Sequence[Sequence], limit: int, key: Tuple[int, int, int]) -> Optional[str]:
+    """Cursor for the page after `rows`; rows were fetched with LIMIT limit + 1."""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last[key[0]], last[key[1]], last[key[2]])
+
+
+async def estimate_count(cursor, from_where: str, params: list) -> int:
+    """Planner row estimate for `SELECT ... <from_where>`; no table scan."""
+    await cursor.execute("EXPLAIN (FORMAT JSON) SELECT 1 " + from_where, params)
+    plan = (await cursor.fetchone())[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def exact_count(cursor, from_where: str, params: list) -> int:
+    await cursor.execute("SELECT COUNT(*) " + from_where, params)
+    return (await cursor.fetchone())[0]
@@ -1,113 +1,214 @@
 # api/restaurant_api.py
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import Optional
-from app.db.database import get_db_cursor
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from app.db.async_database import get_async_cursor
+from app.services.api.facets import facet_counts, split_values, tags_clause
+from app.utils.metrics import query_timer
+from app.services.api.fields import (
+    RESTAURANT_COLUMNS, RESTAURANT_FILTER_SQL, RESTAURANT_PRESETS, RESTAURANT_SQL, resolve_fields,
+    select_list,
+)
+from app.services.cache import cached_response
+from app.services.catalog_snapshot import catalog_snapshots
+from app.services.api.pagination import (
+    DEFAULT_LIMIT, LIST_DEFAULT_LIMIT, MAX_LIMIT,
+    decode_cursor, estimate_count, exact_count, keyset_clause, next_cursor, order_clause,
+)
 
 router = APIRouter()
 
+# restaurants have no stored price_avg; page on the midpoint of the range
+RESTAURANT_PRICE = "(price_min + price_max) / 2.0"
+# table-qualified so ORDER BY doesn't resolve to the rounded output columns
+RESTAURANT_KEYS = ("restaurants.rating", RESTAURANT_PRICE, "restaurants.id")
+
 class RestaurantFilter(BaseModel):
     rating_min: float
     rating_max: float
     price_min: Optional[int] = None  # numeric ($ = 1, $$ = 2...)
     price_max: Optional[int] = None
-    page: int = 1          # default page
-    limit: int = 50 
+    page: int = 1          # legacy OFFSET paging, ignored when cursor is set
+    limit: int = Field(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+    cursor: Optional[str] = None
+    include_total: bool = False
+    fields: Optional[str] = None  # e.g. "map", "card", "id,name,rating"
+    city: Optional[str] = None
+    cuisines: Optional[List[str]] = None  # any of
+    facets: bool = False  # add cuisine counts over the whole result set
+
+
+def restaurant_where(city: Optional[str], cuisines: Optional[List[str]], where: str, params: list):
+    """Append the optional city and cuisine filters to `where`."""
+    params = list(params)
+    if city:
+        where += " AND city = %s"
+        params.append(city)
+    if cuisines:
+        clause, tag_params = tags_clause("cuisines", cuisines, "any")
+        where += clause
+        params += tag_params
+    return where, params
+
+
+async def list_restaurants_page(
+    where: str, params: list, cursor: Optional[str], limit: int, include_total: bool,
+    fields: List[str], offset: int = 0, facets: bool = False, exprs: Dict[str, str] = RESTAURANT_SQL,
+):
+    """
+    One keyset page of restaurants ordered by (rating DESC, price midpoint ASC, id),
+    projected to `fields` with `exprs`. Returns (restaurants, next_cursor, total, total_estimate,
+    facets); facets are cuisine counts over every matching row, or None.
+    """
+    # untyped filter values, see list_hotels_page
+    params = [str(v) if isinstance(v, (int, float)) else v for v in params]
+    where = "deleted_at IS NULL AND " + where
+    from_where = "FROM restaurants WHERE " + where
+    # keyset values ride along after the projected columns
+    sql = f"SELECT {select_list(fields, exprs)}, rating, {RESTAURANT_PRICE}, id " + from_where
+    page_params = list(params)
+    if cursor:
+        clause, cursor_params = keyset_clause(*RESTAURANT_KEYS, cursor)
+        sql += clause
+        page_params += cursor_params
+    sql += order_clause(*RESTAURANT_KEYS)
+    page_params.append(limit + 1)
+    if offset:
+        sql += " OFFSET %s"
+        page_params.append(offset)
+
+    total = total_estimate = None
+    async with get_async_cursor() as cur:
+        with query_timer("restaurants_page"):
+            await cur.execute(sql, page_params)
+            rows = await cur.fetchall()
+        if include_total:
+            with query_timer("restaurants_count"):
+                total = total_estimate = await exact_count(cur, from_where, params)
+        elif not cursor and not offset:
+            with query_timer("restaurants_estimate"):
+                total_estimate = await estimate_count(cur, from_where, params)
+        facet_values = await facet_counts(cur, "restaurants", where, params) if facets else None
+
+    restaurants = [dict(zip(fields, r)) for r in rows[:limit]]
+    n = len(fields)
+    return restaurants, next_cursor(rows, limit, (n, n + 1, n + 2)), total, total_estimate, facet_values
+
 
 @router.post("/restaurants/filter")
-def filter_restaurants(filters: RestaurantFilter):
-
-    sql = """
-        SELECT
-            id, name, rating, reviews, price_range, price_min, price_max, link,
-            lat, lng, city, featured_image, is_sponsored, has_delivery,
-            is_premium, cuisines, menu_link, reservation_link
-        FROM restaurants
-        WHERE rating >= %s AND rating <= %s
-    """
+async def filter_restaurants(filters: RestaurantFilter):
+
+    where = "rating >= %s AND rating <= %s"
     params = [filters.rating_min, filters.rating_max]
 
     if filters.price_min is not None:
-        sql += " AND price_min >= %s"
+        where += " AND price_min >= %s"
         params.append(filters.price_min)
 
     if filters.price_max is not None:
-        sql += " AND price_max <= %s"
+        where += " AND price_max <= %s"
         params.append(filters.price_max)
-
-    sql += " ORDER BY rating DESC LIMIT %s OFFSET %s"
-    offset = (filters.page - 1) * filters.limit
-    params.extend([filters.limit, offset])
+    where, params = restaurant_where(filters.city, filters.cuisines, where, params)
+    ranges = [
+        ("rating", filters.rating_min, filters.rating_max),
+        ("price_min", filters.price_min, None), ("price_max", None, filters.price_max),
+    ]
+
+    offset = 0
+    if filters.cursor:
+        decode_cursor(filters.cursor)
+    else:
+        offset = (max(filters.page, 1) - 1) * filters.limit
+    fields = resolve_fields(filters.fields, RESTAURANT_COLUMNS, RESTAURANT_PRESETS)
+
+    async def compute():
+        snapshot = None
+        if not filters.cuisines and not filters.facets:
+            snapshot = catalog_snapshots.page(
+                "restaurants", ranges, filters.city, filters.cursor, filters.limit, filters.include_total,
+                fields, offset, raw=("rating",),
+            )
+        if snapshot is not None:
+            return {**snapshot, "page": filters.page, "limit": filters.limit}
+
+        restaurants, cursor, total, total_estimate, facet_values = await list_restaurants_page(
+            where, params, filters.cursor, filters.limit, filters.include_total, fields, offset,
+            filters.facets, RESTAURANT_FILTER_SQL,
+        )
+
+        page = {
+            "data": restaurants,
+            "next_cursor": cursor,
+            "total": total,
+            "total_estimate": total_estimate,
+            "page": filters.page,
+            "limit": filters.limit
+        }
+        if filters.facets:
+            page["facets"] = {"cuisines": facet_values}
+        return page
 
     try:
-        with get_db_cursor() as cursor:
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
-
-            columns = [
-                "id", "name", "rating", "reviews", "price_range", "price_min", "price_max",
-                "link", "lat", "lng", "city", "featured_image",
-                "is_sponsored", "has_delivery", "is_premium",
-                "cuisines", "menu_link", "reservation_link"
-            ]
-
-            restaurants = [dict(zip(columns, r)) for r in rows]
-
-            return {
-                "data": restaurants,
-                "total": len(restaurants),
-                "page": filters.page,
-                "limit": filters.limit
-            }
-
+        key = {**filters.model_dump(), "fields": fields, "snapshot": catalog_snapshots.version("restaurants")}
+        return await cached_response("restaurants", "filter", key, compute, city=filters.city)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/api/restaurants")
-def get_restaurants(
+async def get_restaurants(
     min_price: int = Query(1),
     max_price: int = Query(4),
     min_rating: float = Query(0),
     max_rating: float = Query(5),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    include_total: bool = Query(False),
+    fields: Optional[str] = Query(None, description="Columns and/or presets: map, card, all"),
+    city: Optional[str] = Query(None),
+    cuisines: Optional[str] = Query(None, description="Comma separated, any of, e.g. 'Italian,Pizza'"),
+    facets: bool = Query(False),
 ):
-    try:
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                SELECT
-                    id, name, rating, reviews, price_range,
-                    price_min, price_max,
-                    link, lat, lng, city, featured_image,
-                    is_sponsored, has_delivery, is_premium,
-                    cuisines, menu_link, reservation_link
-                FROM restaurants
-                WHERE price_min >= %s AND price_max <= %s
-                  AND rating >= %s AND rating <= %s
-            """, (min_price, max_price, min_rating, max_rating))
-
-            rows = cursor.fetchall()
-            columns = [
-                "id", "name", "rating", "reviews", "price_range",
-                "price_min", "price_max",
-                "link", "lat", "lng", "city", "featured_image",
-                "is_sponsored", "has_delivery", "is_premium",
-                "cuisines", "menu_link", "reservation_link"
-            ]
-
-            restaurants = [dict(zip(columns, row)) for row in rows]
-
-            # Add derived price_avg
-            for r in restaurants:
-                if r["price_min"] and r["price_max"]:
-                    r["price_avg"] = (r["price_min"] + r["price_max"]) / 2
-                else:
-                    r["price_avg"] = None
-
-            # Round ratings
-            for r in restaurants:
-                if r["rating"]:
-                    r["rating"] = round(r["rating"], 1)
-
-            return {"data": restaurants, "total": len(restaurants)}
+    if cursor:
+        decode_cursor(cursor)
+    projection = resolve_fields(fields, RESTAURANT_COLUMNS, RESTAURANT_PRESETS)
+    # Add derived price_avg (computed in SQL)
+    if "price_min" in projection and "price_max" in projection:
+        projection.append("price_avg")
+    cuisine_list = split_values(cuisines)
+    where, params = restaurant_where(
+        city, cuisine_list,
+        "price_min >= %s AND price_max <= %s AND rating >= %s AND rating <= %s",
+        [min_price, max_price, min_rating, max_rating],
+    )
+
+    async def compute():
+        if not cuisine_list and not facets:
+            page = catalog_snapshots.page(
+                "restaurants", [("rating", min_rating, max_rating), ("price_min", min_price, None),
+                                ("price_max", None, max_price)],
+                city, cursor, limit, include_total, projection,
+            )
+            if page is not None:
+                return page
+
+        restaurants, next_page, total, total_estimate, facet_values = await list_restaurants_page(
+            where, params, cursor, limit, include_total, projection, facets=facets,
+        )
+
+        page = {
+            "data": restaurants,
+            "next_cursor": next_page,
+            "total": total,
+            "total_estimate": total_estimate,
+        }
+        if facets:
+            page["facets"] = {"cuisines": facet_values}
+        return page
 
+    try:
+        key = {"params": params, "cursor": cursor, "limit": limit,
+               "include_total": include_total, "fields": projection, "facets": facets,
+               "snapshot": catalog_snapshots.version("restaurants")}
+        return await cached_response("restaurants", "list", key, compute, city=city)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,36 @@
+# api/responses.py
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered straight to bytes with orjson.
+
+    Return it from a handler (rather than a dict) so FastAPI skips
+    jsonable_encoder entirely.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,25 @@
+# api/summary_api.py
+from fastapi import APIRouter, HTTPException, Query
+
+from app.services.api.responses import FastJSONResponse
+from app.services.summaries import SUMMARY_SPECS, get_city_summary
+
+router = APIRouter()
+
+
+@router.get("/api/summary/{entity}")
+async def city_summary(entity: str, city: str = Query(..., description="City as it was ingested")):
+    """
+    Precomputed per-city aggregates: counts, rating / price distributions and
+    percentiles, 0.1-step rating buckets with their cheapest listing, price
+    buckets and a rating x price grid. Refreshed by the ingest.
+    """
+    if entity not in SUMMARY_SPECS:
+        raise HTTPException(status_code=404, detail=f"Unknown entity {entity!r}")
+    try:
+        summary = await get_city_summary(entity, city)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No {entity} ingested for {city!r}")
+    return FastJSONResponse(summary)
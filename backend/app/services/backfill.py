@@ -0,0 +1,160 @@
+# backfill.py
+"""
+Multi-city backfill.
+
+    python -m app.services.backfill "new york" paris --entities hotels,restaurants --workers 4
+    python -m app.services.backfill --cities-file cities.txt --per-host-concurrency 8
+
+Cities are spread over a pool of worker processes; each runs the normal
+streaming ingest (fetch + batched upsert) for one (entity, city) at a time.
+Point TRIPADVISOR_BASE_URL (or --base-url) at benchmarks/mock_tripadvisor.py
+to run it offline, or pass --replay to re-run the ETL from the on-disk
+response cache without any network calls.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+API_HOST = "tripadvisor-scraper.p.rapidapi.com"
+
+
+def _init_worker(env: Dict[str, str]):
+    # Runs before the worker imports the fetch modules, which read their
+    # limits from the environment at import time.
+    os.environ.update(env)
+    from app.utils.log import setup_logging
+
+    setup_logging()
+
+
+def _run_one(entity: str, city: str, api_key: str, batch_size: int, delta: bool) -> Dict[str, Any]:
+    from app.services.ingest import ingest_city
+
+    start = time.perf_counter()
+    try:
+        result = asyncio.run(ingest_city(entity, city, api_key, API_HOST, batch_size=batch_size, delta=delta))
+        error = None
+    except Exception as e:
+        result, error = {}, str(e)
+    return {
+        "entity": entity,
+        "city": city,
+        "pages": result.get("pages_fetched", 0),
+        "rows": result.get("rows_upserted", 0),
+        "changed": result.get("rows_changed", 0),
+        "unchanged_pages": result.get("pages_unchanged", 0),
+        "deleted": result.get("rows_deleted", 0),
+        "restored": result.get("rows_restored", 0),
+        "seconds": time.perf_counter() - start,
+        "error": error,
+    }
+
+
+def publish_snapshots(entities):
+    """
+    One snapshot build per entity for the whole backfill. Workers only
+    request one, and they have no builder running to pick that up.
+    """
+    from app.db.database import pool
+    from app.services.catalog_snapshot import catalog_snapshots
+
+    if not catalog_snapshots.enabled:
+        return
+    try:
+        for entity in sorted(entities):
+            try:
+                print(f"Snapshot {entity}: {catalog_snapshots.publish(entity)}")
+            except Exception as e:
+                print(f"Snapshot {entity}: ERROR {e}")
+    finally:
+        pool.closeall()
+
+
+def read_cities(args) -> List[str]:
+    cities = list(args.cities)
+    if args.cities_file:
+        with open(args.cities_file) as f:
+            cities += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    seen = set()
+    return [c for c in cities if not (c.lower() in seen or seen.add(c.lower()))]
+
+
+def main(argv=None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cities", nargs="*")
+    parser.add_argument("--cities-file")
+    parser.add_argument("--entities", default="hotels,restaurants")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--per-host-concurrency", type=int, default=8,
+                        help="max in-flight API requests across all workers")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("RAPIDAPI_RATE_PER_SEC", "5")),
+                        help="API requests/sec across all workers")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("INGEST_BATCH_SIZE", "500")))
+    parser.add_argument("--base-url", default=os.getenv("TRIPADVISOR_BASE_URL"))
+    parser.add_argument("--api-key", default=os.getenv("API_KEY"))
+    parser.add_argument("--replay", action="store_true", help="only read pages from the response cache")
+    parser.add_argument("--full", action="store_true", help="upsert every page even if it matches the last run")
+    args = parser.parse_args(argv)
+
+    cities = read_cities(args)
+    entities = [e.strip() for e in args.entities.split(",") if e.strip()]
+    if not cities:
+        parser.error("no cities given")
+    if args.replay:
+        args.api_key = args.api_key or "replay"
+    if not args.api_key:
+        parser.error("missing API key (API_KEY or --api-key)")
+
+    # The host limits are global, so each process gets its share
+    workers = max(1, min(args.workers, len(cities) * len(entities)))
+    env = {
+        "FETCH_CONCURRENCY": str(max(1, args.per_host_concurrency // workers)),
+        "RAPIDAPI_RATE_PER_SEC": str(args.rate / workers),
+        "RAPIDAPI_BURST": str(max(1, args.per_host_concurrency // workers)),
+    }
+    if args.base_url:
+        env["TRIPADVISOR_BASE_URL"] = args.base_url
+    # a re-run within FETCH_CACHE_TTL reuses pages instead of asking again
+    env["FETCH_CACHE_MODE"] = "replay" if args.replay else os.getenv("FETCH_CACHE_MODE", "on")
+
+    jobs = [(entity, city) for city in cities for entity in entities]
+    print(f"Backfilling {len(jobs)} (entity, city) pairs on {workers} workers")
+
+    start = time.perf_counter()
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(env,)) as pool:
+        futures = [pool.submit(_run_one, entity, city, args.api_key, args.batch_size, not args.full) for entity, city in jobs]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            status = f"ERROR {r['error']}" if r["error"] else "ok"
+            print(
+                f"  {r['entity']:<12} {r['city']:<24} {r['pages']:>5} pages {r['rows']:>8} rows "
+                f"({r['changed']} changed, {r['deleted']} deleted, {r['restored']} restored, "
+                f"{r['unchanged_pages']} pages unchanged) "
+                f"{r['seconds']:>7.1f}s  {status}"
+            )
+    elapsed = time.perf_counter() - start
+    publish_snapshots({r["entity"] for r in results if not r["error"]})
+
+    pages = sum(r["pages"] for r in results)
+    rows = sum(r["rows"] for r in results)
+    failed = sum(1 for r in results if r["error"])
+    print(
+        f"\nDone in {elapsed:.1f}s: {pages} pages, {rows} rows, {failed} failed | "
+        f"{pages / elapsed:.2f} pages/s, {rows / elapsed:.1f} rows/s"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
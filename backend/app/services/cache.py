@@ -0,0 +1,245 @@
+# cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services.api.responses import FastJSONResponse, dumps
+
+log = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+# e.g. redis://localhost:6379/0 to share one cache between uvicorn workers
+CACHE_URL = os.getenv("CACHE_URL")
+# how often the local backend picks up invalidations made by other processes
+CACHE_SYNC_SEC = float(os.getenv("CACHE_SYNC_SEC", "2"))
+
+
+class LocalBackend:
+    """
+    In-process LRU bounded by total value bytes, with per-entry TTL.
+
+    Entries are per process, but generations are shared through the
+    cache_generations table: bump() increments the row and sync() picks
+    up bumps made elsewhere (backfill, the scheduler, an APP_PROFILE=ingest
+    worker), so those invalidate this cache within CACHE_SYNC_SEC.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str):
+        value, _ = self._entries.pop(key)
+        self.bytes -= len(value)
+
+    async def generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    def bump(self, name: str):
+        from app.db.database import get_db_cursor
+
+        try:
+            with get_db_cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO cache_generations (scope, generation) VALUES (%s, 1)
+                    ON CONFLICT (scope) DO UPDATE SET
+                        generation = cache_generations.generation + 1, updated_at = now()
+                    RETURNING generation
+                """, (name,))
+                shared = cursor.fetchone()[0]
+        except Exception:
+            # the data is committed; other processes just see it at CACHE_TTL
+            log.exception("cache generation bump failed", extra={"scope": name})
+            shared = 0
+        with self._lock:
+            self._generations[name] = max(shared, self._generations.get(name, 0) + 1)
+
+    def sync(self):
+        """Adopt generations bumped by other processes."""
+        from app.db.database import get_db_cursor
+
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT scope, generation FROM cache_generations")
+            rows = cursor.fetchall()
+        with self._lock:
+            for name, generation in rows:
+                if generation > self._generations.get(name, 0):
+                    self._generations[name] = generation
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local", "entries": len(self._entries), "bytes": self.bytes,
+                "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class RedisBackend:
+    """
+    Shared backend for several workers. Needs the optional `redis` package;
+    eviction is left to the server's maxmemory-policy (e.g. allkeys-lru).
+    """
+
+    def __init__(self, url: str):
+        import redis
+        import redis.asyncio
+
+        self._async = redis.asyncio.Redis.from_url(url)
+        # ETL writers invalidate from worker threads, outside the event loop
+        self._sync = redis.Redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._async.get("cache:" + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._async.set("cache:" + key, value, ex=max(1, int(ttl)))
+
+    async def generation(self, name: str) -> int:
+        value = await self._async.get("gen:" + name)
+        return int(value) if value else 0
+
+    def bump(self, name: str):
+        self._sync.incr("gen:" + name)
+
+    def stats(self) -> Dict[str, Any]:
+        info = self._sync.info("stats")
+        return {"backend": "redis", "evictions": info.get("evicted_keys", 0)}
+
+
+class ResultCache:
+    """
+    Response cache for read endpoints, keyed on the normalized query params.
+
+    Keys embed a generation number per entity (for cross-city queries) or
+    per entity and city (for city-scoped ones). An ingest commit bumps both,
+    so stale entries are never served and simply age out of the LRU. With
+    the local backend, an ingest in another process takes effect within
+    CACHE_SYNC_SEC; the Redis backend shares generations immediately.
+    """
+
+    def __init__(self, backend, ttl: float = CACHE_TTL, enabled: bool = CACHE_ENABLED):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.last_sync_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, interval: float = CACHE_SYNC_SEC):
+        """Keep a local backend's generations in step with other processes."""
+        if self.enabled and isinstance(self.backend, LocalBackend):
+            self._task = asyncio.create_task(self._sync(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _sync(self, interval: float):
+        while True:
+            try:
+                await asyncio.to_thread(self.backend.sync)
+            except Exception as e:
+                self.last_sync_error = str(e)
+                log.exception("cache generation sync failed")
+            await asyncio.sleep(interval)
+
+    async def generation(self, entity: str, city: Optional[str] = None) -> int:
+        """Current generation of a scope, for keys that also depend on another entity."""
+        return await self.backend.generation(f"{entity}:{city}" if city is not None else f"{entity}:*")
+
+    async def key(self, entity: str, namespace: str, params: Dict[str, Any], city: Optional[str] = None) -> str:
+        scope = f"{entity}:{city}" if city is not None else f"{entity}:*"
+        gen = await self.backend.generation(scope)
+        raw = json.dumps([namespace, params], sort_keys=True, default=str)
+        return f"{scope}:{gen}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        body = await self.backend.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    async def set(self, key: str, body: bytes):
+        if not self.enabled or len(body) > CACHE_MAX_ENTRY_BYTES:
+            return
+        await self.backend.set(key, body, self.ttl)
+
+    def invalidate(self, entity: str, city: str):
+        """Called after an ingest commit for `city`."""
+        self.backend.bump(f"{entity}:{city}")
+        self.backend.bump(f"{entity}:*")
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "ttl": self.ttl,
+            "last_sync_error": self.last_sync_error,
+            **self.backend.stats(),
+        }
+
+
+async def cached_response(
+    entity: str,
+    namespace: str,
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]],
+    city: Optional[str] = None,
+) -> FastJSONResponse:
+    """Serve `compute()` from the cache, storing the encoded body on a miss."""
+    # Resolve the key before computing so a result that races an ingest is
+    # stored under the pre-ingest generation and never served afterwards.
+    key = await result_cache.key(entity, namespace, params, city)
+    body = await result_cache.get(key)
+    if body is None:
+        body = dumps(await compute())
+        await result_cache.set(key, body)
+    return FastJSONResponse(content=body)
+
+
+result_cache = ResultCache(RedisBackend(CACHE_URL) if CACHE_URL else LocalBackend(CACHE_MAX_BYTES))
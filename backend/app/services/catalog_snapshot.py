@@ -0,0 +1,435 @@
+# catalog_snapshot.py
+"""
+Columnar, memory-mapped snapshots of the live hotel and restaurant rows.
+
+Listings only change when an ingest lands, so an ingest that changed rows
+asks for a new immutable snapshot of its entity under SNAPSHOT_DIR (see
+app/utils/mmap_store.py). The builder in the ingest process coalesces those
+requests, and an advisory lock keeps builds one at a time across
+processes. Each snapshot is one .npy array per column, in listing order
+(rating DESC, price ASC NULLS LAST, id). Numbers are float64 with NaN for
+NULL, ints carry a null mask, text and JSON are one byte buffer plus
+offsets. Filter pages are then boolean masks over the sorted arrays, with
+the same keyset cursors as the SQL path, which stays the fallback for
+anything the snapshot can't answer (tag filters, facets, no snapshot yet).
+
+    python -m app.services.catalog_snapshot [hotels restaurants]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from app.db.database import get_db_cursor, pool
+from app.services.api.fields import HOTEL_COLUMNS, HOTEL_SQL, RESTAURANT_COLUMNS, RESTAURANT_SQL, select_list
+from app.services.api.pagination import decode_cursor, encode_cursor
+from app.utils.log import setup_logging
+from app.utils.metrics import query_timer
+from app.utils.mmap_store import CurrentVersion, current_version, load_arrays, publish, save_arrays, version_ns
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "1") == "1"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", ".snapshots")
+SNAPSHOT_RELOAD_SEC = float(os.getenv("SNAPSHOT_RELOAD_SEC", "2"))
+# how long the builder collects ingest requests before rebuilding
+SNAPSHOT_DEBOUNCE_SEC = float(os.getenv("SNAPSHOT_DEBOUNCE_SEC", "5"))
+SNAPSHOT_FETCH_ROWS = 5000
+# pg_advisory_xact_lock(SNAPSHOT_LOCK_ID, entity key), held while a build runs
+SNAPSHOT_LOCK_ID = 7_301_914
+
+# columns served, the SQL they are shaped with, the price sort key and the
+# raw columns range filters compare against. Sort keys are table-qualified,
+# as in the routers, so they don't resolve to the shaped output columns.
+SNAPSHOT_SPECS = {
+    "hotels": {
+        "columns": HOTEL_COLUMNS,
+        "exprs": HOTEL_SQL,
+        "price": "hotels.price_avg",
+        "ranges": ["rating", "price_avg"],
+    },
+    "restaurants": {
+        # price_avg is derived, see RESTAURANT_SQL
+        "columns": RESTAURANT_COLUMNS + ["price_avg"],
+        "exprs": RESTAURANT_SQL,
+        "price": "(price_min + price_max) / 2.0",
+        "ranges": ["rating", "price_min", "price_max"],
+    },
+}
+
+# Postgres type oids -> storage kind
+INT_TYPES = {20, 21, 23}
+FLOAT_TYPES = {700, 701, 1700}
+BOOL_TYPES = {16}
+JSON_TYPES = {114, 3802}
+
+
+def _column_kind(type_code: int) -> str:
+    if type_code in INT_TYPES:
+        return "int"
+    if type_code in FLOAT_TYPES:
+        return "float"
+    if type_code in BOOL_TYPES:
+        return "bool"
+    if type_code in JSON_TYPES:
+        return "json"
+    return "text"
+
+
+class ColumnBuilder:
+    """Accumulates one column's values and writes its arrays."""
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.values: List[Any] = []
+
+    def append(self, value):
+        if value is not None and self.kind in ("text", "json"):
+            # JSON is stored compact, the way the response encoder writes it
+            value = orjson.dumps(value) if self.kind == "json" else str(value).encode()
+        self.values.append(value)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        name, values = self.name, self.values
+        nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+        if self.kind == "float":
+            return {name: np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)}
+        if self.kind == "bool":
+            return {name: np.array([-1 if v is None else int(v) for v in values], dtype=np.int8)}
+        if self.kind == "int":
+            data = np.array([0 if v is None else v for v in values], dtype=np.int64)
+            return {name: data, f"{name}.nulls": nulls}
+        lengths = np.fromiter((0 if v is None else len(v) for v in values), dtype=np.int64, count=len(values))
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        data = np.frombuffer(b"".join(v for v in values if v is not None), dtype=np.uint8)
+        return {f"{name}.data": data, f"{name}.offsets": offsets, f"{name}.nulls": nulls}
+
+
+def array_names(kind: str, name: str) -> List[str]:
+    if kind in ("float", "bool"):
+        return [name]
+    if kind == "int":
+        return [name, f"{name}.nulls"]
+    return [f"{name}.data", f"{name}.offsets", f"{name}.nulls"]
+
+
+def build_snapshot(entity: str, path: str, cursor) -> int:
+    """Write the entity's live rows, in listing order, as arrays under `path`; returns the row count."""
+    spec = SNAPSHOT_SPECS[entity]
+    ranges = ", ".join(f"({c})::float8" for c in spec["ranges"])
+    sql = f"""
+        SELECT {select_list(spec["columns"], spec["exprs"])},
+               ({spec["price"]})::float8, {ranges}
+        FROM {entity}
+        WHERE deleted_at IS NULL
+        ORDER BY {entity}.rating DESC, {spec["price"]} ASC NULLS LAST, {entity}.id ASC
+    """
+    n_cols = len(spec["columns"])
+    with query_timer(f"{entity}_snapshot"):
+        # server-side cursor, so the rows stream in batches
+        named = cursor.connection.cursor(name=f"{entity}_snapshot")
+        named.execute(sql)
+        rows = named.fetchmany(SNAPSHOT_FETCH_ROWS)
+        # a named cursor only has a description after the first fetch
+        kinds = [_column_kind(d.type_code) for d in named.description[:n_cols]]
+        builders = [ColumnBuilder(c, k) for c, k in zip(spec["columns"], kinds)]
+        keys: List[List[float]] = [[] for _ in range(1 + len(spec["ranges"]))]
+        while rows:
+            for row in rows:
+                for builder, value in zip(builders, row):
+                    builder.append(value)
+                for values, value in zip(keys, row[n_cols:]):
+                    values.append(np.nan if value is None else value)
+            rows = named.fetchmany(SNAPSHOT_FETCH_ROWS)
+        named.close()
+
+    arrays: Dict[str, np.ndarray] = {}
+    for builder in builders:
+        arrays.update(builder.arrays())
+    arrays["_price"] = np.array(keys[0], dtype=np.float64)
+    for col, values in zip(spec["ranges"], keys[1:]):
+        arrays[f"_range.{col}"] = np.array(values, dtype=np.float64)
+
+    # city codes index a sorted list of names; -1 for rows without a city
+    city = builders[spec["columns"].index("city")].values
+    cities = sorted({c.decode() for c in city if c is not None})
+    codes = {c: i for i, c in enumerate(cities)}
+    arrays["_city"] = np.array([-1 if c is None else codes[c.decode()] for c in city], dtype=np.int32)
+
+    os.makedirs(path)
+    save_arrays(path, arrays)
+    meta = {
+        "entity": entity,
+        "rows": len(city),
+        "columns": dict(zip(spec["columns"], kinds)),
+        "ranges": spec["ranges"],
+        "cities": cities,
+        "built_at": time.time(),
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return len(city)
+
+
+class CatalogSnapshot:
+    """One loaded snapshot version; every array is a read-only memory map."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.rows: int = self.meta["rows"]
+        self.kinds: Dict[str, str] = self.meta["columns"]
+        self.city_codes = {c: i for i, c in enumerate(self.meta["cities"])}
+        names = ["_price", "_city"] + [f"_range.{c}" for c in self.meta["ranges"]]
+        for col, kind in self.kinds.items():
+            names += array_names(kind, col)
+        self.arrays = load_arrays(path, names)
+        self.ids = self.arrays["id"]
+
+    def match(self, ranges: Sequence[Tuple[str, Any, Any]], city: Optional[str]) -> np.ndarray:
+        """
+        Row mask for `ranges` (column, min, max; None = unbounded) and the
+        city. NaN compares false, like NULL in SQL.
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        if city:
+            code = self.city_codes.get(city)
+            if code is None:
+                return np.zeros(self.rows, dtype=bool)
+            mask &= self.arrays["_city"] == code
+        for col, lo, hi in ranges:
+            values = self.arrays[f"_range.{col}"]
+            if lo is not None:
+                mask &= values >= float(lo)
+            if hi is not None:
+                mask &= values <= float(hi)
+        return mask
+
+    def after(self, cursor: str) -> np.ndarray:
+        """Rows after `cursor` in listing order, as in pagination.keyset_clause."""
+        rating_raw, price_raw, id_raw = decode_cursor(cursor)
+        rating, ids, price = self.arrays["_range.rating"], self.ids, self.arrays["_price"]
+        r, row_id = float(rating_raw), int(id_raw)
+        same = rating == r
+        if price_raw is None:
+            return (rating < r) | (same & np.isnan(price) & (ids > row_id))
+        p = float(price_raw)
+        return (rating < r) | (same & ((price > p) | np.isnan(price))) | (same & (price == p) & (ids > row_id))
+
+    def column(self, name: str, rows: np.ndarray) -> List[Any]:
+        """Values of one column for `rows`, as the SQL path would return them."""
+        kind = self.kinds[name]
+        if kind == "float":
+            values = self.arrays[name][rows]
+            return [None if v != v else v for v in values.tolist()]
+        if kind == "bool":
+            return [None if v < 0 else bool(v) for v in self.arrays[name][rows].tolist()]
+        nulls = self.arrays[f"{name}.nulls"][rows].tolist()
+        if kind == "int":
+            return [None if null else v for v, null in zip(self.arrays[name][rows].tolist(), nulls)]
+        data, offsets = self.arrays[f"{name}.data"], self.arrays[f"{name}.offsets"]
+        starts, ends = offsets[rows].tolist(), offsets[rows + 1].tolist()
+        if kind == "json":
+            return [None if null else orjson.loads(data[s:e].tobytes()) for s, e, null in zip(starts, ends, nulls)]
+        return [None if null else data[s:e].tobytes().decode() for s, e, null in zip(starts, ends, nulls)]
+
+    def page(
+        self, ranges: Sequence[Tuple[str, Any, Any]], city: Optional[str], cursor: Optional[str],
+        limit: int, include_total: bool, fields: List[str], offset: int = 0, raw: Sequence[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        One listing page, shaped like list_hotels_page(). Fields in `raw`
+        are served unshaped, from their range filter column.
+        """
+        mask = self.match(ranges, city)
+        # counts cover the whole result set, not what is left after the cursor
+        count = int(np.count_nonzero(mask))
+        if cursor:
+            mask &= self.after(cursor)
+        matched = np.flatnonzero(mask)
+        rows = matched[offset:offset + limit + 1]
+        shown = rows[:limit]
+
+        columns = [
+            [None if v != v else v for v in self.arrays[f"_range.{f}"][shown].tolist()] if f in raw
+            else self.column(f, shown)
+            for f in fields
+        ]
+        data = [dict(zip(fields, values)) for values in zip(*columns)] if fields else [{} for _ in shown]
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = shown[-1]
+            price = float(self.arrays["_price"][last])
+            next_cursor = encode_cursor(
+                repr(float(self.arrays["_range.rating"][last])),
+                None if price != price else repr(price),
+                int(self.ids[last]),
+            )
+        # the count is exact for free; keep the SQL path's shape otherwise
+        total = count if include_total else None
+        total_estimate = count if include_total or not (cursor or offset) else None
+        return {"data": data, "next_cursor": next_cursor, "total": total, "total_estimate": total_estimate}
+
+
+class CatalogSnapshots:
+    """
+    Current snapshot per entity. Every process maps whatever version
+    SNAPSHOT_DIR/<entity>/current points to. Ingests call request(), and
+    the builder started by start() publishes a new version at most every
+    SNAPSHOT_DEBOUNCE_SEC for whatever was requested meanwhile.
+    """
+
+    def __init__(self, root: str = SNAPSHOT_DIR, enabled: bool = SNAPSHOT_ENABLED):
+        self.root = root
+        self.enabled = enabled
+        self.current = {
+            entity: CurrentVersion(os.path.join(root, entity), CatalogSnapshot, SNAPSHOT_RELOAD_SEC)
+            for entity in SNAPSHOT_SPECS
+        }
+        self._lock = threading.Lock()
+        self._build_locks = {entity: threading.Lock() for entity in SNAPSHOT_SPECS}
+        # entity -> time.time_ns() of the latest request not built yet
+        self._requested: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.fallbacks = 0
+        self.builds = 0
+        self.coalesced = 0
+        self.last_build_ms: Dict[str, float] = {}
+        self.last_error: Optional[str] = None
+
+    def get(self, entity: str) -> Optional[CatalogSnapshot]:
+        return self.current[entity].get() if self.enabled else None
+
+    def version(self, entity: str) -> Optional[str]:
+        """Part of cache keys, so results computed from an older snapshot are never served."""
+        return self.current[entity].version if self.get(entity) is not None else None
+
+    def page(self, entity: str, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        """CatalogSnapshot.page() on the current snapshot, or None to fall back to Postgres."""
+        snapshot = self.get(entity)
+        if snapshot is None:
+            self.fallbacks += 1
+            return None
+        self.hits += 1
+        return snapshot.page(*args, **kwargs)
+
+    def request(self, entity: str):
+        """Ask for a snapshot that includes everything committed so far."""
+        if self.enabled:
+            with self._lock:
+                self._requested[entity] = time.time_ns()
+
+    def publish(self, entity: str, requested_ns: Optional[int] = None) -> str:
+        """
+        Build and publish a snapshot of `entity`, one build per entity at a
+        time across processes. With `requested_ns`, nothing is built if the
+        current version was started after it, since it already has every
+        row committed by then. Returns the current version.
+        """
+        root = os.path.join(self.root, entity)
+        with self._build_locks[entity], get_db_cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, %s)", (SNAPSHOT_LOCK_ID, list(SNAPSHOT_SPECS).index(entity)),
+            )
+            current = current_version(root)
+            if requested_ns is not None and current is not None and version_ns(current) > requested_ns:
+                self.coalesced += 1
+                return current
+
+            start = time.perf_counter()
+            rows = 0
+
+            def write(path):
+                nonlocal rows
+                rows = build_snapshot(entity, path, cursor)
+
+            version = publish(root, write)
+        self.current[entity].expire()
+        self.builds += 1
+        self.last_build_ms[entity] = round((time.perf_counter() - start) * 1000, 1)
+        log.info("snapshot published", extra={
+            "entity": entity, "version": version, "rows": rows, "build_ms": self.last_build_ms[entity],
+        })
+        return version
+
+    async def start(self):
+        """Run the builder; entities without any snapshot yet are built on its first tick."""
+        if not self.enabled:
+            return
+        for entity in SNAPSHOT_SPECS:
+            if current_version(os.path.join(self.root, entity)) is None:
+                self.request(entity)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_DEBOUNCE_SEC)
+            with self._lock:
+                requested, self._requested = self._requested, {}
+            for entity, requested_ns in requested.items():
+                try:
+                    await asyncio.to_thread(self.publish, entity, requested_ns)
+                except Exception as e:
+                    self.last_error = str(e)
+                    log.exception("snapshot publish failed", extra={"entity": entity})
+                    with self._lock:
+                        self._requested[entity] = max(requested_ns, self._requested.get(entity, 0))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        entities = {}
+        for entity, current in self.current.items():
+            snapshot = current.get()
+            entities[entity] = {
+                "version": current.version,
+                "rows": snapshot.rows if snapshot is not None else 0,
+                "cities": len(snapshot.city_codes) if snapshot is not None else 0,
+                "built_at": snapshot.meta["built_at"] if snapshot is not None else None,
+                "last_build_ms": self.last_build_ms.get(entity),
+            }
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "builds": self.builds,
+            "coalesced": self.coalesced,
+            "pending": sorted(self._requested),
+            "running": self._task is not None,
+            "last_error": self.last_error,
+            **entities,
+        }
+
+
+catalog_snapshots = CatalogSnapshots()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entities", nargs="*", help=f"any of {', '.join(SNAPSHOT_SPECS)} (default: all)")
+    args = parser.parse_args()
+    unknown = set(args.entities) - set(SNAPSHOT_SPECS)
+    if unknown:
+        parser.error(f"unknown entity: {', '.join(sorted(unknown))}")
+    setup_logging()
+    try:
+        for entity in args.entities or SNAPSHOT_SPECS:
+            print(f"{entity}: {catalog_snapshots.publish(entity)}")
+    finally:
+        pool.closeall()
@@ -0,0 +1,329 @@
+# click_buffer.py
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg
+
+from app.db.async_database import get_async_cursor
+from app.utils.metrics import query_timer
+
+log = logging.getLogger(__name__)
+
+CLICK_BUFFER_MAX = int(os.getenv("CLICK_BUFFER_MAX", "100000"))
+CLICK_FLUSH_ROWS = int(os.getenv("CLICK_FLUSH_ROWS", "5000"))
+CLICK_FLUSH_MS = int(os.getenv("CLICK_FLUSH_MS", "200"))
+CLICK_ENQUEUE_TIMEOUT = float(os.getenv("CLICK_ENQUEUE_TIMEOUT", "1.0"))
+# statement_timeout for each flush statement; bounds how long a flush
+# transaction stays open, which COCLICK_LAG_SEC (coclick.py) relies on
+CLICK_FLUSH_TIMEOUT_SEC = float(os.getenv("CLICK_FLUSH_TIMEOUT_SEC", "5"))
+# Optional append-only journal so buffered clicks survive a crash. Each
+# process journals to "<path>.<pid>", so workers sharing the path don't collide.
+CLICK_BUFFER_PATH = os.getenv("CLICK_BUFFER_PATH")
+# JSON lines of clicks Postgres rejected, with the error, for inspection
+CLICK_DEAD_LETTER_PATH = os.getenv("CLICK_DEAD_LETTER_PATH", "click_dead_letter.jsonl")
+
+# worth retrying the whole batch later: connection loss, pool timeouts,
+# statement timeouts, serialization failures (all psycopg.OperationalError)
+TRANSIENT_ERRORS = (psycopg.OperationalError, asyncio.TimeoutError)
+
+
+# SET LOCAL, which can't take a bound parameter
+_STATEMENT_TIMEOUT = "SELECT set_config('statement_timeout', %s, true)"
+
+
+class BufferFull(Exception):
+    pass
+
+
+class ClickBuffer:
+    """
+    Write-behind buffer for POST /clicks.
+
+    Clicks are appended in memory and written in bulk (COPY into a temp
+    table, then one INSERT ... ON CONFLICT DO NOTHING) every `flush_ms` or
+    every `flush_rows` clicks, whichever comes first. When `max_rows` are
+    pending, add() waits up to `enqueue_timeout` for a flush before raising
+    BufferFull.
+
+    A batch that fails on a transient error is retried whole. Any other
+    error means some row is bad, so the batch is written row by row and
+    rows Postgres still rejects go to the dead-letter file.
+
+    With a journal, each process appends to its own "<journal_path>.<pid>"
+    file. On start, journals left by processes that are no longer running
+    are claimed (renamed, so only one worker gets each) and their clicks
+    re-queued.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = CLICK_BUFFER_MAX,
+        flush_rows: int = CLICK_FLUSH_ROWS,
+        flush_ms: int = CLICK_FLUSH_MS,
+        enqueue_timeout: float = CLICK_ENQUEUE_TIMEOUT,
+        journal_path: Optional[str] = CLICK_BUFFER_PATH,
+        dead_letter_path: str = CLICK_DEAD_LETTER_PATH,
+    ):
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_ms = flush_ms
+        self.enqueue_timeout = enqueue_timeout
+        self.journal_path = journal_path
+        self.dead_letter_path = dead_letter_path
+        self._rows: List[Tuple[str, int]] = []
+        self._journal = None
+        self._journal_live: Optional[str] = None
+        # rotated journals holding rows that are pending again after a failed flush
+        self._flushing: List[str] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.accepted = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.rows_flushed = 0
+        self.rows_dead = 0
+        self.batch_max = 0
+        self.flush_ms_total = 0.0
+        self.flush_ms_max = 0.0
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        if self.journal_path:
+            self._journal_live = f"{self.journal_path}.{os.getpid()}"
+            self._replay_journals()
+            self._journal = open(self._journal_live, "a", buffering=1)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # let the loop finish the flush it may be in rather than cancel it
+            self._stopping.set()
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            if not self._rows:
+                os.remove(self._journal_live)
+        self._journal_live: Optional[str] = None
+
+    async def add(self, session_id: str, hotel_id: int):
+        if len(self._rows) >= self.max_rows:
+            self._wake.set()
+            try:
+                async with self._space:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: len(self._rows) < self.max_rows),
+                        self.enqueue_timeout,
+                    )
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise BufferFull("click buffer is full")
+
+        self._rows.append((session_id, hotel_id))
+        if self._journal is not None:
+            self._journal.write(json.dumps([session_id, hotel_id]) + "\n")
+        self.accepted += 1
+        if len(self._rows) >= self.flush_rows:
+            self._wake.set()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._rows:
+                return
+            rows, self._rows = self._rows, []
+            flushing = self._rotate_journal()
+            if flushing:
+                self._flushing.append(flushing)
+
+            start = time.perf_counter()
+            rejected = []
+            try:
+                with query_timer("clicks_flush"):
+                    try:
+                        await self._write(rows)
+                    except TRANSIENT_ERRORS:
+                        raise
+                    except Exception as e:
+                        self.flush_errors += 1
+                        self.last_error = str(e)
+                        rejected = await self._write_each(rows)
+                        self._dead_letter(rejected)
+            except TRANSIENT_ERRORS as e:
+                # keep the batch for the next tick; its journals stay too
+                self._rows = rows + self._rows
+                self.flush_errors += 1
+                self.last_error = str(e)
+                return
+            except asyncio.CancelledError:
+                # same for a flush cancelled mid-write, e.g. by a request timeout
+                self._rows = rows + self._rows
+                raise
+            elapsed = (time.perf_counter() - start) * 1000
+
+            # every pending row is now committed or dead-lettered
+            for path in self._flushing:
+                os.remove(path)
+            self._flushing = []
+            self.flushes += 1
+            self.rows_flushed += len(rows) - len(rejected)
+            self.batch_max = max(self.batch_max, len(rows))
+            self.flush_ms_total += elapsed
+            self.flush_ms_max = max(self.flush_ms_max, elapsed)
+
+        async with self._space:
+            self._space.notify_all()
+
+    @staticmethod
+    async def _write(rows: List[Tuple[str, int]]):
+        async with get_async_cursor() as cursor:
+            await cursor.execute(_STATEMENT_TIMEOUT, (f"{CLICK_FLUSH_TIMEOUT_SEC}s",))
+            await cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS click_stage (
+                    session_id TEXT, hotel_id BIGINT
+                ) ON COMMIT DELETE ROWS
+            """)
+            async with cursor.copy("COPY click_stage (session_id, hotel_id) FROM STDIN") as copy:
+                for row in rows:
+                    await copy.write_row(row)
+            await cursor.execute("""
+                INSERT INTO user_clicks (session_id, hotel_id)
+                SELECT session_id, hotel_id FROM click_stage
+                ON CONFLICT DO NOTHING
+            """)
+
+    @staticmethod
+    async def _write_each(rows: List[Tuple[str, int]]) -> List[Tuple[Tuple[str, int], str]]:
+        """Insert rows one transaction each; returns the (row, error) pairs Postgres rejected."""
+        rejected = []
+        async with get_async_cursor() as cursor:
+            for row in rows:
+                try:
+                    async with cursor.connection.transaction():
+                        await cursor.execute(_STATEMENT_TIMEOUT, (f"{CLICK_FLUSH_TIMEOUT_SEC}s",))
+                        await cursor.execute(
+                            "INSERT INTO user_clicks (session_id, hotel_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                            row,
+                        )
+                except TRANSIENT_ERRORS:
+                    raise
+                except Exception as e:
+                    rejected.append((row, str(e).strip()))
+        return rejected
+
+    def _dead_letter(self, rejected: List[Tuple[Tuple[str, int], str]]):
+        if not rejected:
+            return
+        self.rows_dead += len(rejected)
+        lines = [
+            json.dumps({"session_id": session_id, "hotel_id": hotel_id, "error": error, "at": time.time()})
+            for (session_id, hotel_id), error in rejected
+        ]
+        try:
+            with open(self.dead_letter_path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError:
+            # the good rows are committed, so don't retry the batch; keep the rest in the log
+            log.exception("click dead-letter write failed", extra={"rejected": lines})
+            return
+        log.warning("clicks dead-lettered", extra={"rows": len(rejected), "path": self.dead_letter_path})
+
+    def _rotate_journal(self) -> Optional[str]:
+        """Move the live journal aside so it can be deleted once its rows are committed."""
+        if self._journal is None:
+            return None
+        self._journal.close()
+        flushing = f"{self._journal_live}.{time.time_ns()}.flushing"
+        os.replace(self._journal_live, flushing)
+        self._journal = open(self._journal_live, "a", buffering=1)
+        return flushing
+
+    def _orphaned_journals(self) -> List[str]:
+        """Journals (live or rotated) whose owning process is gone, oldest first."""
+        pattern = re.compile(re.escape(os.path.basename(self.journal_path)) + r"\.(\d+)(\.\d+\.flushing)?")
+        orphans = []
+        for path in glob.glob(f"{glob.escape(self.journal_path)}.*"):
+            match = pattern.fullmatch(os.path.basename(path))
+            if match is None:
+                continue
+            pid = int(match.group(1))
+            # our own pid can only be a previous process's (pids repeat across container restarts)
+            if pid == os.getpid() or not _pid_alive(pid):
+                orphans.append((match.group(2) is None, path))
+        # rotated journals were written before their process's live one
+        return [path for _, path in sorted(orphans)]
+
+    def _replay_journals(self):
+        """Re-queue clicks journaled by processes that exited without flushing them."""
+        for path in self._orphaned_journals():
+            # claim the file first: another worker starting now may be replaying too
+            claimed = f"{self._journal_live}.{time.time_ns()}.flushing"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed) as f:
+                for line in f:
+                    try:
+                        session_id, hotel_id = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    self._rows.append((session_id, hotel_id))
+            # dropped once these rows are committed, like a rotated journal
+            self._flushing.append(claimed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._rows),
+            "max_rows": self.max_rows,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "rows_flushed": self.rows_flushed,
+            "rows_dead": self.rows_dead,
+            "batch_avg": round(self.rows_flushed / self.flushes, 1) if self.flushes else 0.0,
+            "batch_max": self.batch_max,
+            "flush_ms_avg": round(self.flush_ms_total / self.flushes, 2) if self.flushes else 0.0,
+            "flush_ms_max": round(self.flush_ms_max, 2),
+            "last_error": self.last_error,
+        }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+click_buffer = ClickBuffer()
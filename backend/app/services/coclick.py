@@ -0,0 +1,299 @@
+# coclick.py
+"""
+Item-item co-click model for /recommend.
+
+Two hotels co-occur when the same session clicked both. Pair counts live
+in coclick_pairs / coclick_items and are advanced incrementally from
+user_clicks past a click-id watermark, so each update only touches the
+sessions that clicked since the last one. From those counts the top-k
+cosine neighbours of every hotel are published as .npy arrays under
+COCLICK_DIR and served memory-mapped; /recommend sums the neighbour lists
+of the clicked hotels, which costs O(k x clicked hotels).
+
+Runs inside the API (COCLICK_ENABLED=1) or offline:
+
+    python -m app.services.coclick            # apply new clicks, publish
+    python -m app.services.coclick --rebuild  # retrain from all of user_clicks
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from app.db.database import get_db_cursor, pool
+from app.utils.log import setup_logging
+from app.utils.metrics import query_timer
+from app.utils.mmap_store import CurrentVersion, current_version, load_arrays, publish, save_arrays
+
+log = logging.getLogger(__name__)
+
+COCLICK_ENABLED = os.getenv("COCLICK_ENABLED", "1") == "1"
+COCLICK_DIR = os.getenv("COCLICK_DIR", ".coclick")
+COCLICK_TOP_K = int(os.getenv("COCLICK_TOP_K", "20"))
+# pairs seen in fewer sessions than this are left out of the neighbour table
+COCLICK_MIN_SESSIONS = int(os.getenv("COCLICK_MIN_SESSIONS", "2"))
+COCLICK_INTERVAL = float(os.getenv("COCLICK_INTERVAL", "60"))
+# Only clicks older than this are consumed, so a flush that commits late
+# can't end up below the watermark. clicked_at is the flush transaction's
+# start, and a flush runs three statements each capped at
+# CLICK_FLUSH_TIMEOUT_SEC (click_buffer.py, default 5s), so keep this
+# comfortably above three times that.
+COCLICK_LAG_SEC = float(os.getenv("COCLICK_LAG_SEC", "30"))
+# how often a worker checks whether another process published a new table
+COCLICK_RELOAD_SEC = float(os.getenv("COCLICK_RELOAD_SEC", "5"))
+# pg_advisory_xact_lock key, so only one process advances the counts
+COCLICK_LOCK_ID = 7_301_913
+
+ARRAYS = ("ids", "indptr", "neighbours", "scores")
+
+
+class NeighbourTable:
+    """
+    Top-k neighbours in CSR layout: the neighbours of ids[i] are
+    neighbours[indptr[i]:indptr[i + 1]], best first, with their scores.
+    """
+
+    def __init__(self, ids, indptr, neighbours, scores):
+        self.ids = ids
+        self.indptr = indptr
+        self.neighbours = neighbours
+        self.scores = scores
+
+    @classmethod
+    def load(cls, path: str) -> "NeighbourTable":
+        return cls(**load_arrays(path, ARRAYS))
+
+    def save(self, path: str):
+        os.makedirs(path)
+        save_arrays(path, {name: getattr(self, name) for name in ARRAYS})
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def neighbours_of(self, hotel_id: int):
+        i = int(np.searchsorted(self.ids, hotel_id))
+        if i == len(self.ids) or self.ids[i] != hotel_id:
+            return (), ()
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.neighbours[start:end].tolist(), self.scores[start:end].tolist()
+
+
+def apply_new_clicks(lag_sec: float = COCLICK_LAG_SEC) -> int:
+    """
+    Fold clicks past the watermark into the pair and item counts; returns
+    the number of new (session, hotel) pairs, or -1 if another process
+    holds the lock.
+
+    A session's hotel counts once per pair: a newly clicked hotel pairs
+    with everything the session clicked before it and with the other new
+    ones (once per unordered pair).
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (COCLICK_LOCK_ID,))
+        if not cursor.fetchone()[0]:
+            return -1
+        cursor.execute("SELECT last_click_id FROM coclick_state FOR UPDATE")
+        start = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT id FROM user_clicks
+            WHERE clicked_at < now() - make_interval(secs => %s)
+            ORDER BY id DESC LIMIT 1
+        """, (lag_sec,))
+        row = cursor.fetchone()
+        end = row[0] if row else start
+        if end <= start:
+            return 0
+
+        with query_timer("coclick_update"):
+            cursor.execute("""
+                CREATE TEMP TABLE coclick_new ON COMMIT DROP AS
+                SELECT DISTINCT n.session_id, n.hotel_id
+                FROM user_clicks n
+                WHERE n.id > %(start)s AND n.id <= %(end)s
+                  AND n.session_id IS NOT NULL AND n.hotel_id IS NOT NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM user_clicks o
+                      WHERE o.session_id = n.session_id AND o.hotel_id = n.hotel_id AND o.id <= %(start)s
+                  )
+            """, {"start": start, "end": end})
+            fresh = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO coclick_items (hotel_id, sessions)
+                SELECT hotel_id, count(*) FROM coclick_new GROUP BY hotel_id
+                ON CONFLICT (hotel_id) DO UPDATE SET sessions = coclick_items.sessions + EXCLUDED.sessions
+            """)
+            cursor.execute("""
+                WITH seen AS (
+                    SELECT DISTINCT uc.session_id, uc.hotel_id
+                    FROM user_clicks uc
+                    WHERE uc.id <= %(end)s
+                      AND uc.session_id IN (SELECT session_id FROM coclick_new)
+                )
+                INSERT INTO coclick_pairs (hotel_a, hotel_b, sessions)
+                SELECT least(n.hotel_id, s.hotel_id), greatest(n.hotel_id, s.hotel_id), count(*)
+                FROM coclick_new n
+                JOIN seen s ON s.session_id = n.session_id AND s.hotel_id <> n.hotel_id
+                LEFT JOIN coclick_new sn ON sn.session_id = s.session_id AND sn.hotel_id = s.hotel_id
+                WHERE sn.hotel_id IS NULL OR s.hotel_id > n.hotel_id
+                GROUP BY 1, 2
+                ON CONFLICT (hotel_a, hotel_b) DO UPDATE SET sessions = coclick_pairs.sessions + EXCLUDED.sessions
+            """, {"end": end})
+            cursor.execute(
+                "UPDATE coclick_state SET last_click_id = %s, updated_at = now()", (end,)
+            )
+    log.info("co-clicks applied", extra={"from_id": start, "to_id": end, "new_pairs": fresh})
+    return fresh
+
+
+def reset_counts():
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (COCLICK_LOCK_ID,))
+        cursor.execute("TRUNCATE coclick_items, coclick_pairs")
+        cursor.execute("UPDATE coclick_state SET last_click_id = 0, updated_at = now()")
+
+
+def build_table(top_k: int = COCLICK_TOP_K, min_sessions: int = COCLICK_MIN_SESSIONS) -> NeighbourTable:
+    """
+    Top-k neighbours by cosine similarity of the hotels' session vectors,
+    sessions(a, b) / sqrt(sessions(a) * sessions(b)); ranked in SQL so only
+    k rows per hotel leave the database.
+    """
+    with get_db_cursor() as cursor, query_timer("coclick_build"):
+        cursor.execute("""
+            WITH scored AS (
+                SELECT p.hotel_a, p.hotel_b,
+                       p.sessions / sqrt(a.sessions::float8 * b.sessions) AS score
+                FROM coclick_pairs p
+                JOIN coclick_items a ON a.hotel_id = p.hotel_a
+                JOIN coclick_items b ON b.hotel_id = p.hotel_b
+                WHERE p.sessions >= %(min)s
+            ),
+            directed AS (
+                SELECT hotel_a AS src, hotel_b AS dst, score FROM scored
+                UNION ALL
+                SELECT hotel_b, hotel_a, score FROM scored
+            )
+            SELECT src, dst, score FROM (
+                SELECT src, dst, score,
+                       row_number() OVER (PARTITION BY src ORDER BY score DESC, dst) AS rank
+                FROM directed
+            ) ranked
+            WHERE rank <= %(k)s
+            ORDER BY src, rank
+        """, {"min": min_sessions, "k": top_k})
+        rows = cursor.fetchall()
+
+    src = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    ids, starts = np.unique(src, return_index=True)
+    indptr = np.append(starts, len(rows)).astype(np.int64)
+    neighbours = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    scores = np.fromiter((r[2] for r in rows), dtype=np.float32, count=len(rows))
+    return NeighbourTable(ids, indptr, neighbours, scores)
+
+
+class CoClickModel:
+    """
+    Serves the published neighbour table and, when running in the API,
+    keeps it current: every `interval` seconds new clicks are folded into
+    the counts and, if there were any, the table is rebuilt and published.
+    """
+
+    def __init__(self, root: str = COCLICK_DIR, interval: float = COCLICK_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.table = CurrentVersion(root, NeighbourTable.load, COCLICK_RELOAD_SEC)
+        self._task: Optional[asyncio.Task] = None
+
+        self.updates = 0
+        self.pairs_applied = 0
+        self.builds = 0
+        self.last_update: Optional[float] = None
+        self.last_build_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def scores(self, hotel_ids: Iterable[int]) -> Dict[int, float]:
+        """Neighbour scores summed over the clicked hotels."""
+        table = self.table.get()
+        if table is None:
+            return {}
+        out: Dict[int, float] = {}
+        for hotel_id in hotel_ids:
+            neighbours, scores = table.neighbours_of(hotel_id)
+            for n, s in zip(neighbours, scores):
+                out[n] = out.get(n, 0.0) + s
+        return out
+
+    def refresh(self, force_build: bool = False, lag_sec: float = COCLICK_LAG_SEC) -> int:
+        """Apply new clicks and publish a new table if anything changed."""
+        applied = apply_new_clicks(lag_sec)
+        if applied > 0:
+            self.updates += 1
+            self.pairs_applied += applied
+            self.last_update = time.time()
+        if applied > 0 or force_build:
+            start = time.perf_counter()
+            table = build_table()
+            publish(self.root, table.save)
+            self.last_build_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.builds += 1
+            self.table.expire()
+            log.info("co-click table published", extra={"hotels": len(table), "build_ms": self.last_build_ms})
+        return applied
+
+    async def _run(self):
+        # the first tick publishes a table if none exists yet
+        force = current_version(self.root) is None
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh, force)
+                force = False
+            except Exception as e:
+                self.last_error = str(e)
+                log.exception("co-click refresh failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        table = self.table.get()
+        return {
+            "running": self._task is not None,
+            "version": self.table.version,
+            "hotels": len(table) if table is not None else 0,
+            "edges": len(table.neighbours) if table is not None else 0,
+            "updates": self.updates,
+            "pairs_applied": self.pairs_applied,
+            "builds": self.builds,
+            "last_update": self.last_update,
+            "last_build_ms": self.last_build_ms,
+            "last_error": self.last_error or self.table.last_error,
+        }
+
+
+coclick_model = CoClickModel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="recount every click from scratch")
+    args = parser.parse_args()
+    setup_logging()
+    try:
+        if args.rebuild:
+            reset_counts()
+        applied = coclick_model.refresh(force_build=True, lag_sec=0)
+        stats = coclick_model.stats()
+        print(f"{applied} new session/hotel pairs; {stats['hotels']} hotels, {stats['edges']} neighbour edges")
+    finally:
+        pool.closeall()
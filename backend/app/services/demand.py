@@ -0,0 +1,130 @@
+# demand.py
+"""
+Request counts per (entity, city), recorded by the read and ingest
+endpoints and used by the scheduler to rank refreshes.
+
+Handlers only bump an in-process Counter. The recorder adds it to the
+city_demand table every DEMAND_FLUSH_SEC, so a scheduler in another
+process (APP_PROFILE=ingest, python -m app.services.scheduler) sees the
+demand from every API worker. Stored demand halves every
+DEMAND_HALF_LIFE_SEC, so recent interest outranks old popularity.
+
+Kept free of ingest imports so read handlers can record demand without
+loading the fetch/ETL stack.
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+from app.db.database import get_db_cursor
+from app.utils.metrics import query_timer
+
+log = logging.getLogger(__name__)
+
+DEMAND_FLUSH_SEC = float(os.getenv("DEMAND_FLUSH_SEC", "10"))
+DEMAND_HALF_LIFE_SEC = float(os.getenv("DEMAND_HALF_LIFE_SEC", str(24 * 3600)))
+
+# city_demand.demand decayed from its updated_at to now
+_DECAYED = (
+    "city_demand.demand * "
+    f"power(0.5, EXTRACT(EPOCH FROM now() - city_demand.updated_at)::float8 / {DEMAND_HALF_LIFE_SEC!r})"
+)
+
+
+def job_key(entity: str, city: str) -> Tuple[str, str]:
+    return entity, " ".join(city.lower().split())
+
+
+class DemandRecorder:
+    """Counts requests in memory and adds them to city_demand in batches."""
+
+    def __init__(self, interval: float = DEMAND_FLUSH_SEC):
+        self.interval = interval
+        self.pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.flushes = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, entity: str, city: str):
+        with self._lock:
+            self.pending[job_key(entity, city)] += 1
+            self.recorded += 1
+
+    def flush(self) -> int:
+        """Add pending counts to city_demand; returns how many (entity, city) rows were written."""
+        with self._lock:
+            pending, self.pending = self.pending, Counter()
+        if not pending:
+            return 0
+        try:
+            with get_db_cursor() as cursor, query_timer("demand_flush"):
+                # sorted, so concurrent flushes from other workers lock rows in the same order
+                execute_values(
+                    cursor,
+                    f"""
+                    INSERT INTO city_demand (entity, city, demand, updated_at) VALUES %s
+                    ON CONFLICT (entity, city) DO UPDATE SET
+                        demand = {_DECAYED} + EXCLUDED.demand,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    [(entity, city, n) for (entity, city), n in sorted(pending.items())],
+                    template="(%s, %s, %s, now())",
+                )
+        except Exception:
+            with self._lock:
+                self.pending.update(pending)
+            raise
+        self.flushes += 1
+        return len(pending)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception:
+            log.exception("demand flush failed")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                self.last_error = str(e)
+                log.exception("demand flush failed")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "recorded": self.recorded,
+            "pending": sum(self.pending.values()),
+            "flushes": self.flushes,
+            "last_error": self.last_error,
+        }
+
+
+def load_demand(cursor) -> Dict[Tuple[str, str], float]:
+    """Decayed demand per job_key() across every process that recorded it."""
+    cursor.execute(f"SELECT entity, city, {_DECAYED} FROM city_demand")
+    return {(entity, city): demand for entity, city, demand in cursor.fetchall()}
+
+
+demand_recorder = DemandRecorder()
+
+
+def record_demand(entity: str, city: str):
+    demand_recorder.record(entity, city)
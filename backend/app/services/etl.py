@@ -1,18 +1,25 @@
 # etl.py
-import psycopg2
-from psycopg2.extras import execute_values, Json  # ← ADD Json
-import os
+import logging
 
-def save_hotels_to_db(data):
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT")
-    )
-    cur = conn.cursor()
+from app.db.bulk import bulk_upsert
+from app.db.database import get_db_cursor
+from app.services.cache import result_cache
+from app.services.recommender import recommendation_index
+from app.utils.metrics import query_timer
+
+log = logging.getLogger(__name__)
+
+HOTEL_COLUMNS = [
+    "id", "city", "name", "rating", "address",
+    "price_min", "price_max", "price_avg",
+    "link", "lat", "lng",
+    "reviews", "phone", "detailed_address", "ranking",
+    "featured_image", "highlights", "providers",
+]
+HOTEL_JSON_COLUMNS = ["detailed_address", "ranking", "highlights", "providers"]
 
+
+def hotel_rows(data):
     hotels = []
     for hotel_id, h in data["by_id"].items():
         pr = h.get("price_range_usd") or {}
@@ -34,43 +41,32 @@ def save_hotels_to_db(data):
             h.get("longitude"),
             h.get("reviews"),
             h.get("phone"),
-            Json(h.get("detailed_address")),      # ← Json()
-            Json(h.get("ranking")),               # ← Json()
+            h.get("detailed_address"),      # JSON
+            h.get("ranking"),               # JSON
             h.get("featured_image"),
-            Json(h.get("highlights") or []),      # ← Json()
-            Json(h.get("providers") or []),       # ← Json()
+            h.get("highlights") or [],      # JSON
+            h.get("providers") or [],       # JSON
         ))
+    return hotels
+
 
-    query = """
-        INSERT INTO hotels (
-            id, city, name, rating, address,
-            price_min, price_max, price_avg,
-            link, lat, lng,
-            reviews, phone, detailed_address, ranking,
-            featured_image, highlights, providers
-        ) VALUES %s
-        ON CONFLICT (id) DO UPDATE SET
-            city = EXCLUDED.city,
-            name = EXCLUDED.name,
-            rating = EXCLUDED.rating,
-            address = EXCLUDED.address,
-            price_min = EXCLUDED.price_min,
-            price_max = EXCLUDED.price_max,
-            price_avg = EXCLUDED.price_avg,
-            link = EXCLUDED.link,
-            lat = EXCLUDED.lat,
-            lng = EXCLUDED.lng,
-            reviews = EXCLUDED.reviews,
-            phone = EXCLUDED.phone,
-            detailed_address = EXCLUDED.detailed_address,
-            ranking = EXCLUDED.ranking,
-            featured_image = EXCLUDED.featured_image,
-            highlights = EXCLUDED.highlights,
-            providers = EXCLUDED.providers;
+def save_hotels_to_db(data):
+    """
+    Upsert a batch of hotels via COPY + set-based merge. Rows whose content
+    hash is unchanged are not rewritten. Returns the number of rows changed.
     """
+    hotels = hotel_rows(data)
+
+    with get_db_cursor() as cur, query_timer("upsert_hotels"):
+        changed = bulk_upsert(cur, "hotels", HOTEL_COLUMNS, hotels, json_columns=HOTEL_JSON_COLUMNS)
+
+    if changed:
+        result_cache.invalidate("hotels", data["city"])
 
-    execute_values(cur, query, hotels)
-    conn.commit()
-    cur.close()
-    conn.close()
-    print(f"Saved {len(hotels)} hotels for {data['city']}")
\ No newline at end of file
+        # Keep the in-process recommendation index in step with the committed rows
+        recommendation_index.upsert(data["city"], [
+            (row[0], row[2], row[3], row[7], row[8], row[15], row[16])
+            for row in hotels
+        ])
+    log.info("saved hotels", extra={"city": data["city"], "rows": len(hotels), "changed": changed})
+    return changed
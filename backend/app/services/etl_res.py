@@ -1,7 +1,20 @@
 # etl_restaurants.py
-import psycopg2
-from psycopg2.extras import Json, execute_values
-import os
+import logging
+
+from app.db.bulk import bulk_upsert
+from app.db.database import get_db_cursor
+from app.services.cache import result_cache
+from app.utils.metrics import query_timer
+
+log = logging.getLogger(__name__)
+
+RESTAURANT_COLUMNS = [
+    "id", "city", "name", "rating", "reviews", "price_range",
+    "price_min", "price_max",
+    "is_sponsored", "menu_link", "reservation_link",
+    "link", "lat", "lng", "featured_image",
+    "has_delivery", "is_premium", "cuisines",
+]
 
 def parse_price_range(price_str):
     if not price_str:
@@ -19,16 +32,7 @@ def parse_price_range(price_str):
         return len(price_str), len(price_str)
 
 
-def save_restaurants_to_db(data):
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT")
-    )
-    cur = conn.cursor()
-
+def restaurant_rows(data):
     restaurants = []
     for rest_id, r in data["by_id"].items():
         price_str = r.get("price_range_usd")
@@ -52,43 +56,24 @@ def save_restaurants_to_db(data):
             r.get("featured_image"),
             r.get("has_delivery"),
             r.get("is_premium"),
-            Json(r.get("cuisines") or [])
+            r.get("cuisines") or []  # JSON
         ))
+    return restaurants
 
 
-    query = """
-        INSERT INTO restaurants (
-        id, city, name, rating, reviews, price_range,
-        price_min, price_max,
-        is_sponsored, menu_link, reservation_link,
-        link, lat, lng, featured_image,
-        has_delivery, is_premium, cuisines
-        )
-        VALUES %s
-        ON CONFLICT (id) DO UPDATE SET
-            city = EXCLUDED.city,
-            name = EXCLUDED.name,
-            rating = EXCLUDED.rating,
-            reviews = EXCLUDED.reviews,
-            price_range = EXCLUDED.price_range,
-            price_min = EXCLUDED.price_min,
-            price_max = EXCLUDED.price_max,
-            is_sponsored = EXCLUDED.is_sponsored,
-            menu_link = EXCLUDED.menu_link,
-            reservation_link = EXCLUDED.reservation_link,
-            link = EXCLUDED.link,
-            lat = EXCLUDED.lat,
-            lng = EXCLUDED.lng,
-            featured_image = EXCLUDED.featured_image,
-            has_delivery = EXCLUDED.has_delivery,
-            is_premium = EXCLUDED.is_premium,
-            cuisines = EXCLUDED.cuisines;
-        """
+def save_restaurants_to_db(data):
+    """
+    Upsert a batch of restaurants via COPY + set-based merge. Rows whose
+    content hash is unchanged are not rewritten. Returns the number of rows
+    changed.
+    """
+    restaurants = restaurant_rows(data)
 
-    execute_values(cur, query, restaurants)
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_db_cursor() as cur, query_timer("upsert_restaurants"):
+        changed = bulk_upsert(cur, "restaurants", RESTAURANT_COLUMNS, restaurants, json_columns=["cuisines"])
 
-    print(f"Saved {len(restaurants)} restaurants for {data['city']}")
+    if changed:
+        result_cache.invalidate("restaurants", data["city"])
 
+    log.info("saved restaurants", extra={"city": data["city"], "rows": len(restaurants), "changed": changed})
+    return changed
@@ -0,0 +1,250 @@
+# fetch_common.py
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.services.response_cache import response_cache
+from app.utils.metrics import fetch_errors, fetch_page_seconds
+
+log = logging.getLogger(__name__)
+
+API_BASE_URL = os.getenv("TRIPADVISOR_BASE_URL", "https://tripadvisor-scraper.p.rapidapi.com")
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "5"))
+RAPIDAPI_RATE_PER_SEC = float(os.getenv("RAPIDAPI_RATE_PER_SEC", "5"))
+RAPIDAPI_BURST = int(os.getenv("RAPIDAPI_BURST", "5"))
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "5"))
+FETCH_BACKOFF_BASE = float(os.getenv("FETCH_BACKOFF_BASE", "0.5"))
+FETCH_BACKOFF_MAX = float(os.getenv("FETCH_BACKOFF_MAX", "30"))
+# Pages fetched ahead of the one being consumed, on top of those in flight
+FETCH_PREFETCH_PAGES = int(os.getenv("FETCH_PREFETCH_PAGES", "5"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class ReplayMiss(LookupError):
+    """A page that replay mode needs is not in the response cache."""
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` requests/sec with bursts of up to `capacity`.
+
+    The tokens are process-wide, but the lock is made per event loop: a
+    backfill worker runs each city under its own asyncio.run(), and an
+    asyncio.Lock that has made one loop wait can't be used from another.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _loop_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+        return self._lock
+
+    async def acquire(self):
+        async with self._loop_lock():
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Shared by every ingest in the process so concurrent cities still respect
+# the RapidAPI quota as a whole.
+rate_limiter = TokenBucket(RAPIDAPI_RATE_PER_SEC, RAPIDAPI_BURST)
+
+
+def _backoff_delay(attempt: int, resp: Optional[httpx.Response]) -> float:
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), FETCH_BACKOFF_MAX)
+            except ValueError:
+                pass
+    delay = min(FETCH_BACKOFF_MAX, FETCH_BACKOFF_BASE * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)  # jitter
+
+
+async def get_response(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    params: Dict[str, Any],
+    stats: Optional[Dict[str, Any]] = None,
+) -> httpx.Response:
+    """
+    GET with rate limiting and exponential backoff on 429/5xx and transport
+    errors. Every attempt counts against the quota, so each one is added to
+    `stats["requests"]` when `stats` is given.
+    """
+    endpoint = httpx.URL(url).path
+    for attempt in range(FETCH_MAX_RETRIES + 1):
+        await rate_limiter.acquire()
+        if stats is not None:
+            stats["requests"] += 1
+        resp = None
+        try:
+            resp = await client.get(url, headers=headers, params=params)
+            if resp.status_code == 304:
+                return resp
+            if resp.status_code not in RETRY_STATUS:
+                if resp.is_error:
+                    fetch_errors.inc(endpoint=endpoint, reason=resp.status_code)
+                resp.raise_for_status()
+                return resp
+            fetch_errors.inc(endpoint=endpoint, reason=resp.status_code)
+        except httpx.TransportError as e:
+            fetch_errors.inc(endpoint=endpoint, reason=type(e).__name__)
+            if attempt == FETCH_MAX_RETRIES:
+                raise
+        log.warning("retrying page request", extra={
+            "endpoint": endpoint, "params": params, "attempt": attempt + 1,
+            "status": resp.status_code if resp is not None else None,
+        })
+        if attempt == FETCH_MAX_RETRIES:
+            resp.raise_for_status()
+        await asyncio.sleep(_backoff_delay(attempt, resp))
+
+
+async def fetch_payload(
+    client: httpx.AsyncClient,
+    path: str,
+    headers: Dict[str, str],
+    query: str,
+    page: int,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """
+    One list page, going through the on-disk response cache.
+
+    Cached pages are revalidated with If-None-Match / If-Modified-Since;
+    in FETCH_CACHE_MODE=on, ones younger than the TTL are returned without
+    a request. In replay mode a
+    page missing from the cache raises ReplayMiss instead of being fetched:
+    an empty stand-in would look like listings that vanished.
+    """
+    url = f"{API_BASE_URL}{path}"
+    params = {"query": query, "page": page}
+    start = time.perf_counter()
+    if not response_cache.enabled:
+        payload = (await get_response(client, url, headers, params, stats)).json()
+        fetch_page_seconds.observe(time.perf_counter() - start, endpoint=path, source="network")
+        return payload
+
+    entry = await asyncio.to_thread(response_cache.load, path, query, page)
+    if entry is not None and (response_cache.replay or response_cache.is_fresh(entry)):
+        response_cache.hits += 1
+        fetch_page_seconds.observe(time.perf_counter() - start, endpoint=path, source="cache")
+        return entry["payload"]
+    response_cache.misses += 1
+    if response_cache.replay:
+        raise ReplayMiss(f"{path} page {page} for {query!r} is not in the response cache")
+
+    resp = await get_response(client, url, {**headers, **response_cache.conditional_headers(entry)}, params, stats)
+    if resp.status_code == 304 and entry is not None:
+        await asyncio.to_thread(response_cache.touch, entry)
+        fetch_page_seconds.observe(time.perf_counter() - start, endpoint=path, source="revalidated")
+        return entry["payload"]
+    payload = resp.json()
+    await asyncio.to_thread(response_cache.store, path, query, page, payload, resp.headers)
+    fetch_page_seconds.observe(time.perf_counter() - start, endpoint=path, source="network")
+    return payload
+
+
+def parse_page(payload: Any) -> Tuple[List[Dict[str, Any]], int]:
+    """Normalize a list response into (results, total_pages)."""
+    if isinstance(payload, list):
+        payload = {"results": payload}
+    results = (
+        payload.get("results")
+        or payload.get("data", {}).get("results")
+        or payload.get("items")
+        or []
+    )
+    total_pages = (
+        payload.get("total_pages")
+        or payload.get("pagination", {}).get("total_pages")
+        or 1
+    )
+    return results, int(total_pages)
+
+
+async def iter_pages(
+    path: str,
+    city: str,
+    api_key: str,
+    api_host: str,
+    max_pages: Optional[int] = None,
+    concurrency: int = FETCH_CONCURRENCY,
+    start_page: int = 1,
+    stats: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Yield (page, results) for every page of a list endpoint.
+
+    Page 1 is fetched first to learn total_pages; the remaining pages are
+    then fetched concurrently (at most `concurrency` in flight) but yielded
+    in page order, including pages that came back empty, so when a listing
+    shows up on two pages the later page's copy consistently wins. Pages
+    are started through a window of `concurrency + FETCH_PREFETCH_PAGES`,
+    so a slow page holds back at most that many finished ones. Pages
+    before `start_page` are skipped, except that page 1 is always requested
+    for its total_pages. API requests made, retries included, are counted
+    in `stats["requests"]`.
+    """
+    headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": api_host}
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+
+        async def fetch(page: int):
+            async with sem:
+                log.debug("fetching page", extra={"city": city, "page": page})
+                payload = await fetch_payload(client, path, headers, city, page, stats)
+                return page, parse_page(payload)
+
+        _, (results, total_pages) = await fetch(1)
+        if not results:
+            return
+        if start_page <= 1:
+            yield 1, results
+
+        if max_pages is not None:
+            total_pages = min(total_pages, max_pages)
+
+        pages = iter(range(max(2, start_page), total_pages + 1))
+        window: deque = deque()
+        for p in pages:
+            window.append(asyncio.create_task(fetch(p)))
+            if len(window) >= concurrency + FETCH_PREFETCH_PAGES:
+                break
+        try:
+            while window:
+                page, (results, _) = await window.popleft()
+                # start the next page before handing this one to the consumer
+                p = next(pages, None)
+                if p is not None:
+                    window.append(asyncio.create_task(fetch(p)))
+                yield page, results
+        finally:
+            for t in window:
+                t.cancel()
+            await asyncio.gather(*window, return_exceptions=True)
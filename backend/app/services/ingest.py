@@ -0,0 +1,326 @@
+# ingest.py
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from psycopg2.extras import Json, execute_values
+
+from app.db.database import get_db_cursor
+from app.services.cache import result_cache
+from app.services.catalog_snapshot import catalog_snapshots
+from app.services.etl import save_hotels_to_db
+from app.services.etl_res import save_restaurants_to_db
+from app.services.fetch_common import iter_pages
+from app.services.fetch_data import HOTELS_PATH, hotel_key
+from app.services.fetch_data_res import MAX_PAGES, RESTAURANTS_PATH, res_key
+from app.services.recommender import recommendation_index
+from app.services.summaries import refresh_city_summary
+from app.utils.metrics import query_timer
+
+log = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_QUEUE_PAGES = int(os.getenv("INGEST_QUEUE_PAGES", "4"))
+# Stop a refresh once pages 1..N all match the last run (0 = always fetch everything)
+INGEST_EARLY_STOP_PAGES = int(os.getenv("INGEST_EARLY_STOP_PAGES", "0"))
+
+ENTITIES: Dict[str, Dict[str, Any]] = {
+    "hotels": {
+        "path": HOTELS_PATH,
+        "key": hotel_key,
+        "save": save_hotels_to_db,
+        "max_pages": None,
+    },
+    "restaurants": {
+        "path": RESTAURANTS_PATH,
+        "key": res_key,
+        "save": save_restaurants_to_db,
+        "max_pages": MAX_PAGES,
+    },
+}
+
+_DONE = object()
+
+
+def load_checkpoint(entity: str, city: str) -> Optional[Dict[str, Any]]:
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            "SELECT last_page, rows_upserted, completed FROM ingest_checkpoints WHERE entity = %s AND city = %s",
+            (entity, city),
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return {"last_page": row[0], "rows_upserted": row[1], "completed": row[2]}
+
+
+def save_checkpoint(entity: str, city: str, last_page: int, rows_upserted: int, completed: bool):
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO ingest_checkpoints (entity, city, last_page, rows_upserted, completed, updated_at)
+            VALUES (%s, %s, %s, %s, %s, now())
+            ON CONFLICT (entity, city) DO UPDATE SET
+                last_page = EXCLUDED.last_page,
+                rows_upserted = EXCLUDED.rows_upserted,
+                completed = EXCLUDED.completed,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (entity, city, last_page, rows_upserted, completed),
+        )
+
+
+def page_hash(results: List[Dict[str, Any]]) -> str:
+    return hashlib.md5(orjson.dumps(results, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def load_fingerprints(entity: str, city: str) -> Dict[int, str]:
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            "SELECT page, payload_hash FROM ingest_page_fingerprints WHERE entity = %s AND city = %s",
+            (entity, city),
+        )
+        return dict(cursor.fetchall())
+
+
+def save_fingerprints(entity: str, city: str, pages: List[tuple]):
+    """Record (page, payload_hash, ids) for pages whose rows are committed."""
+    with get_db_cursor() as cursor, query_timer("ingest_fingerprints"):
+        execute_values(
+            cursor,
+            """
+            INSERT INTO ingest_page_fingerprints (entity, city, page, payload_hash, ids, seen_at)
+            VALUES %s
+            ON CONFLICT (entity, city, page) DO UPDATE SET
+                payload_hash = EXCLUDED.payload_hash,
+                ids = EXCLUDED.ids,
+                seen_at = EXCLUDED.seen_at
+            """,
+            [(entity, city, page, digest, Json(ids)) for page, digest, ids in pages],
+            template="(%s, %s, %s, %s, %s, now())",
+        )
+
+
+def reconcile_deleted(entity: str, city: str, total_pages: int) -> Tuple[List[Any], List[Any]]:
+    """
+    After a complete run, soft-delete listings of `city` that no longer
+    appear on any page, and restore ones that came back. Returns the ids
+    that were (deleted, restored).
+    """
+    seen = """
+        SELECT jsonb_array_elements_text(ids) FROM ingest_page_fingerprints
+        WHERE entity = %(entity)s AND city = %(city)s
+    """
+    params = {"entity": entity, "city": city, "total_pages": total_pages}
+    with get_db_cursor() as cursor, query_timer(f"{entity}_reconcile"):
+        # pages past the end of this run's listing are gone
+        cursor.execute(
+            """
+            DELETE FROM ingest_page_fingerprints
+            WHERE entity = %(entity)s AND city = %(city)s AND page > %(total_pages)s
+            """,
+            params,
+        )
+        cursor.execute(
+            f"""
+            UPDATE {entity} SET deleted_at = NULL
+            WHERE city = %(city)s AND deleted_at IS NOT NULL AND id::text IN ({seen})
+            RETURNING id
+            """,
+            params,
+        )
+        restored = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            f"""
+            UPDATE {entity} SET deleted_at = now()
+            WHERE city = %(city)s AND deleted_at IS NULL AND id::text NOT IN ({seen})
+            RETURNING id
+            """,
+            params,
+        )
+        return [row[0] for row in cursor.fetchall()], restored
+
+
+def record_api_usage(requests: int):
+    """Charge `requests` RapidAPI calls to the current minute of api_usage."""
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO api_usage (minute, requests) VALUES (date_trunc('minute', now()), %s)
+            ON CONFLICT (minute) DO UPDATE SET requests = api_usage.requests + EXCLUDED.requests
+            """,
+            (requests,),
+        )
+
+
+def load_api_usage(cursor, seconds: float = 3600) -> int:
+    """RapidAPI requests recorded by every process over the last `seconds`."""
+    cursor.execute(
+        "SELECT COALESCE(SUM(requests), 0) FROM api_usage WHERE minute > now() - make_interval(secs => %s)",
+        (seconds,),
+    )
+    return int(cursor.fetchone()[0])
+
+
+def new_stats() -> Dict[str, Any]:
+    return {
+        "pages_fetched": 0, "pages_unchanged": 0, "requests": 0, "rows_upserted": 0, "rows_changed": 0,
+        "rows_deleted": 0, "rows_restored": 0, "batches": 0, "last_page": 0, "stopped_early": False, "errors": [],
+    }
+
+
+async def ingest_city(
+    entity: str,
+    city: str,
+    api_key: str,
+    api_host: str,
+    batch_size: int = INGEST_BATCH_SIZE,
+    resume: bool = True,
+    stats: Optional[Dict[str, Any]] = None,
+    delta: bool = True,
+    early_stop_pages: int = INGEST_EARLY_STOP_PAGES,
+) -> Dict[str, Any]:
+    """
+    Fetch every page for `city` and upsert it as it arrives.
+
+    A producer task pulls pages off the API into a bounded queue; this
+    coroutine normalizes them and upserts every `batch_size` rows, so memory
+    is bounded by the batch, the queue and iter_pages' fetch window, and a
+    failure keeps every committed batch.
+    After each batch the highest contiguous committed page is checkpointed,
+    and an interrupted ingest resumes from there when `resume` is set.
+
+    With `delta`, each page's payload hash is compared with the last run's
+    and unchanged pages skip the upsert. If pages 1..`early_stop_pages` all
+    match, the rest of the city is assumed unchanged and fetching stops.
+    A run that covers every page soft-deletes listings that disappeared.
+
+    `stats` is updated in place so callers can report progress while the
+    ingest is running. API requests are charged to api_usage as batches
+    commit, so the scheduler's budget sees manual and backfill runs too.
+    """
+    spec = ENTITIES[entity]
+    stats = stats if stats is not None else new_stats()
+
+    last_page = 0
+    rows_upserted = 0
+    if resume:
+        checkpoint = await asyncio.to_thread(load_checkpoint, entity, city)
+        if checkpoint and not checkpoint["completed"]:
+            last_page = checkpoint["last_page"]
+            rows_upserted = checkpoint["rows_upserted"]
+    stats["last_page"] = last_page
+    stats["rows_upserted"] = rows_upserted
+    stats["resumed_from"] = last_page
+    fingerprints = await asyncio.to_thread(load_fingerprints, entity, city) if delta else {}
+    early_stop_pages = early_stop_pages if delta and last_page == 0 else 0
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=INGEST_QUEUE_PAGES)
+    total_pages = 0
+
+    async def produce():
+        nonlocal total_pages
+        try:
+            async for page, results in iter_pages(
+                spec["path"], city, api_key, api_host,
+                max_pages=spec["max_pages"], start_page=last_page + 1, stats=stats,
+            ):
+                total_pages = max(total_pages, page)
+                await queue.put((page, results))
+        except Exception as e:
+            await queue.put((_DONE, e))
+        else:
+            await queue.put((_DONE, None))
+
+    producer = asyncio.create_task(produce())
+
+    batch: Dict[Any, Dict[str, Any]] = {}
+    batch_pages = []
+    committed = set()
+    unchanged = set()
+    charged = stats["requests"]
+
+    async def charge():
+        nonlocal charged
+        requests = stats["requests"] - charged
+        if not requests:
+            return
+        try:
+            await asyncio.to_thread(record_api_usage, requests)
+            charged += requests
+        except Exception:
+            # the budget is advisory; don't fail an ingest over it
+            log.exception("recording api usage failed", extra={"entity": entity, "city": city})
+
+    async def flush():
+        nonlocal last_page, rows_upserted, batch, batch_pages
+        if batch:
+            changed = await asyncio.to_thread(spec["save"], {"city": city, "by_id": batch})
+            rows_upserted += len(batch)
+            stats["rows_changed"] += changed
+            stats["batches"] += 1
+        if batch_pages:
+            await asyncio.to_thread(save_fingerprints, entity, city, batch_pages)
+        committed.update(page for page, _, _ in batch_pages)
+        while last_page + 1 in committed:
+            last_page += 1
+        stats["rows_upserted"] = rows_upserted
+        stats["last_page"] = last_page
+        await asyncio.to_thread(save_checkpoint, entity, city, last_page, rows_upserted, False)
+        batch, batch_pages = {}, []
+        await charge()
+
+    error = None
+    try:
+        while True:
+            page, results = await queue.get()
+            if page is _DONE:
+                error = results
+                break
+            stats["pages_fetched"] += 1
+            digest = page_hash(results)
+            keyed = [(spec["key"](item), item) for item in results]
+            keyed = [(item_id, item) for item_id, item in keyed if item_id is not None]
+            if fingerprints.get(page) == digest:
+                stats["pages_unchanged"] += 1
+                unchanged.add(page)
+            else:
+                batch.update(keyed)
+            batch_pages.append((page, digest, [item_id for item_id, _ in keyed]))
+            if len(batch) >= batch_size:
+                await flush()
+            if early_stop_pages and unchanged.issuperset(range(1, early_stop_pages + 1)):
+                stats["stopped_early"] = True
+                break
+
+        await flush()
+        if error is None:
+            await asyncio.to_thread(save_checkpoint, entity, city, last_page, rows_upserted, True)
+            if not stats["stopped_early"] and total_pages:
+                deleted, restored = await asyncio.to_thread(reconcile_deleted, entity, city, total_pages)
+                stats["rows_deleted"] = len(deleted)
+                stats["rows_restored"] = len(restored)
+                if deleted or restored:
+                    result_cache.invalidate(entity, city)
+                if entity == "hotels":
+                    if deleted:
+                        recommendation_index.remove(city, deleted)
+                    if restored:
+                        # restored rows may sit on unchanged pages, which skip the upsert
+                        recommendation_index.reload(city)
+            if stats["rows_changed"] or stats["rows_deleted"] or stats["rows_restored"] or stats["resumed_from"]:
+                await asyncio.to_thread(refresh_city_summary, entity, city)
+                catalog_snapshots.request(entity)
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        await charge()
+
+    if error is not None:
+        stats["errors"].append(str(error))
+        raise error
+
+    return {"entity": entity, "city": city, "count": rows_upserted, **stats}
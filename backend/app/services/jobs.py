@@ -0,0 +1,123 @@
+# jobs.py
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.demand import job_key
+from app.services.ingest import ingest_city, new_stats
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "500"))
+
+
+class JobManager:
+    """
+    In-process ingest queue served by a fixed number of worker tasks.
+
+    Only one job per (entity, city) is queued or running at a time; a second
+    submit for the same city returns the existing job instead of starting
+    another scrape.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS):
+        self.workers = workers
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._active: Dict[Tuple[str, str], str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, entity: str, city: str, api_key: str, api_host: str) -> Tuple[Dict[str, Any], bool]:
+        """Queue an ingest, returning (job, created)."""
+        key = job_key(entity, city)
+        existing = self._active.get(key)
+        if existing is not None:
+            return self.jobs[existing], False
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "entity": entity,
+            "city": city,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "stats": new_stats(),
+            "error": None,
+        }
+        self.jobs[job["id"]] = job
+        self._active[key] = job["id"]
+        self._trim_history()
+        self._queue.put_nowait((job, api_key, api_host))
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _trim_history(self):
+        while len(self.jobs) > JOB_HISTORY:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest["status"] in ("queued", "running"):
+                break
+            del self.jobs[oldest_id]
+
+    async def _worker(self):
+        while True:
+            job, api_key, api_host = await self._queue.get()
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                await ingest_city(job["entity"], job["city"], api_key, api_host, stats=job["stats"])
+                job["status"] = "succeeded"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = time.time()
+                self._active.pop(job_key(job["entity"], job["city"]), None)
+                self._queue.task_done()
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    stats = job["stats"]
+    end = job["finished_at"] or time.time()
+    elapsed = end - job["started_at"] if job["started_at"] else 0.0
+    return {
+        "id": job["id"],
+        "entity": job["entity"],
+        "city": job["city"],
+        "status": job["status"],
+        "pages_fetched": stats["pages_fetched"],
+        "pages_unchanged": stats["pages_unchanged"],
+        "requests": stats["requests"],
+        "rows_upserted": stats["rows_upserted"],
+        "rows_changed": stats["rows_changed"],
+        "rows_deleted": stats["rows_deleted"],
+        "rows_restored": stats["rows_restored"],
+        "stopped_early": stats["stopped_early"],
+        "batches": stats["batches"],
+        "last_page": stats["last_page"],
+        "elapsed_sec": round(elapsed, 2),
+        "rows_per_sec": round(stats["rows_upserted"] / elapsed, 1) if elapsed else 0.0,
+        "pages_per_sec": round(stats["pages_fetched"] / elapsed, 2) if elapsed else 0.0,
+        "errors": stats["errors"],
+        "error": job["error"],
+    }
+
+
+job_manager = JobManager()
@@ -0,0 +1,284 @@
+# recommender.py
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.db.async_database import get_async_cursor
+from app.services.cache import result_cache
+from app.utils.metrics import query_timer
+
+# backstop only: an index is reloaded as soon as its city's hotels generation moves
+RECOMMEND_INDEX_TTL = float(os.getenv("RECOMMEND_INDEX_TTL", "600"))
+# share of the co-click score in the blended ranking; 0 = highlights only
+COCLICK_WEIGHT = float(os.getenv("COCLICK_WEIGHT", "0.5"))
+
+
+def parse_highlights(raw) -> set:
+    raw = raw or []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            return set()
+    return set(raw)
+
+
+class CityIndex:
+    """
+    Hotels x highlights incidence matrix for one city.
+
+    Highlights are mapped to integer ids; each hotel keeps its row of ids so
+    an upsert only re-tokenizes the hotels it touches. The CSR matrix is
+    rebuilt from those rows on the next query after a change.
+    """
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.pos: Dict[Any, int] = {}
+        self.ids: List[Any] = []
+        self.tokens: List[np.ndarray] = []
+        self.rating: List[float] = []
+        self.price_avg: List[float] = []
+        self.meta: List[tuple] = []
+        self.alive: List[bool] = []
+        self.loaded_at = time.monotonic()
+        # hotels:<city> cache generation this index is current with
+        self.generation: Optional[int] = None
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def _term_id(self, term: str) -> int:
+        tid = self.vocab.get(term)
+        if tid is None:
+            tid = self.vocab[term] = len(self.terms)
+            self.terms.append(term)
+        return tid
+
+    def upsert(self, rows: Iterable[Sequence]):
+        """rows: (id, name, rating, price_avg, link, featured_image, highlights)"""
+        with self._lock:
+            for h_id, name, rating, price_avg, link, image, raw in rows:
+                highlights = parse_highlights(raw)
+                toks = np.fromiter((self._term_id(t) for t in highlights), dtype=np.int32, count=len(highlights))
+                toks.sort()
+                values = (
+                    toks,
+                    float(rating) if rating is not None else 0.0,
+                    float(price_avg) if price_avg is not None else 0.0,
+                    (name, link, image),
+                    bool(highlights),
+                )
+                i = self.pos.get(h_id)
+                if i is None:
+                    i = self.pos[h_id] = len(self.ids)
+                    self.ids.append(h_id)
+                    self.tokens.append(None)
+                    self.rating.append(0.0)
+                    self.price_avg.append(0.0)
+                    self.meta.append(None)
+                    self.alive.append(False)
+                self.tokens[i], self.rating[i], self.price_avg[i], self.meta[i], self.alive[i] = values
+            self._snapshot = None
+
+    def remove(self, ids: Iterable[Any]):
+        with self._lock:
+            for h_id in ids:
+                i = self.pos.get(h_id)
+                if i is not None and self.alive[i]:
+                    self.alive[i] = False
+                    self._snapshot = None
+
+    def _build(self):
+        # scipy is only needed once a city is scored; keep it out of startup
+        from scipy import sparse
+
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            n, v = len(self.ids), len(self.terms)
+            lengths = np.fromiter((len(t) for t in self.tokens), dtype=np.int64, count=n)
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            indices = np.concatenate(self.tokens) if n else np.zeros(0, dtype=np.int32)
+            matrix = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(n, v)
+            )
+            rating = np.asarray(self.rating, dtype=np.float64)
+            self._snapshot = {
+                "matrix": matrix,
+                "row_nnz": lengths.astype(np.float64),
+                "boost": np.maximum(0.0, (rating - 4.0) * 0.1),
+                "alive": np.asarray(self.alive, dtype=bool),
+                "rating": rating,
+                "price_avg": np.asarray(self.price_avg, dtype=np.float64),
+                "ids": list(self.ids),
+                "meta": list(self.meta),
+                "tokens": list(self.tokens),
+                "terms": list(self.terms),
+                "vocab": dict(self.vocab),
+                "pos": dict(self.pos),
+            }
+            return self._snapshot
+
+    def recommend(
+        self,
+        clicked_highlights: set,
+        clicked_ids: set,
+        limit: int,
+        coclick: Optional[Dict[Any, float]] = None,
+        coclick_weight: float = COCLICK_WEIGHT,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank hotels that share a highlight with the clicked ones or were
+        co-clicked with them, all by one score:
+
+            (1 - w) * highlight Jaccard + w * co-click score / max + rating boost
+
+        w is `coclick_weight` when there are co-click scores and 0 otherwise,
+        so without any it is the plain highlight ranking.
+        """
+        snap = self._build()
+        n = len(snap["ids"])
+        if not n:
+            return []
+        candidate = np.zeros(n, dtype=bool)
+
+        jaccard = np.zeros(n, dtype=np.float64)
+        q_ids = [snap["vocab"][t] for t in clicked_highlights if t in snap["vocab"]]
+        if q_ids:
+            q = np.zeros(len(snap["terms"]), dtype=np.float32)
+            q[q_ids] = 1.0
+            inter = snap["matrix"].dot(q).astype(np.float64)
+            union = len(clicked_highlights) + snap["row_nnz"] - inter
+            with np.errstate(divide="ignore", invalid="ignore"):
+                jaccard = np.where(inter > 0, inter / union, 0.0)
+            candidate |= inter > 0
+
+        cf = np.zeros(n, dtype=np.float64)
+        top = max(coclick.values()) if coclick else 0.0
+        weight = coclick_weight if top > 0 else 0.0
+        if top > 0:
+            for h_id, value in coclick.items():
+                i = snap["pos"].get(h_id)
+                if i is not None:
+                    cf[i] = value / top
+                    candidate[i] = True
+
+        valid = candidate & snap["alive"]
+        for h_id in clicked_ids:
+            i = snap["pos"].get(h_id)
+            if i is not None:
+                valid[i] = False
+        score = np.where(valid, (1 - weight) * jaccard + weight * cf + snap["boost"], -np.inf)
+
+        k = min(limit, int(valid.sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(-score, k - 1)[:k]
+        best = best[np.argsort(-score[best], kind="stable")]
+        return [self._rec(snap, i, score[i], jaccard[i], cf[i], clicked_highlights) for i in best]
+
+    @staticmethod
+    def _rec(snap, i, score, highlight_score, coclick_score, clicked_highlights) -> Dict[str, Any]:
+        terms = snap["terms"]
+        name, link, image = snap["meta"][i]
+        return {
+            "id": snap["ids"][i],
+            "name": name,
+            "rating": round(float(snap["rating"][i]), 1),
+            "price_avg": int(snap["price_avg"][i]),
+            "link": link,
+            "featured_image": image,
+            # the blended ranking score; its two parts follow
+            "similarity_score": round(float(score), 2),
+            "highlight_score": round(float(highlight_score), 2),
+            "coclick_score": round(float(coclick_score), 2),
+            "matched_highlights": [terms[t] for t in snap["tokens"][i] if terms[t] in clicked_highlights],
+        }
+
+
+class RecommendationIndex:
+    """
+    Per-city CityIndex registry, loaded lazily.
+
+    Each index remembers the shared hotels:<city> cache generation
+    (app.services.cache) it was loaded at, and is reloaded once that moves,
+    so an ingest in another process (an APP_PROFILE=ingest worker, the
+    backfill) reaches the read workers within CACHE_SYNC_SEC. An ingest in
+    this process applies its rows directly and advances the index past its
+    own bump instead.
+    """
+
+    def __init__(self, ttl: float = RECOMMEND_INDEX_TTL):
+        self.ttl = ttl
+        self.cities: Dict[str, CityIndex] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, city: str) -> CityIndex:
+        generation = await result_cache.generation("hotels", city)
+        index = self.cities.get(city)
+        if (
+            index is not None
+            and index.generation == generation
+            and time.monotonic() - index.loaded_at < self.ttl
+        ):
+            return index
+
+        # read before the load: a commit in between just causes one more reload
+        fresh = CityIndex()
+        fresh.generation = generation
+        async with get_async_cursor() as cursor:
+            with query_timer("recommend_index_load"):
+                await cursor.execute("""
+                    SELECT id, name, rating, price_avg, link, featured_image, highlights
+                    FROM hotels
+                    WHERE city = %s AND highlights IS NOT NULL AND deleted_at IS NULL
+                """, (city,))
+                rows = await cursor.fetchall()
+        fresh.upsert(rows)
+        with self._lock:
+            self.cities[city] = fresh
+        return fresh
+
+    def upsert(self, city: str, rows: List[Sequence]):
+        """Apply hotel rows just committed (and invalidated) by this process to any loaded index."""
+        with self._lock:
+            loaded = dict(self.cities)
+        ids = [r[0] for r in rows]
+        for other_city, index in loaded.items():
+            if other_city != city:
+                index.remove(ids)
+        index = loaded.get(city)
+        if index is not None:
+            index.upsert(rows)
+            self._advance(index)
+
+    def remove(self, city: str, ids: List[Any]):
+        """Drop hotels of `city` this process just soft-deleted (and invalidated)."""
+        with self._lock:
+            loaded = dict(self.cities)
+        for index in loaded.values():
+            index.remove(ids)
+        index = loaded.get(city)
+        if index is not None:
+            self._advance(index)
+
+    @staticmethod
+    def _advance(index: CityIndex):
+        # Our own invalidate() bumped the generation by one and the index
+        # already has the change; any other bump still forces a reload.
+        if index.generation is not None:
+            index.generation += 1
+
+    def reload(self, city: str):
+        """Forget `city`'s index so the next request loads it again."""
+        with self._lock:
+            self.cities.pop(city, None)
+
+
+recommendation_index = RecommendationIndex()
@@ -0,0 +1,120 @@
+# response_cache.py
+import gzip
+import hashlib
+import os
+import time
+from typing import Any, Dict, Mapping, Optional
+
+import orjson
+
+# revalidate: always ask the API, with a conditional GET when a page is on
+#   disk, so live ingests see fresh data and unchanged pages cost a 304
+# on: serve pages younger than FETCH_CACHE_TTL from disk without asking,
+#   revalidate older ones (the backfill default)
+# replay: serve only from disk and never touch the network
+# off: always fetch, never store
+FETCH_CACHE_MODE = os.getenv("FETCH_CACHE_MODE", "revalidate")
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", ".fetch_cache")
+FETCH_CACHE_TTL = float(os.getenv("FETCH_CACHE_TTL", str(6 * 3600)))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class ResponseCache:
+    """
+    Raw list-endpoint payloads on disk, one gzipped file per
+    (endpoint, query, page).
+
+    Each entry keeps the ETag / Last-Modified the API sent, so a stale entry
+    is refreshed with a conditional GET and a 304 only bumps its timestamp.
+    Files are written to a temp name and renamed, so concurrent ingests
+    (or backfill processes) never read a half-written page.
+    """
+
+    def __init__(self, root: str = FETCH_CACHE_DIR, ttl: float = FETCH_CACHE_TTL, mode: str = FETCH_CACHE_MODE):
+        self.root = root
+        self.ttl = ttl
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("revalidate", "on", "replay")
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == "replay"
+
+    def path(self, endpoint: str, query: str, page: int) -> str:
+        digest = hashlib.sha1(f"{endpoint}\0{normalize_query(query)}\0{page}".encode()).hexdigest()
+        return os.path.join(self.root, endpoint.strip("/").replace("/", "_"), digest[:2], f"{digest}.json.gz")
+
+    def load(self, endpoint: str, query: str, page: int) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(self.path(endpoint, query, page), "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, orjson.JSONDecodeError):
+            # truncated or corrupt: treat as a miss and overwrite it
+            return None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Whether `entry` may be served without asking the API (mode "on" only)."""
+        return self.mode == "on" and time.time() - entry["fetched_at"] < self.ttl
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, endpoint: str, query: str, page: int, payload: Any, headers: Mapping[str, str]) -> Dict[str, Any]:
+        entry = {
+            "endpoint": endpoint,
+            "query": query,
+            "page": page,
+            "fetched_at": time.time(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "payload": payload,
+        }
+        self._write(entry)
+        self.stored += 1
+        return entry
+
+    def touch(self, entry: Dict[str, Any]):
+        """Mark an entry fresh again after the API answered 304."""
+        entry["fetched_at"] = time.time()
+        self._write(entry)
+        self.revalidated += 1
+
+    def _write(self, entry: Dict[str, Any]):
+        path = self.path(entry["endpoint"], entry["query"], entry["page"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(orjson.dumps(entry))
+        os.replace(tmp, path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "dir": self.root,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stored": self.stored,
+        }
+
+
+response_cache = ResponseCache()
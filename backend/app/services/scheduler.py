@@ -0,0 +1,244 @@
+# scheduler.py
+"""
+Periodic city refreshes.
+
+Runs inside the API (SCHEDULER_ENABLED=1) or on its own:
+
+    python -m app.services.scheduler
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.db.database import get_db_cursor, pool
+from app.services.catalog_snapshot import catalog_snapshots
+from app.services.demand import job_key, load_demand
+from app.services.ingest import ENTITIES, load_api_usage
+from app.services.jobs import JobManager, job_manager
+from app.utils.log import setup_logging
+from app.utils.metrics import query_timer
+
+log = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "0") == "1"
+SCHEDULER_INTERVAL = float(os.getenv("SCHEDULER_INTERVAL", "60"))
+# RapidAPI requests per rolling hour, counting every ingest (api_usage), past
+# which the scheduler stops submitting
+SCHEDULER_BUDGET_PER_HOUR = int(os.getenv("SCHEDULER_BUDGET_PER_HOUR", "500"))
+# Cities refreshed more recently than this are left alone
+SCHEDULER_MIN_AGE = float(os.getenv("SCHEDULER_MIN_AGE", "3600"))
+# Don't pile up more than this many scheduled jobs in the ingest queue
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "4"))
+# Pages a refresh is assumed to cost before a city has been ingested once
+SCHEDULER_DEFAULT_PAGES = int(os.getenv("SCHEDULER_DEFAULT_PAGES", "20"))
+# Retry delay after a scheduled ingest fails, doubling per consecutive failure
+SCHEDULER_RETRY_BASE = float(os.getenv("SCHEDULER_RETRY_BASE", "600"))
+SCHEDULER_RETRY_MAX = float(os.getenv("SCHEDULER_RETRY_MAX", str(6 * 3600)))
+# Extra cities to keep fresh even if nobody asked for them, e.g. "new york,paris"
+SCHEDULER_CITIES = [c.strip() for c in os.getenv("SCHEDULER_CITIES", "").split(",") if c.strip()]
+SCHEDULER_HISTORY = 200
+
+
+def staleness_demand_priority(age: float, demand: float) -> float:
+    """Hours past the minimum age, scaled up by how often the city is queried."""
+    return (age - SCHEDULER_MIN_AGE) / 3600 * (1 + math.log1p(demand))
+
+
+class Scheduler:
+    """
+    Submits refreshes for the highest-priority stale (entity, city) pairs to
+    the job manager, as long as the hourly request budget allows.
+
+    Data age comes from ingest_checkpoints; demand comes from city_demand,
+    where every API process adds its ingest and recommendation requests
+    (app.services.demand). `priority(age_sec, demand)` is pluggable; pairs
+    with a priority <= 0 are never scheduled.
+
+    The budget is charged with the requests every ingest actually made
+    (api_usage), plus the estimated remainder of jobs it has submitted that
+    are still queued or running. A pair whose scheduled ingest failed is
+    retried after SCHEDULER_RETRY_BASE, doubling up to SCHEDULER_RETRY_MAX.
+    """
+
+    def __init__(
+        self,
+        jobs: JobManager = job_manager,
+        priority: Callable[[float, float], float] = staleness_demand_priority,
+        budget_per_hour: int = SCHEDULER_BUDGET_PER_HOUR,
+        interval: float = SCHEDULER_INTERVAL,
+    ):
+        self.jobs = jobs
+        self.priority = priority
+        self.budget_per_hour = budget_per_hour
+        self.interval = interval
+        self.requests_last_hour = 0  # api_usage as of the last tick
+        self._scheduled: Dict[str, int] = {}  # queued or running job id -> estimated requests
+        self._failures: Dict[Tuple[str, str], Tuple[int, float]] = {}  # job_key -> (failures, retry at)
+        self.decisions: deque = deque(maxlen=SCHEDULER_HISTORY)
+        self.candidates: List[Dict[str, Any]] = []
+        self.last_run: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._api_key = self._api_host = None
+
+    async def start(self, api_key: str, api_host: str):
+        self._api_key, self._api_host = api_key, api_host
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def spent_last_hour(self) -> int:
+        """Requests made in the last hour plus those reserved by pending jobs."""
+        return self.requests_last_hour + self._reserved()
+
+    def _reserved(self) -> int:
+        total = 0
+        for job_id, estimate in self._scheduled.items():
+            job = self.jobs.get(job_id)
+            if job is not None:
+                total += max(0, estimate - job["stats"]["requests"])
+        return total
+
+    def _load_state(
+        self,
+    ) -> Tuple[List[Tuple[str, str, float, int, bool]], Dict[Tuple[str, str], float], int]:
+        with get_db_cursor() as cursor, query_timer("scheduler_state"):
+            cursor.execute("DELETE FROM api_usage WHERE minute < now() - interval '1 day'")
+            cursor.execute("""
+                SELECT entity, city, EXTRACT(EPOCH FROM now() - updated_at), last_page, completed
+                FROM ingest_checkpoints
+            """)
+            rows = cursor.fetchall()
+            return rows, load_demand(cursor), load_api_usage(cursor)
+
+    def _pending_jobs(self) -> int:
+        for job_id in list(self._scheduled):
+            job = self.jobs.get(job_id)
+            if job is not None and job["status"] in ("queued", "running"):
+                continue
+            del self._scheduled[job_id]
+            if job is None:
+                continue
+            key = job_key(job["entity"], job["city"])
+            if job["status"] == "failed":
+                failures = self._failures.get(key, (0, 0.0))[0] + 1
+                delay = min(SCHEDULER_RETRY_MAX, SCHEDULER_RETRY_BASE * 2 ** (failures - 1))
+                self._failures[key] = (failures, job["finished_at"] + delay)
+            else:
+                self._failures.pop(key, None)
+        return len(self._scheduled)
+
+    async def tick(self):
+        """Rank every known (entity, city) pair and submit what the budget allows."""
+        rows, demands, self.requests_last_hour = await asyncio.to_thread(self._load_state)
+        self._pending_jobs()
+        known = {job_key(entity, city): (city, float(age), last_page, completed)
+                 for entity, city, age, last_page, completed in rows}
+        for city in SCHEDULER_CITIES:
+            for entity in ENTITIES:
+                # never ingested: as stale as it gets
+                known.setdefault(job_key(entity, city), (city, math.inf, 0, False))
+
+        candidates = []
+        for (entity, _), (city, age, last_page, completed) in known.items():
+            if not completed:
+                # an interrupted run resumes right away, a failing one after its retry delay
+                age = max(age, SCHEDULER_MIN_AGE + 3600)
+            demand = demands.get(job_key(entity, city), 0.0)
+            score = self.priority(age, demand) if math.isfinite(age) else math.inf
+            if score <= 0:
+                continue
+            candidates.append({
+                "entity": entity,
+                "city": city,
+                "age_sec": round(age, 1) if math.isfinite(age) else None,
+                "demand": round(demand, 2),
+                "priority": round(score, 3) if math.isfinite(score) else None,
+                "est_requests": last_page if completed and last_page else SCHEDULER_DEFAULT_PAGES,
+                "_score": score,
+            })
+        candidates.sort(key=lambda c: c["_score"], reverse=True)
+        self.candidates = [{k: v for k, v in c.items() if k != "_score"} for c in candidates]
+
+        now = time.time()
+        for c in self.candidates:
+            if self._pending_jobs() >= SCHEDULER_MAX_QUEUE:
+                break
+            failures, retry_at = self._failures.get(job_key(c["entity"], c["city"]), (0, 0.0))
+            if retry_at > now:
+                self._decide({**c, "failures": failures, "retry_at": retry_at}, "deferred_backoff")
+                continue
+            remaining = self.budget_per_hour - self.spent_last_hour()
+            if c["est_requests"] > remaining:
+                self._decide(c, "deferred_budget")
+                continue
+            job, created = self.jobs.submit(c["entity"], c["city"], self._api_key, self._api_host)
+            if not created:
+                continue
+            self._scheduled[job["id"]] = c["est_requests"]
+            self._decide(c, "submitted", job["id"])
+        self.last_run = time.time()
+
+    def _decide(self, candidate: Dict[str, Any], action: str, job_id: Optional[str] = None):
+        self.decisions.append({**candidate, "action": action, "job_id": job_id, "at": time.time()})
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                log.exception("scheduler tick failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "interval_sec": self.interval,
+            "budget_per_hour": self.budget_per_hour,
+            "spent_last_hour": self.spent_last_hour(),
+            "requests_last_hour": self.requests_last_hour,
+            "backing_off": [
+                {"entity": entity, "city": city, "failures": failures, "retry_at": retry_at}
+                for (entity, city), (failures, retry_at) in self._failures.items() if retry_at > time.time()
+            ],
+            "scheduled_pending": self._pending_jobs(),
+            "ingest_queue_depth": self.jobs.queue_depth(),
+            "last_run": self.last_run,
+            "candidates": self.candidates[:50],
+            "recent_decisions": list(self.decisions)[-50:],
+        }
+
+
+scheduler = Scheduler()
+
+
+async def _main():
+    # .env is loaded by app.db.database on import
+    api_key = os.getenv("API_KEY")
+    if not api_key:
+        raise SystemExit("Missing API_KEY in environment")
+    setup_logging()
+    await job_manager.start()
+    await scheduler.start(api_key, "tripadvisor-scraper.p.rapidapi.com")
+    await catalog_snapshots.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await catalog_snapshots.stop()
+        await scheduler.stop()
+        await job_manager.stop()
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,136 @@
+# summaries.py
+from typing import Any, Dict, Optional
+
+from app.db.async_database import get_async_cursor
+from app.db.database import get_db_cursor
+from app.utils.metrics import query_timer
+
+# price expression, price bucket edges and faceted JSON array column per
+# listing table; restaurant prices are the midpoint of the $-$$$$ range
+SUMMARY_SPECS = {
+    "hotels": {"price": "price_avg", "edges": [50, 100, 150, 200, 300, 500], "facet": "highlights"},
+    "restaurants": {"price": "(price_min + price_max) / 2.0", "edges": [1.5, 2, 2.5, 3, 3.5], "facet": "cuisines"},
+}
+
+PERCENTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+SUMMARY_FACETS = 100
+
+
+def _distribution(col: str, source: str) -> str:
+    pcts = ", ".join(str(p) for p in PERCENTILES)
+    names = ", ".join(f"'p{int(p * 100)}', q[{i + 1}]" for i, p in enumerate(PERCENTILES))
+    return f"""(
+        SELECT jsonb_build_object(
+            'min', lo, 'max', hi, 'avg', round(mean::numeric, 2), 'percentiles', jsonb_build_object({names})
+        )
+        FROM (
+            SELECT min({col}) AS lo, max({col}) AS hi, avg({col}) AS mean,
+                   percentile_cont(ARRAY[{pcts}]) WITHIN GROUP (ORDER BY {col}) AS q
+            FROM {source}
+        ) d
+    )"""
+
+
+def summary_sql(entity: str) -> str:
+    """
+    One statement that aggregates a city's live listings and upserts the
+    result into city_summaries. Nothing is written for a city with no rows;
+    refresh_city_summary() drops any summary it had.
+    """
+    spec = SUMMARY_SPECS[entity]
+    edges = "ARRAY[" + ", ".join(str(float(e)) for e in spec["edges"]) + "]::float8[]"
+    return f"""
+        WITH base AS (
+            SELECT id, name, link,
+                   ROUND(NULLIF(rating, 0)::numeric, 1)::float8 AS rating,
+                   NULLIF(({spec["price"]})::float8, 0) AS price,
+                   {spec["facet"]} AS tags
+            FROM {entity}
+            WHERE city = %(city)s AND deleted_at IS NULL
+        ),
+        rated AS (SELECT * FROM base WHERE rating IS NOT NULL),
+        priced AS (SELECT *, width_bucket(price, {edges}) AS bucket FROM base WHERE price IS NOT NULL)
+        INSERT INTO city_summaries (entity, city, row_count, summary, updated_at)
+        SELECT %(entity)s, %(city)s, n, jsonb_build_object(
+            'count', n,
+            'rated', (SELECT count(*) FROM rated),
+            'priced', (SELECT count(*) FROM priced),
+            'rating', {_distribution("rating", "rated")},
+            'price', {_distribution("price", "priced")},
+            'price_edges', to_jsonb({edges}),
+            -- 0.1 steps with the cheapest listing, as in HotelSummaryTable
+            'rating_buckets', (
+                SELECT coalesce(jsonb_agg(b ORDER BY r DESC), '[]'::jsonb) FROM (
+                    SELECT rating AS r, jsonb_build_object(
+                        'rating', rating,
+                        'count', count(*),
+                        'price_min', min(price),
+                        'price_median', percentile_cont(0.5) WITHIN GROUP (ORDER BY price),
+                        'cheapest', (array_agg(
+                            jsonb_build_object('id', id, 'name', name, 'link', link, 'price', price)
+                            ORDER BY price NULLS LAST, id
+                        ))[1]
+                    ) AS b
+                    FROM rated GROUP BY rating
+                ) t
+            ),
+            'price_buckets', (
+                SELECT coalesce(jsonb_agg(jsonb_build_object('bucket', bucket, 'count', c) ORDER BY bucket), '[]'::jsonb)
+                FROM (SELECT bucket, count(*) AS c FROM priced GROUP BY bucket) t
+            ),
+            -- half-star rating x price bucket counts for the scatter plot
+            'rating_price_counts', (
+                SELECT coalesce(jsonb_agg(jsonb_build_object('rating', r, 'bucket', bucket, 'count', c)
+                                          ORDER BY r DESC, bucket), '[]'::jsonb)
+                FROM (
+                    SELECT floor(rating * 2) / 2 AS r, bucket, count(*) AS c
+                    FROM priced WHERE rating IS NOT NULL GROUP BY 1, 2
+                ) t
+            ),
+            -- unfiltered highlight / cuisine counts for the city's facet list
+            'facets', (
+                SELECT coalesce(jsonb_agg(jsonb_build_object('value', value, 'count', c)
+                                          ORDER BY c DESC, value), '[]'::jsonb)
+                FROM (
+                    SELECT f.value, count(*) AS c
+                    FROM base CROSS JOIN LATERAL jsonb_array_elements_text(base.tags) AS f(value)
+                    GROUP BY f.value ORDER BY c DESC, f.value LIMIT {SUMMARY_FACETS}
+                ) t
+            )
+        ), now()
+        FROM (SELECT count(*) AS n FROM base) total
+        WHERE n > 0
+        ON CONFLICT (entity, city) DO UPDATE SET
+            row_count = EXCLUDED.row_count,
+            summary = EXCLUDED.summary,
+            updated_at = EXCLUDED.updated_at
+        RETURNING summary, updated_at
+    """
+
+
+def refresh_city_summary(entity: str, city: str) -> Optional[Dict[str, Any]]:
+    """Recompute a city's summary at the end of an ingest."""
+    with get_db_cursor() as cursor, query_timer(f"{entity}_summary_refresh"):
+        cursor.execute(summary_sql(entity), {"entity": entity, "city": city})
+        row = cursor.fetchone()
+        if row is None:
+            # every listing is gone: don't leave the old counts behind
+            cursor.execute("DELETE FROM city_summaries WHERE entity = %s AND city = %s", (entity, city))
+    return row[0] if row else None
+
+
+async def get_city_summary(entity: str, city: str) -> Optional[Dict[str, Any]]:
+    """Stored summary for a city, computed on first request if missing."""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "SELECT summary, updated_at FROM city_summaries WHERE entity = %s AND city = %s",
+            (entity, city),
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            with query_timer(f"{entity}_summary_refresh"):
+                await cursor.execute(summary_sql(entity), {"entity": entity, "city": city})
+                row = await cursor.fetchone()
+    if row is None:
+        return None
+    return {"entity": entity, "city": city, "updated_at": row[1], "summary": row[0]}
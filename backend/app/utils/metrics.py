@@ -0,0 +1,227 @@
+# metrics.py
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated on the hot path (a dict lookup and a
+few additions under a lock); pool, cache and buffer stats are read only
+when /metrics is scraped, through registered collectors. Every uvicorn
+worker keeps its own values, so scrape each worker or run one per pod.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; covers sub-millisecond cache hits up to slow full-city ingests
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Mapping[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_label_str(self.labels, key)} {_number(v)}" for key, v in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (non-cumulative, last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the block, including time spent awaiting."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {k: (list(counts), total) for k, (counts, total) in self._values.items()}
+        lines = self.header()
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {cumulative}")
+        return lines
+
+
+def _gauge_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(p for p in parts if p))
+
+
+def _flatten(prefix: str, stats: Mapping[str, Any]) -> Iterator[Tuple[str, float]]:
+    """Numeric leaves of a stats dict; strings and lists are skipped."""
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            yield _gauge_name(prefix, key), int(value)
+        elif isinstance(value, (int, float)):
+            yield _gauge_name(prefix, key), value
+        elif isinstance(value, Mapping):
+            yield from _flatten(_gauge_name(prefix, key), value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        self.collectors: List[Tuple[str, Callable[[], Mapping[str, Any]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, prefix: str, stats: Callable[[], Mapping[str, Any]]):
+        """
+        Expose the numeric values of an existing `stats()` dict as gauges
+        named <prefix>_<key>, read at scrape time.
+        """
+        self.collectors.append((prefix, stats))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines += metric.render()
+        for prefix, stats in self.collectors:
+            try:
+                values = list(_flatten(prefix, stats()))
+            except Exception:
+                continue  # e.g. a pool that isn't open yet
+            for name, value in values:
+                lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status")
+)
+db_query_seconds = registry.histogram(
+    "db_query_duration_seconds", "Database statement latency by query name.", ("query",)
+)
+fetch_page_seconds = registry.histogram(
+    "fetch_page_duration_seconds", "Latency of one list page, by where it came from.", ("endpoint", "source")
+)
+fetch_errors = registry.counter(
+    "fetch_errors_total", "Failed tripadvisor requests, including retried ones.", ("endpoint", "reason")
+)
+
+
+def query_timer(name: str):
+    """`with query_timer("hotels_page"): await cur.execute(...)`"""
+    return db_query_seconds.time(query=name)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording one latency observation per HTTP request,
+    labelled with the matched route template (e.g. /jobs/{job_id}) so
+    path parameters don't explode the label set. Also feeds the profiler.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        token = self.profiler.request_started() if self.profiler is not None else None
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            # the router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_seconds.observe(elapsed, method=scope["method"], route=path, status=status)
+            if token is not None:
+                self.profiler.request_finished(token, f"{scope['method']} {path}", elapsed)
@@ -0,0 +1,110 @@
+# mmap_store.py
+"""
+Immutable versions of .npy arrays on disk, read memory-mapped so every
+worker process shares one page-cache copy.
+
+    root/v<ns>/*.npy     one version, never modified after publish
+    root/.v<ns>.partial  a version being written
+    root/current         symlink to the live version, swapped atomically
+
+Readers that mapped an older version keep it until they notice the swap;
+the previous `keep` versions stay on disk for them.
+"""
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def save_arrays(path: str, arrays: Dict[str, np.ndarray]):
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+
+
+def load_arrays(path: str, names: Iterable[str]) -> Dict[str, np.ndarray]:
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in names}
+
+
+def version_ns(version: str) -> int:
+    return int(version[1:])
+
+
+def publish(root: str, write: Callable[[str], None], keep: int = 2) -> str:
+    """
+    Let `write(path)` fill a new version directory, then make it current.
+
+    The version is named when the write starts, and it is built under a
+    hidden name so pruning never sees it half-written. If a version that
+    started later was published meanwhile, the new one is dropped and the
+    current version is returned.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    building = os.path.join(root, f".{version}.partial")
+    try:
+        write(building)
+    except BaseException:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+    current = current_version(root)
+    if current is not None and version_ns(current) > version_ns(version):
+        shutil.rmtree(building, ignore_errors=True)
+        return current
+    os.rename(building, os.path.join(root, version))
+    link = os.path.join(root, f"current.{version}")
+    os.symlink(version, link)
+    os.replace(link, os.path.join(root, "current"))
+
+    versions = sorted(d for d in os.listdir(root) if d.startswith("v"))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
+
+
+def current_version(root: str) -> Optional[str]:
+    try:
+        return os.readlink(os.path.join(root, "current"))
+    except OSError:
+        return None
+
+
+class CurrentVersion(Generic[T]):
+    """
+    The loaded current version under `root`. The symlink is checked at
+    most every `reload_sec`, and `load(path)` runs again when it moved.
+    """
+
+    def __init__(self, root: str, load: Callable[[str], T], reload_sec: float):
+        self.root = root
+        self.load = load
+        self.reload_sec = reload_sec
+        self.version: Optional[str] = None
+        self.value: Optional[T] = None
+        self.last_error: Optional[str] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[T]:
+        now = time.monotonic()
+        if now - self._checked < self.reload_sec:
+            return self.value
+        with self._lock:
+            self._checked = now
+            version = current_version(self.root)
+            if version is not None and version != self.version:
+                try:
+                    self.value = self.load(os.path.join(self.root, version))
+                    self.version = version
+                except (OSError, ValueError) as e:
+                    # pruned between readlink and load; the next check retries
+                    self.last_error = str(e)
+        return self.value
+
+    def expire(self):
+        """Re-check the symlink on the next get(), e.g. right after publishing."""
+        self._checked = 0.0
@@ -0,0 +1,144 @@
+# profiler.py
+"""
+Opt-in sampling profiler for slow requests.
+
+While enabled, a daemon thread snapshots the event loop thread's stack
+every `interval_ms`, but only while requests are in flight. When a request
+takes longer than `threshold_ms`, the samples taken during it are folded
+into per-route collapsed stacks ("outer;inner;leaf count", the input format
+of flamegraph.pl / speedscope).
+
+Requests share the event loop, so a slow request's samples also contain
+whatever ran concurrently with it; stacks ending in the selector are time
+the loop spent waiting on I/O (usually the database).
+
+Toggle it at runtime with POST /debug/profiler or start it enabled with
+PROFILER_ENABLED=1.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_SLOW_MS = float(os.getenv("PROFILER_SLOW_MS", "250"))
+# below this the sampler thread busy-loops and starves the event loop of the GIL
+PROFILER_MIN_INTERVAL_MS = 1.0
+PROFILER_MAX_SAMPLES = 20_000
+PROFILER_MAX_DEPTH = 64
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None and len(names) < PROFILER_MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        interval_ms: float = PROFILER_INTERVAL_MS,
+        threshold_ms: float = PROFILER_SLOW_MS,
+        max_samples: int = PROFILER_MAX_SAMPLES,
+    ):
+        self.interval_ms = max(interval_ms, PROFILER_MIN_INTERVAL_MS)
+        self.threshold_ms = threshold_ms
+        self.enabled = False
+        self._samples: deque = deque(maxlen=max_samples)  # (seq, collapsed stack)
+        self._seq = 0
+        self._in_flight = 0
+        self._target: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        self.stacks: Dict[str, Counter] = {}
+        self.slow_requests: deque = deque(maxlen=100)
+
+    def enable(self, interval_ms: Optional[float] = None, threshold_ms: Optional[float] = None):
+        """Start sampling the calling thread, which must be the event loop thread."""
+        if interval_ms is not None:
+            self.interval_ms = max(interval_ms, PROFILER_MIN_INTERVAL_MS)
+        if threshold_ms is not None:
+            self.threshold_ms = threshold_ms
+        self._target = threading.get_ident()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self.stacks = {}
+            self.slow_requests.clear()
+
+    def request_started(self) -> Optional[int]:
+        if not self.enabled:
+            return None
+        self._in_flight += 1
+        return self._seq
+
+    def request_finished(self, token: int, route: str, elapsed: float):
+        self._in_flight -= 1
+        if elapsed * 1000 < self.threshold_ms:
+            return
+        with self._lock:
+            samples = [stack for seq, stack in self._samples if seq > token]
+            self.stacks.setdefault(route, Counter()).update(samples)
+            self.slow_requests.append({
+                "route": route, "ms": round(elapsed * 1000, 1), "samples": len(samples), "at": time.time(),
+            })
+
+    def _run(self):
+        while not self._stop.wait(self.interval_ms / 1000):
+            if not self._in_flight:
+                continue
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = _collapse(frame)
+            with self._lock:
+                self._seq += 1
+                self._samples.append((self._seq, stack))
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """Folded stacks for one route (or all of them), one line per stack."""
+        with self._lock:
+            total = Counter()
+            for name, stacks in self.stacks.items():
+                if route is None or name == route:
+                    total.update(stacks)
+        return "".join(f"{stack} {n}\n" for stack, n in total.most_common())
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            routes = {
+                name: [{"stack": stack, "samples": n} for stack, n in stacks.most_common(top)]
+                for name, stacks in self.stacks.items()
+            }
+            slow = list(self.slow_requests)[-50:]
+        return {
+            "enabled": self.enabled,
+            "interval_ms": self.interval_ms,
+            "threshold_ms": self.threshold_ms,
+            "buffered_samples": len(self._samples),
+            "slow_requests": slow,
+            "hot_stacks": routes,
+        }
+
+
+profiler = SamplingProfiler()
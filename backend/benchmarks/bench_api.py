@@ -0,0 +1,157 @@
+# benchmarks/bench_api.py
+"""
+Concurrent load benchmark for every read endpoint, /recommend and /clicks.
+
+Load a data set with datagen.py, start the API on it, then run the same
+--scale so requests hit cities, hotels and sessions that exist:
+
+    python benchmarks/datagen.py db --scale 100k --schema bench --clicks 100000
+    PGOPTIONS="-c search_path=bench,public" uvicorn main:app --port 8000
+    python benchmarks/bench_api.py --scale 100k --concurrency 64 --requests 2000 \\
+        --label after --out after.json --baseline before.json
+
+Pick scenarios with e.g. --scenarios clicks,clicks_burst. clicks_burst
+fires --burst concurrent clicks with no warm-up, to exercise the click
+buffer's back-pressure (503s count as errors).
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+
+import httpx
+
+from bench_report import compare, print_result, summarize, write_results
+from datagen import CUISINES, HIGHLIGHTS, city_of, city_plan, hotel_ids, parse_scale, session_clicks
+
+
+async def run_scenario(client, name, make_request, total, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                resp = await make_request(client)
+                if resp.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return summarize(name, latencies, elapsed, errors, concurrency=concurrency)
+
+
+def build_scenarios(args, rng):
+    plan = [c for c in city_plan(parse_scale(args.scale)) if c["count"]]
+    weights = [c["count"] for c in plan]
+    click_ids = itertools.count()
+
+    def city():
+        return rng.choices(plan, weights)[0]
+
+    def point():
+        c = city()
+        return c["lat"] + rng.gauss(0, 0.02), c["lng"] + rng.gauss(0, 0.02)
+
+    def box(half=0.01):
+        lat, lng = point()
+        return {"min_lat": lat - half, "min_lng": lng - half, "max_lat": lat + half, "max_lng": lng + half}
+
+    def hotel():
+        return rng.choice(hotel_ids(city()))
+
+    # sessions datagen.py wrote to user_clicks, with the city they browsed
+    sessions = {}
+    for session_id, hotel_id in session_clicks(plan, 5000):
+        sessions.setdefault(session_id, city_of(plan, hotel_id)["city"])
+    sessions = list(sessions.items())
+
+    def recommend(c):
+        session_id, city_name = rng.choice(sessions)
+        return c.get("/recommend", params={"session_id": session_id, "city": city_name, "limit": 5})
+
+    def click(c):
+        return c.post("/clicks", json={"session_id": f"load-{next(click_ids) % 5000}", "hotel_id": hotel()})
+
+    def tags(values, k):
+        return [v for v, _ in rng.sample(values, k)]
+
+    return {
+        "hotels_filter": lambda c: c.post("/hotels/filter", json={
+            "rating_min": rng.choice([3, 3.5, 4, 4.5]), "rating_max": 5,
+            "price_min": rng.choice([0, 50, 100]), "price_max": rng.choice([200, 400, 1000]),
+        }),
+        "hotels_filter_city_facets": lambda c: c.post("/hotels/filter", json={
+            "rating_min": 0, "rating_max": 5, "city": city()["city"],
+            "highlights": tags(HIGHLIGHTS[:10], 2), "highlights_match": "any", "facets": True,
+        }),
+        "hotels_list": lambda c: c.get("/api/hotels", params={"limit": 100, "min_rating": rng.choice([0, 4])}),
+        "restaurants_filter": lambda c: c.post("/restaurants/filter", json={
+            "rating_min": rng.choice([3, 4]), "rating_max": 5, "price_min": rng.choice([1, 2]),
+        }),
+        "restaurants_list_cuisines": lambda c: c.get("/api/restaurants", params={
+            "city": city()["city"], "cuisines": ",".join(tags(CUISINES[:8], 2)), "facets": "true", "limit": 100,
+        }),
+        "hotels_nearby": lambda c: c.get("/hotels/nearby", params=dict(zip(("lat", "lng"), point()), radius_km=2)),
+        "restaurants_nearby": lambda c: c.get("/restaurants/nearby", params=dict(zip(("lat", "lng"), point()))),
+        "hotels_viewport": lambda c: c.get("/hotels/viewport", params=box()),
+        "restaurants_viewport": lambda c: c.get("/restaurants/viewport", params={**box(), "sort": "rating"}),
+        "restaurants_near_hotel": lambda c: c.get(f"/hotels/{hotel()}/restaurants"),
+        "summary": lambda c: c.get(f"/api/summary/{rng.choice(['hotels', 'restaurants'])}",
+                                   params={"city": city()["city"]}),
+        "recommend": recommend,
+        "clicks": click,
+        "clicks_burst": click,
+    }
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    scenarios = build_scenarios(args, rng)
+    names = list(scenarios) if args.scenarios == "all" else args.scenarios.split(",")
+
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.burst))
+    results = []
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0) as client:
+        for name in names:
+            make_request = scenarios[name]
+            if name == "clicks_burst":
+                result = await run_scenario(client, name, make_request, args.burst * 4, args.burst)
+            else:
+                # warm up connections and server-side caches
+                await run_scenario(client, name, make_request, args.concurrency, args.concurrency)
+                result = await run_scenario(client, name, make_request, args.requests, args.concurrency)
+            results.append(result)
+            print_result(args.label, result)
+
+    if args.out:
+        write_results(args.out, "api", results, label=args.label, scale=args.scale,
+                      concurrency=args.concurrency, requests=args.requests, base_url=args.base_url)
+    if args.baseline:
+        return 1 if compare(results, args.baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scale", default="10k", help="the datagen.py scale the API was loaded with")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--burst", type=int, default=512, help="concurrent clients for clicks_burst")
+    parser.add_argument("--scenarios", default="all")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out")
+    parser.add_argument("--baseline", help="result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,119 @@
+# benchmarks/bench_bulk_upsert.py
+"""
+Hotel upsert throughput: execute_values vs COPY + set-based merge.
+
+Uses the DB_* settings from .env and a scratch `bench_hotels` table shaped
+like `hotels` (dropped and recreated on every size). For each size it runs
+
+  execute_values   the old ETL path (INSERT ... VALUES ... ON CONFLICT)
+  copy_merge       bulk_upsert into an empty table
+  copy_unchanged   bulk_upsert of the same rows again (all hashes match)
+
+    python benchmarks/bench_bulk_upsert.py --sizes 1000,100000,1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from psycopg2.extras import Json, execute_values
+
+from app.db.bulk import bulk_upsert
+from app.db.database import get_connection
+from app.services.etl import HOTEL_COLUMNS, HOTEL_JSON_COLUMNS
+from bench_fields import hotel_row
+
+CHUNK = 50_000
+
+DDL = """
+    DROP TABLE IF EXISTS bench_hotels;
+    CREATE TABLE bench_hotels (
+        id BIGINT PRIMARY KEY, city TEXT, name TEXT, rating NUMERIC, address TEXT,
+        price_min NUMERIC, price_max NUMERIC, price_avg NUMERIC,
+        link TEXT, lat DOUBLE PRECISION, lng DOUBLE PRECISION,
+        reviews INTEGER, phone TEXT, detailed_address JSONB, ranking JSONB,
+        featured_image TEXT, highlights JSONB, providers JSONB,
+        content_hash TEXT
+    );
+"""
+
+
+def synthetic_rows(n, seed=7):
+    rng = random.Random(seed)
+    for i in range(n):
+        h = hotel_row(i, rng)
+        yield tuple(h[c] for c in HOTEL_COLUMNS)
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_execute_values(conn, n):
+    json_idx = [HOTEL_COLUMNS.index(c) for c in HOTEL_JSON_COLUMNS]
+    cols = ", ".join(HOTEL_COLUMNS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in HOTEL_COLUMNS if c != "id")
+    query = f"INSERT INTO bench_hotels ({cols}) VALUES %s ON CONFLICT (id) DO UPDATE SET {updates}"
+    with conn.cursor() as cur:
+        for chunk in chunks(synthetic_rows(n), CHUNK):
+            rows = [tuple(Json(v) if i in json_idx else v for i, v in enumerate(r)) for r in chunk]
+            execute_values(cur, query, rows)
+            conn.commit()
+    return n
+
+
+def run_copy_merge(conn, n):
+    changed = 0
+    with conn.cursor() as cur:
+        for chunk in chunks(synthetic_rows(n), CHUNK):
+            changed += bulk_upsert(cur, "bench_hotels", HOTEL_COLUMNS, chunk, json_columns=HOTEL_JSON_COLUMNS)
+            conn.commit()
+    return changed
+
+
+def timed(label, fn, conn, n):
+    start = time.perf_counter()
+    written = fn(conn, n)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<15} {n / elapsed:>12,.0f} rows/s   {elapsed:>8.2f} s   {written:>9,} rows written")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        for n in (int(s) for s in args.sizes.split(",")):
+            print(f"{n:,} rows")
+            with conn.cursor() as cur:
+                cur.execute(DDL)
+            conn.commit()
+            timed("execute_values", run_execute_values, conn, n)
+
+            with conn.cursor() as cur:
+                cur.execute(DDL)
+            conn.commit()
+            timed("copy_merge", run_copy_merge, conn, n)
+            timed("copy_unchanged", run_copy_merge, conn, n)
+
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS bench_hotels")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
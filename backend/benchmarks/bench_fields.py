@@ -0,0 +1,88 @@
+# benchmarks/bench_fields.py
+"""
+Payload size and serialization time per field preset.
+
+Builds synthetic hotel/restaurant rows shaped like the DB results and runs
+them through the same path FastAPI uses for a dict response
+(jsonable_encoder + JSONResponse.render). No database needed:
+
+    python benchmarks/bench_fields.py --rows 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services.api.fields import (
+    HOTEL_COLUMNS, HOTEL_PRESETS, RESTAURANT_COLUMNS, RESTAURANT_PRESETS, resolve_fields,
+)
+
+HIGHLIGHTS = ["Free Wifi", "Pool", "Spa", "Gym", "Breakfast included", "Pet friendly", "Bar", "Parking"]
+CUISINES = ["Italian", "American", "Pizza", "Cafe", "Japanese", "Mexican", "Seafood", "Vegetarian Friendly"]
+
+
+def hotel_row(i, rng):
+    pmin = Decimal(rng.randint(40, 400))
+    pmax = pmin + rng.randint(0, 300)
+    return {
+        "id": 100000 + i, "name": f"Hotel {i}", "rating": Decimal(str(round(rng.uniform(2.5, 5), 1))),
+        "address": f"{i} Main St", "price_min": pmin, "price_max": pmax, "price_avg": (pmin + pmax) / 2,
+        "link": f"https://www.tripadvisor.com/Hotel_Review-d{i}", "lat": rng.uniform(40.5, 40.9),
+        "lng": rng.uniform(-74.1, -73.7), "city": "new york", "reviews": rng.randint(0, 20000),
+        "phone": "+1 212 555 0100",
+        "detailed_address": {"street": f"{i} Main St", "city": "New York", "postal_code": "10001", "country": "US"},
+        "ranking": {"current_rank": i, "total": 500, "ranking_string": f"#{i} of 500 hotels in New York"},
+        "featured_image": f"https://media-cdn.tripadvisor.com/media/photo-o/{i}.jpg",
+        "highlights": rng.sample(HIGHLIGHTS, rng.randint(1, 6)),
+        "providers": [{"name": p, "price": rng.randint(50, 500)} for p in ("Booking.com", "Expedia", "Hotels.com")],
+    }
+
+
+def restaurant_row(i, rng):
+    pmin = rng.randint(1, 3)
+    return {
+        "id": 200000 + i, "name": f"Restaurant {i}", "rating": Decimal(str(round(rng.uniform(2.5, 5), 1))),
+        "reviews": rng.randint(0, 5000), "price_range": "$" * pmin, "price_min": pmin,
+        "price_max": pmin + rng.randint(0, 1), "link": f"https://www.tripadvisor.com/Restaurant_Review-d{i}",
+        "lat": rng.uniform(40.5, 40.9), "lng": rng.uniform(-74.1, -73.7), "city": "new york",
+        "featured_image": f"https://media-cdn.tripadvisor.com/media/photo-o/r{i}.jpg",
+        "is_sponsored": False, "has_delivery": rng.random() < 0.3, "is_premium": False,
+        "cuisines": rng.sample(CUISINES, rng.randint(1, 3)),
+        "menu_link": None, "reservation_link": None,
+    }
+
+
+def bench(rows, columns, presets, repeat):
+    for preset in presets:
+        fields = resolve_fields(preset, columns, presets)
+        data = [{k: r[k] for k in fields} for r in rows]
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = JSONResponse(content=jsonable_encoder({"data": data})).body
+            best = min(best, time.perf_counter() - start)
+        print(f"  {preset:<5} {len(fields):>3} cols  {len(body) / 1024:>10.1f} KiB  {best * 1000:>9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"hotels ({args.rows} rows)")
+    bench([hotel_row(i, rng) for i in range(args.rows)], HOTEL_COLUMNS, HOTEL_PRESETS, args.repeat)
+    print(f"restaurants ({args.rows} rows)")
+    bench([restaurant_row(i, rng) for i in range(args.rows)], RESTAURANT_COLUMNS, RESTAURANT_PRESETS, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
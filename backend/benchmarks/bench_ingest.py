@@ -0,0 +1,169 @@
+# benchmarks/bench_ingest.py
+"""
+Full-city ingest benchmark: fetch -> ETL -> upsert against the mock API.
+
+Starts benchmarks/mock_tripadvisor.py on the datagen.py data set (or uses
+--base-url), then ingests the largest --cities cities of each entity into
+a scratch schema of the .env database, twice:
+
+  ingest_<entity>_full    every page upserted, as on a first ingest
+  ingest_<entity>_delta   the same data again; unchanged pages are skipped
+
+Throughput is rows/s (pages/s for the delta run); p50/p99 are per list
+page, as seen by the ingest.
+
+    python benchmarks/bench_ingest.py --scale 100k --cities 4 --latency-ms 150 \\
+        --out ingest.json --baseline ingest-before.json
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+SCHEMA = "bench_ingest"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import httpx
+
+from bench_report import compare, print_result, summarize, write_results
+from datagen import city_plan, parse_scale
+
+
+def start_mock(args) -> subprocess.Popen:
+    cmd = [
+        sys.executable, os.path.join(HERE, "mock_tripadvisor.py"), "serve",
+        "--synthetic", args.scale, "--port", str(args.mock_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+    ]
+    proc = subprocess.Popen(cmd)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{args.mock_port}/docs", timeout=1.0)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("mock API did not start")
+
+
+async def ingest_all(entity, cities, api_key, parallel, delta):
+    from app.services.ingest import ingest_city
+
+    sem = asyncio.Semaphore(parallel)
+
+    async def one(city):
+        async with sem:
+            return await ingest_city(entity, city, api_key, "mock", delta=delta, resume=False)
+
+    return await asyncio.gather(*(one(c) for c in cities))
+
+
+def run(args):
+    # everything below imports the app, which reads these at import time
+    os.environ.update({
+        "PGOPTIONS": f"-c search_path={args.schema},public",
+        "CACHE_ENABLED": "0",
+        "FETCH_CACHE_MODE": "off",
+        "TRIPADVISOR_BASE_URL": args.base_url or f"http://127.0.0.1:{args.mock_port}",
+        "FETCH_CONCURRENCY": str(args.concurrency),
+        "RAPIDAPI_RATE_PER_SEC": str(args.rate),
+        "RAPIDAPI_BURST": str(args.concurrency),
+    })
+    from app.db.database import get_db_cursor, pool
+    from app.services import fetch_common
+    from app.utils.log import setup_logging
+    from datagen import prepare_schema
+
+    setup_logging("WARNING")  # per-batch ETL lines would drown the report
+
+    page_ms = []
+    fetch_payload = fetch_common.fetch_payload
+
+    async def timed_fetch_payload(*a, **kw):
+        start = time.perf_counter()
+        try:
+            return await fetch_payload(*a, **kw)
+        finally:
+            page_ms.append((time.perf_counter() - start) * 1000)
+
+    # iter_pages looks fetch_payload up at call time
+    fetch_common.fetch_payload = timed_fetch_payload
+
+    prepare_schema(args.schema)
+    plan = sorted(city_plan(parse_scale(args.scale)), key=lambda c: -c["count"])
+    cities = [c["city"] for c in plan[: args.cities]]
+    results = []
+    try:
+        for entity in args.entities.split(","):
+            with get_db_cursor() as cursor:
+                cursor.execute(f"TRUNCATE {entity}")
+                cursor.execute("DELETE FROM ingest_checkpoints WHERE entity = %s", (entity,))
+                cursor.execute("DELETE FROM ingest_page_fingerprints WHERE entity = %s", (entity,))
+            for mode, delta in (("full", False), ("delta", True)):
+                page_ms.clear()
+                start = time.perf_counter()
+                stats = asyncio.run(ingest_all(entity, cities, "bench", args.parallel, delta))
+                elapsed = time.perf_counter() - start
+                rows = sum(s["rows_upserted"] for s in stats)
+                pages = sum(s["pages_fetched"] for s in stats)
+                errors = sum(len(s["errors"]) for s in stats)
+                # a delta run upserts next to nothing, so it is measured in pages checked
+                units, unit = (rows, "rows") if mode == "full" else (pages, "pages")
+                result = summarize(
+                    f"ingest_{entity}_{mode}", list(page_ms), elapsed, errors, units=units, unit=unit,
+                    pages=pages, rows=rows,
+                    pages_unchanged=sum(s["pages_unchanged"] for s in stats),
+                    rows_changed=sum(s["rows_changed"] for s in stats),
+                    seconds=round(elapsed, 2),
+                )
+                results.append(result)
+                print_result(args.label, result)
+    finally:
+        pool.closeall()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k")
+    parser.add_argument("--cities", type=int, default=3, help="largest N cities of the data set")
+    parser.add_argument("--entities", default="hotels,restaurants")
+    parser.add_argument("--parallel", type=int, default=1, help="cities ingested at once")
+    parser.add_argument("--concurrency", type=int, default=5, help="pages in flight per city")
+    parser.add_argument("--rate", type=float, default=1000, help="API requests/sec")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=30)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--mock-port", type=int, default=8098)
+    parser.add_argument("--base-url", help="use an already running mock instead of starting one")
+    parser.add_argument("--schema", default=SCHEMA)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    mock = None if args.base_url else start_mock(args)
+    try:
+        results = run(args)
+    finally:
+        if mock is not None:
+            mock.terminate()
+            mock.wait()
+
+    if args.out:
+        write_results(args.out, "ingest", results, label=args.label, scale=args.scale, cities=args.cities,
+                      parallel=args.parallel, concurrency=args.concurrency, latency_ms=args.latency_ms,
+                      error_rate=args.error_rate)
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else 0
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/bench_report.py
+"""
+Result files shared by the benchmark scripts, and a baseline comparison.
+
+Every benchmark writes {"meta": {...}, "results": [...]} with one entry
+per scenario (throughput, p50, p99, errors). Compare a run against a
+baseline; exits 1 if any scenario got slower by more than the tolerance:
+
+    python benchmarks/bench_report.py after.json --baseline before.json --tolerance 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# metric -> True if higher is better
+METRICS = {"throughput": True, "p50_ms": False, "p99_ms": False}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(pct / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def summarize(name: str, latencies_ms: List[float], elapsed: float, errors: int = 0,
+              units: int = 0, unit: str = "req", **extra) -> Dict[str, Any]:
+    """
+    One scenario's result. `units` is what throughput counts (requests by
+    default, or e.g. rows for an ingest) over the wall time `elapsed`.
+    """
+    units = units or len(latencies_ms)
+    return {
+        "scenario": name,
+        "count": len(latencies_ms),
+        "errors": errors,
+        "throughput": round(units / elapsed, 1) if elapsed else 0.0,
+        "unit": f"{unit}/s",
+        "p50_ms": round(statistics.median(latencies_ms), 2) if latencies_ms else 0.0,
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        **extra,
+    }
+
+
+def print_result(label: str, r: Dict[str, Any]):
+    print(
+        f"{label:>8} {r['scenario']:<28} {r['throughput']:>11,.1f} {r['unit']:<7} "
+        f"p50 {r['p50_ms']:>9.2f} ms  p99 {r['p99_ms']:>9.2f} ms  errors {r['errors']}"
+    )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, results: List[Dict[str, Any]], **meta):
+    doc = {
+        "meta": {
+            "benchmark": benchmark,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "host": platform.node(),
+            **meta,
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        doc = json.load(f)
+    results = doc["results"] if isinstance(doc, dict) else doc  # older files were a bare list
+    return {r["scenario"]: r for r in results}
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float = 0.1) -> int:
+    """Print per-metric changes against the baseline; returns the number of regressions."""
+    baseline = load_results(baseline_path)
+    regressions = 0
+    print(f"\nvs {baseline_path} (tolerance {tolerance:.0%})")
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if base is None:
+            print(f"  {r['scenario']:<28} (not in baseline)")
+            continue
+        parts = []
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), r.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = " REGRESSION"
+                regressions += 1
+            parts.append(f"{metric} {old:,.1f} -> {new:,.1f} ({change:+.1%}){flag}")
+        print(f"  {r['scenario']:<28} " + "; ".join(parts))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("results")
+    parser.add_argument("--baseline", required=True)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+    regressions = compare(list(load_results(args.results).values()), args.baseline, args.tolerance)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
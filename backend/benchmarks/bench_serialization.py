@@ -0,0 +1,108 @@
+# benchmarks/bench_serialization.py
+"""
+Listing response serialization: the old per-row path against the fast path.
+
+old:  dict(zip()) per row, Python rating rounding / price_avg loops,
+      jsonable_encoder + json.dumps (what returning a dict from FastAPI does)
+fast: rows already shaped by SQL (rounded floats, derived price_avg),
+      dict(zip()) + orjson straight to bytes
+
+    python benchmarks/bench_serialization.py --rows 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services.api.fields import HOTEL_COLUMNS, RESTAURANT_COLUMNS
+from app.services.api.responses import FastJSONResponse
+from bench_fields import hotel_row, restaurant_row
+
+
+def old_hotels(rows):
+    hotels = [dict(zip(HOTEL_COLUMNS, row)) for row in rows]
+    for h in hotels:
+        h["rating"] = round(h["rating"], 1) if h["rating"] else None
+    return JSONResponse(content=jsonable_encoder({"data": hotels, "total": len(hotels)})).body
+
+
+def fast_hotels(rows):
+    hotels = [dict(zip(HOTEL_COLUMNS, row)) for row in rows]
+    return FastJSONResponse({"data": hotels, "total": len(hotels)}).body
+
+
+def old_restaurants(rows):
+    restaurants = [dict(zip(RESTAURANT_COLUMNS, row)) for row in rows]
+    for r in restaurants:
+        if r["price_min"] and r["price_max"]:
+            r["price_avg"] = (r["price_min"] + r["price_max"]) / 2
+        else:
+            r["price_avg"] = None
+    for r in restaurants:
+        if r["rating"]:
+            r["rating"] = round(r["rating"], 1)
+    return JSONResponse(content=jsonable_encoder({"data": restaurants, "total": len(restaurants)})).body
+
+
+def fast_restaurants(rows):
+    restaurants = [dict(zip(RESTAURANT_COLUMNS + ["price_avg"], row)) for row in rows]
+    return FastJSONResponse({"data": restaurants, "total": len(restaurants)}).body
+
+
+def as_db_rows(dicts, columns):
+    """Tuples as psycopg returns them for the old query (Decimal numerics)."""
+    return [tuple(d[c] for c in columns) for d in dicts]
+
+
+def as_shaped_rows(dicts, columns, derive_price_avg=False):
+    """Tuples as the SQL-shaped query returns them (float8, pre-rounded)."""
+    rows = []
+    for d in dicts:
+        row = [float(d[c]) if c in ("rating", "price_min", "price_max", "price_avg") and d[c] is not None else d[c]
+               for c in columns]
+        if derive_price_avg:
+            row.append((d["price_min"] + d["price_max"]) / 2.0)
+        rows.append(tuple(row))
+    return rows
+
+
+def timeit(fn, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    hotels = [hotel_row(i, rng) for i in range(args.rows)]
+    restaurants = [restaurant_row(i, rng) for i in range(args.rows)]
+
+    cases = [
+        ("hotels", old_hotels, as_db_rows(hotels, HOTEL_COLUMNS),
+         fast_hotels, as_shaped_rows(hotels, HOTEL_COLUMNS)),
+        ("restaurants", old_restaurants, as_db_rows(restaurants, RESTAURANT_COLUMNS),
+         fast_restaurants, as_shaped_rows(restaurants, RESTAURANT_COLUMNS, derive_price_avg=True)),
+    ]
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for name, old, old_rows, fast, fast_rows in cases:
+        t_old = timeit(old, old_rows, args.repeat)
+        t_fast = timeit(fast, fast_rows, args.repeat)
+        print(f"  {name:<12} old {t_old:>9.2f} ms   fast {t_fast:>8.2f} ms   {t_old / t_fast:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark per APP_PROFILE (see main.py).
+
+For each profile, in fresh processes:
+
+  startup_<profile>_import         `import main`, from python -X importtime
+  startup_<profile>_first_request  process start -> first 200 from the
+                                   profile's probe endpoint, via uvicorn
+
+p50/p99 are over --runs (after one warm-up run that compiles .pyc files).
+The import result also lists where the time went, per package (and per
+app module), from the median run. The app migrates on start, so point it
+at the .env database as for bench_api.py:
+
+    python benchmarks/bench_startup.py --profiles read,ingest,all --runs 5 \\
+        --out startup.json --baseline startup-before.json
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import httpx
+
+from bench_report import compare, print_result, summarize, write_results
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# a cheap request each profile can only answer once its routers are up
+PROBES = {
+    "read": "/api/hotels?limit=1&fields=id",
+    "ingest": "/scheduler",
+    "all": "/api/hotels?limit=1&fields=id",
+}
+
+
+def _env(profile: str) -> Dict[str, str]:
+    return {**os.environ, "APP_PROFILE": profile, "LOG_LEVEL": "WARNING"}
+
+
+def module_group(name: str) -> str:
+    parts = name.split(".")
+    return ".".join(parts[:3]) if parts[0] == "app" else parts[0]
+
+
+def import_once(profile: str) -> Tuple[float, Counter]:
+    """Total `import main` time in ms, and self time per package."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND, env=_env(profile), capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise SystemExit(f"import main failed for {profile}:\n{proc.stderr[-2000:]}")
+    total = 0.0
+    groups: Counter = Counter()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        groups[module_group(name)] += int(self_us) / 1000
+        if name == "main":
+            total = int(cumulative_us) / 1000
+    return total, groups
+
+
+def first_request_once(profile: str, port: int, timeout: float) -> float:
+    """ms from spawning uvicorn to the first 200 from the profile's probe."""
+    url = f"http://127.0.0.1:{port}{PROBES[profile]}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=_env(profile),
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise SystemExit(f"uvicorn exited with {proc.returncode} for {profile}")
+            try:
+                if httpx.get(url, timeout=timeout).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise SystemExit(f"no 200 from {url} within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run_profile(profile: str, args) -> List[dict]:
+    import_once(profile)  # warm-up: .pyc files, page cache
+    imports: List[Tuple[float, Counter]] = [import_once(profile) for _ in range(args.runs)]
+    import_ms = [total for total, _ in imports]
+    _, groups = sorted(imports, key=lambda r: r[0])[len(imports) // 2]
+    top = {name: round(ms, 1) for name, ms in groups.most_common(args.top)}
+
+    first_request_once(profile, args.port, args.timeout)
+    first_ms = [first_request_once(profile, args.port, args.timeout) for _ in range(args.runs)]
+
+    return [
+        summarize(f"startup_{profile}_import", import_ms, sum(import_ms) / 1000, unit="starts",
+                  mean_ms=round(statistics.mean(import_ms), 1), modules=top),
+        summarize(f"startup_{profile}_first_request", first_ms, sum(first_ms) / 1000, unit="starts",
+                  mean_ms=round(statistics.mean(first_ms), 1), probe=PROBES[profile]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="read,ingest,all")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages listed per profile")
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = []
+    for profile in args.profiles.split(","):
+        for result in run_profile(profile, args):
+            results.append(result)
+            print_result(args.label, result)
+            if "modules" in result:
+                for name, ms in result["modules"].items():
+                    print(f"{'':>8}   {name:<40} {ms:>8.1f} ms")
+
+    if args.out:
+        write_results(args.out, "startup", results, label=args.label, runs=args.runs)
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else 0
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# benchmarks/check_query_plans.py
+"""
+Query-plan regression check for the read endpoints.
+
+Seeds a large synthetic dataset into a scratch `plan_check` schema of the
+database configured in .env (tables copied from public, then migrated),
+calls every read endpoint in-process, and runs EXPLAIN (ANALYZE) on each
+SQL statement the endpoint issued. Fails (exit 1) if a statement seq-scans
+hotels / restaurants / user_clicks or runs over its latency budget.
+
+    python benchmarks/check_query_plans.py --rows 200000
+    python benchmarks/check_query_plans.py --reseed --budget-ms 25
+
+The seeded schema is kept between runs and reused while it has --rows
+rows; drop it with --drop.
+
+This is the query-plan "test suite": the repo has no pytest setup, so it
+runs as a script next to the other benchmarks, and CI should treat a
+non-zero exit as a failed test.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+SCHEMA = "plan_check"
+# every connection the app opens (psycopg2 and psycopg) resolves its tables
+# in the scratch schema first; set before the app modules connect
+os.environ["PGOPTIONS"] = f"-c search_path={SCHEMA},public"
+os.environ["CACHE_ENABLED"] = "0"
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+import psycopg
+from psycopg2.extras import execute_values
+
+from app.db.async_database import async_pool, close_async_pool, open_async_pool
+from app.db.bulk import bulk_upsert
+from app.db.database import get_db_cursor, pool
+from app.services.etl import HOTEL_COLUMNS, HOTEL_JSON_COLUMNS
+from app.services.etl_res import RESTAURANT_COLUMNS
+from bench_fields import hotel_row, restaurant_row
+from datagen import prepare_schema
+
+GUARDED = {"hotels", "restaurants", "user_clicks"}
+CITIES = [f"City {i:02d}" for i in range(50)]
+SESSION = "plan-check"
+CHUNK = 50_000
+
+recorded = []
+
+
+class RecordingCursor(psycopg.AsyncCursor):
+    """Keeps every statement the endpoints execute so it can be EXPLAINed."""
+
+    async def execute(self, query, params=None, **kwargs):
+        recorded.append((query, params))
+        return await super().execute(query, params, **kwargs)
+
+
+def city_center(city):
+    i = CITIES.index(city)
+    return -40 + (i % 10) * 9.0, -120 + (i // 10) * 50.0
+
+
+def seed_rows(make_row, columns, n, seed):
+    rng = random.Random(seed)
+    for i in range(n):
+        row = make_row(i, rng)
+        city = CITIES[i % len(CITIES)]
+        lat, lng = city_center(city)
+        row.update(city=city, lat=lat + rng.uniform(-0.1, 0.1), lng=lng + rng.uniform(-0.1, 0.1))
+        yield tuple(row[c] for c in columns)
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed(rows, reseed):
+    prepare_schema(SCHEMA, reseed)
+    with get_db_cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {SCHEMA}.hotels")
+        seeded = cursor.fetchone()[0] >= rows
+    if seeded:
+        print(f"Reusing seeded schema {SCHEMA}")
+        return
+
+    print(f"Seeding {rows:,} hotels and {rows:,} restaurants into {SCHEMA}...")
+    for table, make_row, columns, json_cols in (
+        ("hotels", hotel_row, HOTEL_COLUMNS, HOTEL_JSON_COLUMNS),
+        ("restaurants", restaurant_row, RESTAURANT_COLUMNS, ["cuisines"]),
+    ):
+        for chunk in chunks(seed_rows(make_row, columns, rows, seed=len(table)), CHUNK):
+            with get_db_cursor() as cursor:
+                bulk_upsert(cursor, table, columns, chunk, json_columns=json_cols)
+
+    rng = random.Random(3)
+    with get_db_cursor() as cursor:
+        cursor.execute("TRUNCATE user_clicks")
+        clicks = [(f"s{rng.randrange(rows // 10)}", 100000 + rng.randrange(rows)) for _ in range(rows // 2)]
+        clicks += [(SESSION, 100000 + i * len(CITIES)) for i in range(5)]  # all in City 00
+        execute_values(cursor, "INSERT INTO user_clicks (session_id, hotel_id) VALUES %s", clicks)
+        cursor.execute("ANALYZE hotels, restaurants, user_clicks")
+
+
+def cases(budget):
+    lat, lng = city_center("City 07")
+    hotel_id = 100000 + 7
+    return [
+        ("hotels_filter", "POST", "/hotels/filter",
+         {"json": {"rating_min": 3.5, "rating_max": 5, "price_min": 50, "price_max": 400}}, budget),
+        ("hotels_filter_total", "POST", "/hotels/filter",
+         {"json": {"rating_min": 4.5, "rating_max": 5, "include_total": True}}, budget * 4),
+        ("hotels_list", "GET", "/api/hotels", {"params": {"limit": 500}}, budget),
+        ("restaurants_filter", "POST", "/restaurants/filter",
+         {"json": {"rating_min": 4, "rating_max": 5, "price_min": 2}}, budget),
+        ("restaurants_list", "GET", "/api/restaurants", {"params": {"limit": 500}}, budget),
+        ("hotels_city_highlights", "POST", "/hotels/filter",
+         {"json": {"rating_min": 0, "rating_max": 5, "city": "City 07", "highlights": ["Pool"],
+                   "facets": True}}, budget),
+        # cross-city facets aggregate every matching row (a third of the table here)
+        ("hotels_highlights_all", "GET", "/api/hotels",
+         {"params": {"highlights": "Pool,Spa", "highlights_match": "all", "facets": True}}, budget * 10),
+        ("restaurants_city_cuisines", "GET", "/api/restaurants",
+         {"params": {"city": "City 07", "cuisines": "Italian,Pizza", "facets": True}}, budget),
+        ("hotels_nearby", "GET", "/hotels/nearby", {"params": {"lat": lat, "lng": lng, "radius_km": 2}}, budget),
+        ("restaurants_nearby", "GET", "/restaurants/nearby", {"params": {"lat": lat, "lng": lng}}, budget),
+        ("hotels_viewport", "GET", "/hotels/viewport",
+         {"params": {"min_lat": lat - 0.02, "min_lng": lng - 0.02, "max_lat": lat + 0.02, "max_lng": lng + 0.02}},
+         budget),
+        ("restaurants_viewport_rating", "GET", "/restaurants/viewport",
+         {"params": {"min_lat": lat - 0.02, "min_lng": lng - 0.02, "max_lat": lat + 0.02, "max_lng": lng + 0.02,
+                     "sort": "rating"}}, budget),
+        ("restaurants_near_hotel", "GET", f"/hotels/{hotel_id}/restaurants", {}, budget),
+        ("recommend", "GET", "/recommend", {"params": {"session_id": SESSION, "city": "City 00"}}, budget * 2),
+        ("summary", "GET", "/api/summary/hotels", {"params": {"city": "City 07"}}, budget * 4),
+    ]
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, query, params):
+    sql = query.as_string(conn) if hasattr(query, "as_string") else query
+    async with conn.cursor() as cur:
+        # second run is the one measured, with a warm cache
+        for _ in range(2):
+            await cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+            plan = (await cur.fetchone())[0][0]
+    await conn.rollback()  # the summary upsert must not stick
+    return plan
+
+
+async def run(args):
+    from main import app
+
+    async_pool.kwargs = {**(async_pool.kwargs or {}), "cursor_factory": RecordingCursor}
+    await open_async_pool()
+    failures = 0
+    try:
+        conn = await psycopg.AsyncConnection.connect(async_pool.conninfo, autocommit=True)
+        # so /api/summary computes its summary instead of just looking it up
+        await conn.execute("DELETE FROM city_summaries")
+        await conn.set_autocommit(False)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://plan-check") as client:
+            for name, method, path, kwargs, budget in cases(args.budget_ms):
+                recorded.clear()
+                resp = await client.request(method, path, **kwargs)
+                if resp.status_code != 200:
+                    print(f"FAIL {name}: HTTP {resp.status_code} {resp.text[:200]}")
+                    failures += 1
+                    continue
+                for n, (query, params) in enumerate(list(recorded), 1):
+                    text = query.as_string(conn) if hasattr(query, "as_string") else query
+                    if not text.strip() or text.lstrip().upper().startswith("EXPLAIN"):
+                        continue  # pool health checks and planner row estimates
+                    plan = await explain(conn, query, params)
+                    ms = plan["Execution Time"]
+                    seq = sorted({node["Relation Name"] for node in plan_nodes(plan["Plan"])
+                                  if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in GUARDED})
+                    problems = []
+                    if seq:
+                        problems.append(f"seq scan on {', '.join(seq)}")
+                    if ms > budget:
+                        problems.append(f"{ms:.1f} ms > {budget:.0f} ms budget")
+                    status = "FAIL " + "; ".join(problems) if problems else "ok"
+                    failures += bool(problems)
+                    print(f"  {name:<28} q{n}  {ms:>8.2f} ms  {plan['Plan']['Node Type']:<22} {status}")
+                    if problems and args.verbose:
+                        print("    " + " ".join(text.split())[:400])
+        await conn.close()
+    finally:
+        await close_async_pool()
+        pool.closeall()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="hotels and restaurants each")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="per-statement execution budget")
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--drop", action="store_true", help="drop the scratch schema and exit")
+    parser.add_argument("--verbose", action="store_true", help="print the SQL of failing statements")
+    args = parser.parse_args()
+
+    if args.drop:
+        with get_db_cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        pool.closeall()
+        return
+
+    seed(args.rows, args.reseed)
+    failures = asyncio.run(run(args))
+    print(f"\n{failures} failing statement(s)" if failures else "\nAll query plans ok")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
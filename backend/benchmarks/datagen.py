@@ -0,0 +1,325 @@
+# benchmarks/datagen.py
+"""
+Synthetic hotels, restaurants and clicks for the benchmarks.
+
+Listings are shaped like tripadvisor-scraper list results and spread over
+real city centres, with city sizes, ratings, prices, highlights and
+cuisines drawn from skewed distributions so large cities, facet counts and
+price buckets look like real ones. Everything is derived from the page
+number, so the mock API and the DB sink produce identical data.
+
+    # raw pages for benchmarks/mock_tripadvisor.py serve --recordings data
+    python benchmarks/datagen.py pages --scale 100k --out data
+
+    # straight into a scratch schema of the .env database, plus clicks
+    python benchmarks/datagen.py db --scale 1m --schema bench --clicks 200000
+
+Scales are listings per entity: 10k, 100k, 1m or any integer. Point the
+API at the scratch schema with PGOPTIONS="-c search_path=bench,public".
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+PAGE_SIZE = 30  # results per page, as the real API returns
+FIRST_ID = {"hotels": 10_000_000, "restaurants": 50_000_000}
+
+# (city, lat, lng, relative price level)
+CITIES = [
+    ("New York", 40.7128, -74.0060, 1.4), ("London", 51.5072, -0.1276, 1.3),
+    ("Paris", 48.8566, 2.3522, 1.3), ("Tokyo", 35.6762, 139.6503, 1.1),
+    ("Rome", 41.9028, 12.4964, 1.0), ("Barcelona", 41.3874, 2.1686, 1.0),
+    ("Bangkok", 13.7563, 100.5018, 0.5), ("Istanbul", 41.0082, 28.9784, 0.6),
+    ("Dubai", 25.2048, 55.2708, 1.3), ("Sydney", -33.8688, 151.2093, 1.2),
+    ("Lisbon", 38.7223, -9.1393, 0.8), ("Mexico City", 19.4326, -99.1332, 0.6),
+    ("Berlin", 52.5200, 13.4050, 0.9), ("Prague", 50.0755, 14.4378, 0.7),
+    ("Cape Town", -33.9249, 18.4241, 0.6), ("Vancouver", 49.2827, -123.1207, 1.1),
+]
+
+# (value, share of listings that have it)
+HIGHLIGHTS = [
+    ("Free Wifi", 0.92), ("Air conditioning", 0.7), ("Non-smoking rooms", 0.6), ("Free breakfast", 0.45),
+    ("Fitness center", 0.4), ("Bar / lounge", 0.38), ("Restaurant", 0.36), ("Parking", 0.3),
+    ("Pool", 0.22), ("Pet friendly", 0.2), ("Airport transportation", 0.18), ("Spa", 0.12),
+    ("Family rooms", 0.12), ("Beach", 0.06), ("Rooftop", 0.05), ("Casino", 0.01),
+]
+CUISINES = [
+    ("Italian", 0.2), ("American", 0.15), ("Cafe", 0.14), ("European", 0.12), ("Pizza", 0.1),
+    ("Asian", 0.09), ("Japanese", 0.07), ("Mexican", 0.06), ("Seafood", 0.06), ("French", 0.05),
+    ("Mediterranean", 0.05), ("Vegetarian Friendly", 0.05), ("Chinese", 0.04), ("Indian", 0.04),
+    ("Thai", 0.03), ("Bar", 0.03), ("Steakhouse", 0.02), ("Vegan Options", 0.02), ("Sushi", 0.02),
+]
+
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    for suffix, mult in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * mult)
+    return int(value)
+
+
+def city_plan(n: int) -> List[Dict[str, Any]]:
+    """Listings per city (Zipf-like, the first city largest) and their id offsets."""
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(CITIES))]
+    total = sum(weights)
+    counts = [int(n * w / total) for w in weights]
+    counts[0] += n - sum(counts)
+    plan, offset = [], 0
+    for (city, lat, lng, price), count in zip(CITIES, counts):
+        plan.append({"city": city, "lat": lat, "lng": lng, "price": price, "count": count, "offset": offset})
+        offset += count
+    return plan
+
+
+def total_pages(count: int) -> int:
+    return max(1, math.ceil(count / PAGE_SIZE))
+
+
+def _rating(rng: random.Random) -> float:
+    # most listings sit between 3.5 and 4.8, with a tail of poor ones
+    return round(min(5.0, max(1.0, rng.betavariate(8, 2.2) * 5)) * 2) / 2
+
+
+def _sample_tags(rng: random.Random, tags, at_least: int = 0) -> List[str]:
+    chosen = [tag for tag, share in tags if rng.random() < share]
+    if len(chosen) < at_least:
+        chosen += [tag for tag, _ in rng.sample(tags, at_least) if tag not in chosen][: at_least - len(chosen)]
+    return chosen
+
+
+def _point(rng: random.Random, city: Dict[str, Any]) -> Tuple[float, float]:
+    # denser in the centre, ~10 km out at the edges
+    return (
+        round(city["lat"] + rng.gauss(0, 0.03), 6),
+        round(city["lng"] + rng.gauss(0, 0.03) / max(math.cos(math.radians(city["lat"])), 0.2), 6),
+    )
+
+
+def hotel_item(listing_id: int, rank: int, rng: random.Random, city: Dict[str, Any]) -> Dict[str, Any]:
+    lat, lng = _point(rng, city)
+    low = round(rng.lognormvariate(math.log(110 * city["price"]), 0.5))
+    return {
+        "id": listing_id,
+        "name": f"{city['city']} Hotel {rank}",
+        "rating": _rating(rng),
+        "reviews": int(rng.lognormvariate(5, 1.4)),
+        "link": f"https://www.tripadvisor.com/Hotel_Review-d{listing_id}",
+        "latitude": lat,
+        "longitude": lng,
+        "featured_image": f"https://media-cdn.tripadvisor.com/media/photo-o/{listing_id}.jpg",
+        "address": f"{rng.randint(1, 999)} Main St, {city['city']}",
+        "phone": f"+1 555 {rng.randint(1000000, 9999999)}",
+        "price_range_usd": {"min": low, "max": low + round(rng.lognormvariate(math.log(60), 0.6))},
+        "highlights": _sample_tags(rng, HIGHLIGHTS, at_least=1),
+        "detailed_address": {"street": f"{rng.randint(1, 999)} Main St", "city": city["city"]},
+        "ranking": {
+            "current_rank": rank, "total": city["count"],
+            "ranking_string": f"#{rank} of {city['count']} hotels in {city['city']}",
+        },
+        "providers": [
+            {"name": p, "price": low + rng.randint(0, 40)}
+            for p in rng.sample(["Booking.com", "Expedia", "Hotels.com", "Agoda", "Trip.com"], rng.randint(1, 4))
+        ],
+    }
+
+
+def restaurant_item(listing_id: int, rank: int, rng: random.Random, city: Dict[str, Any]) -> Dict[str, Any]:
+    lat, lng = _point(rng, city)
+    low = min(4, max(1, round(rng.gauss(1.8 * city["price"], 0.7))))
+    high = min(4, low + (rng.random() < 0.6))
+    price = "$" * low if low == high else f"{'$' * low} - {'$' * high}"
+    return {
+        "id": listing_id,
+        "name": f"{city['city']} Restaurant {rank}",
+        "rating": _rating(rng),
+        "reviews": int(rng.lognormvariate(4.5, 1.5)),
+        "link": f"https://www.tripadvisor.com/Restaurant_Review-d{listing_id}",
+        "latitude": lat,
+        "longitude": lng,
+        "featured_image": f"https://media-cdn.tripadvisor.com/media/photo-o/r{listing_id}.jpg",
+        "price_range_usd": price,
+        "cuisines": _sample_tags(rng, CUISINES, at_least=1)[:3],
+        "is_sponsored": rng.random() < 0.02,
+        "has_delivery": rng.random() < 0.35,
+        "is_premium": rng.random() < 0.05,
+        "menu_link": None,
+        "reservation_link": None,
+    }
+
+
+ITEM_MAKERS = {"hotels": hotel_item, "restaurants": restaurant_item}
+
+
+def page_items(entity: str, city: Dict[str, Any], page: int) -> List[Dict[str, Any]]:
+    """Results of one list page; the same (entity, city, page) always gives the same rows."""
+    start = (page - 1) * PAGE_SIZE
+    end = min(city["count"], start + PAGE_SIZE)
+    rng = random.Random(f"{entity}:{city['city']}:{page}")
+    make = ITEM_MAKERS[entity]
+    return [
+        make(FIRST_ID[entity] + city["offset"] + i, i + 1, rng, city)
+        for i in range(start, end)
+    ]
+
+
+def page_payload(entity: str, city: Dict[str, Any], page: int) -> Dict[str, Any]:
+    return {"results": page_items(entity, city, page), "total_pages": total_pages(city["count"])}
+
+
+def hotel_ids(city: Dict[str, Any]) -> range:
+    start = FIRST_ID["hotels"] + city["offset"]
+    return range(start, start + city["count"])
+
+
+def city_of(plan: List[Dict[str, Any]], hotel_id: int) -> Dict[str, Any]:
+    for city in plan:
+        if hotel_id in hotel_ids(city):
+            return city
+    raise KeyError(hotel_id)
+
+
+def session_clicks(plan: List[Dict[str, Any]], n: int, seed: int = 7) -> Iterator[Tuple[str, int]]:
+    """
+    ~n clicks from sessions that each browse one city and click 2-8 hotels,
+    favouring a popular head of each city so co-clicks repeat across sessions.
+    """
+    rng = random.Random(seed)
+    weights = [c["count"] for c in plan]
+    emitted = session = 0
+    while emitted < n:
+        city = rng.choices(plan, weights)[0]
+        ids = hotel_ids(city)
+        if not ids:
+            continue
+        for _ in range(min(rng.randint(2, 8), n - emitted)):
+            yield f"bench-{session}", ids[int(len(ids) * rng.random() ** 3)]
+            emitted += 1
+        session += 1
+
+
+def write_pages(args):
+    from mock_tripadvisor import page_file
+
+    plan = city_plan(parse_scale(args.scale))
+    for entity in args.entities.split(","):
+        for city in plan:
+            for page in range(1, total_pages(city["count"]) + 1):
+                path = page_file(args.out, entity, city["city"], page)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    json.dump(page_payload(entity, city, page), f)
+            print(f"{entity:<12} {city['city']:<14} {city['count']:>9,} rows")
+
+
+def prepare_schema(schema: str, reset: bool = False):
+    """
+    Scratch copies of hotels / restaurants / user_clicks in `schema`, migrated.
+    PGOPTIONS must already put `schema` first on the search_path.
+    """
+    from app.db.database import get_db_cursor
+    from app.db.migrate import run_migrations
+
+    with get_db_cursor() as cursor:
+        if reset:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        for table in ("hotels", "restaurants", "user_clicks"):
+            cursor.execute("SELECT to_regclass(%s)", (f"{schema}.{table}",))
+            if cursor.fetchone()[0] is None:
+                # columns only; the migrations add the indexes
+                cursor.execute(f"CREATE TABLE {schema}.{table} (LIKE public.{table} INCLUDING DEFAULTS)")
+                cursor.execute(f"ALTER TABLE {schema}.{table} ADD PRIMARY KEY (id)")
+    run_migrations()
+
+
+def load_db(args):
+    os.environ["PGOPTIONS"] = f"-c search_path={args.schema},public"
+    os.environ["CACHE_ENABLED"] = "0"
+    from psycopg2.extras import execute_values
+
+    from app.db.bulk import bulk_upsert
+    from app.db.database import get_db_cursor, pool
+    from app.services.etl import HOTEL_COLUMNS, HOTEL_JSON_COLUMNS, hotel_rows
+    from app.services.etl_res import RESTAURANT_COLUMNS, restaurant_rows
+    from app.services.summaries import refresh_city_summary
+
+    sinks = {
+        "hotels": (hotel_rows, HOTEL_COLUMNS, HOTEL_JSON_COLUMNS),
+        "restaurants": (restaurant_rows, RESTAURANT_COLUMNS, ["cuisines"]),
+    }
+    prepare_schema(args.schema, args.reset)
+    plan = city_plan(parse_scale(args.scale))
+    batch_pages = max(1, args.batch_size // PAGE_SIZE)
+    try:
+        for entity in args.entities.split(","):
+            to_rows, columns, json_columns = sinks[entity]
+            start = time.perf_counter()
+            rows = 0
+            for city in plan:
+                pages = total_pages(city["count"])
+                for first in range(1, pages + 1, batch_pages):
+                    by_id = {
+                        item["id"]: item
+                        for page in range(first, min(pages, first + batch_pages - 1) + 1)
+                        for item in page_items(entity, city, page)
+                    }
+                    with get_db_cursor() as cursor:
+                        bulk_upsert(cursor, entity, columns, to_rows({"city": city["city"], "by_id": by_id}),
+                                    json_columns=json_columns)
+                    rows += len(by_id)
+                refresh_city_summary(entity, city["city"])
+            elapsed = time.perf_counter() - start
+            print(f"{entity:<12} {rows:>10,} rows in {elapsed:6.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+        if args.clicks:
+            with get_db_cursor() as cursor:
+                cursor.execute("TRUNCATE user_clicks")
+                batch = []
+                for click in session_clicks(plan, args.clicks):
+                    batch.append(click)
+                    if len(batch) == 10_000:
+                        execute_values(cursor, "INSERT INTO user_clicks (session_id, hotel_id) VALUES %s", batch)
+                        batch = []
+                if batch:
+                    execute_values(cursor, "INSERT INTO user_clicks (session_id, hotel_id) VALUES %s", batch)
+            print(f"user_clicks  {args.clicks:>10,} rows")
+        with get_db_cursor() as cursor:
+            cursor.execute("ANALYZE hotels, restaurants, user_clicks")
+    finally:
+        pool.closeall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pages_p = sub.add_parser("pages", help="write raw API pages for the mock")
+    pages_p.add_argument("--out", default="recordings")
+
+    db_p = sub.add_parser("db", help="load rows into a scratch schema")
+    db_p.add_argument("--schema", default="bench")
+    db_p.add_argument("--reset", action="store_true", help="drop the scratch schema first")
+    db_p.add_argument("--clicks", type=int, default=0, help="user_clicks rows to generate")
+    db_p.add_argument("--batch-size", type=int, default=5000)
+
+    for p in (pages_p, db_p):
+        p.add_argument("--scale", default="10k", help="listings per entity: 10k, 100k, 1m, ...")
+        p.add_argument("--entities", default="hotels,restaurants")
+
+    args = parser.parse_args()
+    if args.command == "pages":
+        write_pages(args)
+    else:
+        load_db(args)
+
+
+if __name__ == "__main__":
+    main()
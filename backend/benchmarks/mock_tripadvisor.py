@@ -0,0 +1,153 @@
+# benchmarks/mock_tripadvisor.py
+"""
+Local stand-in for the tripadvisor-scraper API, serving recorded pages.
+
+Record a few cities once (uses API_KEY from .env, one request at a time):
+
+    python benchmarks/mock_tripadvisor.py record "new york" paris --out recordings
+
+then serve them and point the ingest at the mock:
+
+    python benchmarks/mock_tripadvisor.py serve --recordings recordings --port 8099
+    TRIPADVISOR_BASE_URL=http://127.0.0.1:8099 API_KEY=x \
+        python -m app.services.backfill "new york" paris
+
+Pages live in <recordings>/<entity>/<city-slug>/<page>.json as the raw API
+payload. Unknown cities and pages past the end return an empty page.
+
+Instead of recordings, --synthetic 100k serves the datagen.py data set
+without writing it to disk. --latency-ms / --jitter-ms add a per-request
+delay and --error-rate answers that share of requests with a 503, to
+exercise the fetch retries:
+
+    python benchmarks/mock_tripadvisor.py serve --synthetic 100k --latency-ms 150 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+from app.services.fetch_data import HOTELS_PATH
+from app.services.fetch_data_res import MAX_PAGES, RESTAURANTS_PATH
+
+API_HOST = "tripadvisor-scraper.p.rapidapi.com"
+PATHS = {"hotels": HOTELS_PATH, "restaurants": RESTAURANTS_PATH}
+
+
+def city_slug(city: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", city.lower()).strip("-")
+
+
+def page_file(root: str, entity: str, city: str, page: int) -> str:
+    return os.path.join(root, entity, city_slug(city), f"{page}.json")
+
+
+def create_app(
+    root: str,
+    latency_ms: float = 0,
+    jitter_ms: float = 0,
+    error_rate: float = 0,
+    synthetic: Optional[str] = None,
+) -> FastAPI:
+    app = FastAPI()
+    cities = {}
+    if synthetic:
+        from datagen import city_plan, page_payload, parse_scale
+
+        cities = {city_slug(c["city"]): c for c in city_plan(parse_scale(synthetic))}
+
+    def load(entity: str, city: str, page: int):
+        if synthetic:
+            plan = cities.get(city_slug(city))
+            return page_payload(entity, plan, page) if plan else None
+        try:
+            with open(page_file(root, entity, city, page), "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    async def serve(entity: str, city: str, page: int):
+        delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate and random.random() < error_rate:
+            return JSONResponse({"message": "injected error"}, status_code=503, headers={"Retry-After": "0"})
+        payload = await asyncio.to_thread(load, entity, city, page)
+        return payload if payload is not None else {"results": [], "total_pages": 1}
+
+    @app.get(HOTELS_PATH)
+    async def hotels(query: str, page: int = Query(1, ge=1)):
+        return await serve("hotels", query, page)
+
+    @app.get(RESTAURANTS_PATH)
+    async def restaurants(query: str, page: int = Query(1, ge=1)):
+        return await serve("restaurants", query, page)
+
+    return app
+
+
+def record(args):
+    load_dotenv()
+    api_key = args.api_key or os.getenv("API_KEY")
+    headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": API_HOST}
+    with httpx.Client(base_url=args.base_url, headers=headers, timeout=30.0) as client:
+        for city in args.cities:
+            for entity in args.entities.split(","):
+                page, total = 1, 1
+                while page <= min(total, args.max_pages):
+                    resp = client.get(PATHS[entity], params={"query": city, "page": page})
+                    resp.raise_for_status()
+                    payload = resp.json()
+                    path = page_file(args.out, entity, city, page)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "w") as f:
+                        json.dump(payload, f)
+                    if isinstance(payload, dict):
+                        total = int(payload.get("total_pages") or payload.get("pagination", {}).get("total_pages") or 1)
+                    print(f"recorded {entity} {city} page {page}/{total}")
+                    page += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_p = sub.add_parser("serve")
+    serve_p.add_argument("--recordings", default="recordings")
+    serve_p.add_argument("--host", default="127.0.0.1")
+    serve_p.add_argument("--port", type=int, default=8099)
+    serve_p.add_argument("--synthetic", metavar="SCALE", help="serve datagen.py data instead of recordings")
+    serve_p.add_argument("--latency-ms", type=float, default=0)
+    serve_p.add_argument("--jitter-ms", type=float, default=0)
+    serve_p.add_argument("--error-rate", type=float, default=0)
+
+    record_p = sub.add_parser("record")
+    record_p.add_argument("cities", nargs="+")
+    record_p.add_argument("--entities", default="hotels,restaurants")
+    record_p.add_argument("--out", default="recordings")
+    record_p.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    record_p.add_argument("--base-url", default=f"https://{API_HOST}")
+    record_p.add_argument("--api-key")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        app = create_app(args.recordings, args.latency_ms, args.jitter_ms, args.error_rate, args.synthetic)
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    else:
+        record(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,36 @@
-from fastapi import FastAPI, HTTPException, Query
-from typing import Any, Dict
-from app.services import etl
-from app.services.api.hotel_api import router as hotel_router
-from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine
-from app.services.api.res_api import router as res_router
-from app.services.etl_res import save_restaurants_to_db
-import os
-from dotenv import load_dotenv
+"""
+API entry point.
 
-from app.services import fetch_data
-from app.services import fetch_data_res
+APP_PROFILE picks what a process serves, so autoscaled read workers don't
+import or start the fetch / ETL stack:
 
+    read    listing, geo, summary, click and recommendation endpoints
+    ingest  ingest jobs, the scheduler, co-click training, snapshot builds
+    all     both (default)
 
-app = FastAPI(title="TripTreat API")
-app.include_router(hotel_router)
-app.include_router(res_router)
+Every profile also serves /metrics, /debug/profiler and the pool and
+cache stats. Router modules are imported by create_app() for the profile
+being built, never at module level.
+
+    APP_PROFILE=read uvicorn main:app --workers 4
+"""
+import os
+from contextlib import asynccontextmanager
 
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
 
-DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+from app.utils.log import setup_logging
+from app.utils.metrics import MetricsMiddleware, registry
+from app.utils.profiler import PROFILER_ENABLED, profiler
 
 load_dotenv()
+setup_logging()
 
-
+APP_PROFILE = os.getenv("APP_PROFILE", "all")
+PROFILES = {"read": {"read"}, "ingest": {"ingest"}, "all": {"read", "ingest"}}
 
 origins = [
     "http://localhost",
@@ -35,61 +38,119 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,  # you can use ["*"] for all origins during local dev
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-API_KEY = os.getenv("API_KEY")
-API_HOST = "tripadvisor-scraper.p.rapidapi.com"
-
-
-@app.get("/hotels")
-async def list_hotels(
-    city: str = Query(..., description="City to search (e.g., 'new york')"),
-) -> Dict[str, Any]:
-    """
-    Fetch all hotel pages for a city and store them in DB.
-    """
-    if not API_KEY:
-        raise HTTPException(status_code=500, detail="Missing API_KEY in environment")
-
-    try:
-        data = await fetch_data.fetch_hotels_all(city=city, api_key=API_KEY, api_host=API_HOST)
-        etl.save_hotels_to_db(data)
-        return {"message": f"Fetched and saved {data['count']} hotels for {city}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/restaurants")
-async def list_restaurants(
-    city: str = Query(..., description="City to search (e.g., 'new york')")
-) -> Dict[str, Any]:
-
-    if not API_KEY:
-        raise HTTPException(status_code=500, detail="Missing API_KEY in environment")
-
-    try:
-        data = await fetch_data_res.fetch_res_all(
-            city=city,
-            api_key=API_KEY,
-            api_host=API_HOST
-        )
-
-        save_restaurants_to_db(data)
-
-        return {
-            "message": f"Fetched and saved {data['count']} restaurants for {city}"
-        }
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/")
-def root():
-    return {"message": "Hotel API is running!"}
 
+def _register_collectors(parts: set):
+    from app.db.async_database import get_async_pool_stats
+    from app.db.database import get_pool_stats
+    from app.services.cache import result_cache
+    from app.services.catalog_snapshot import catalog_snapshots
+    from app.services.demand import demand_recorder
+    from app.services.response_cache import response_cache
+
+    registry.register_collector("db_pool_sync", get_pool_stats)
+    registry.register_collector("db_pool_async", get_async_pool_stats)
+    registry.register_collector("result_cache", result_cache.stats)
+    registry.register_collector("fetch_cache", response_cache.stats)
+    registry.register_collector("snapshot", catalog_snapshots.stats)
+    registry.register_collector("demand", demand_recorder.stats)
+    if "read" in parts:
+        from app.services.click_buffer import click_buffer
+        from app.services.coclick import coclick_model
+
+        registry.register_collector("click_buffer", click_buffer.stats)
+        registry.register_collector("coclick", coclick_model.stats)
+    if "ingest" in parts:
+        from app.services.jobs import job_manager
+
+        registry.register_collector("ingest", lambda: {"queue_depth": job_manager.queue_depth()})
+
+
+def _lifespan(parts: set):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        from app.db.async_database import close_async_pool, open_async_pool
+        from app.db.database import pool
+        from app.db.migrate import run_migrations
+        from app.services.catalog_snapshot import catalog_snapshots
+        from app.services.demand import demand_recorder
+
+        await run_in_threadpool(run_migrations)
+        # both profiles record demand; the scheduler reads it from Postgres
+        await demand_recorder.start()
+        if "read" in parts:
+            from app.services.cache import result_cache
+            from app.services.click_buffer import click_buffer
+
+            await open_async_pool()
+            await click_buffer.start()
+            # picks up invalidations from ingests in other processes
+            await result_cache.start()
+        if "ingest" in parts:
+            from app.services.api.ingest_api import API_HOST, API_KEY
+            from app.services.coclick import COCLICK_ENABLED, coclick_model
+            from app.services.jobs import job_manager
+            from app.services.scheduler import SCHEDULER_ENABLED, scheduler
+
+            await job_manager.start()
+            if SCHEDULER_ENABLED and API_KEY:
+                await scheduler.start(API_KEY, API_HOST)
+            await catalog_snapshots.start()
+            if COCLICK_ENABLED:
+                await coclick_model.start()
+        if PROFILER_ENABLED:
+            profiler.enable()
+        yield
+        profiler.disable()
+        if "ingest" in parts:
+            await coclick_model.stop()
+            await catalog_snapshots.stop()
+            await scheduler.stop()
+            await job_manager.stop()
+        if "read" in parts:
+            await result_cache.stop()
+            await click_buffer.stop()
+            await close_async_pool()
+        await demand_recorder.stop()
+        pool.closeall()
+
+    return lifespan
+
+
+def create_app(profile: str = APP_PROFILE) -> FastAPI:
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown APP_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}")
+    parts = PROFILES[profile]
+
+    from app.services.api.ops_api import router as ops_router
+
+    app = FastAPI(title="TripTreat API", lifespan=_lifespan(parts))
+    if "read" in parts:
+        from app.services.api.geo_api import router as geo_router
+        from app.services.api.hotel_api import router as hotel_router
+        from app.services.api.res_api import router as res_router
+        from app.services.api.summary_api import router as summary_router
+
+        app.include_router(hotel_router)
+        app.include_router(res_router)
+        app.include_router(geo_router)
+        app.include_router(summary_router)
+    if "ingest" in parts:
+        from app.services.api.ingest_api import router as ingest_router
+
+        app.include_router(ingest_router)
+    app.include_router(ops_router)
+    _register_collectors(parts)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,  # you can use ["*"] for all origins during local dev
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # added last so it is outermost and its latency covers CORS too
+    app.add_middleware(MetricsMiddleware, profiler=profiler)
+    return app
+
+
+app = create_app()